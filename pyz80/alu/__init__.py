@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from array import array
+from ..register import Z80FlagsRegister
+
+
+class ALUError(Exception):
+    pass
+
+
+_f = Z80FlagsRegister
+
+
+def _add(a, n, carry):
+    result = a + n + carry
+    flags = _f.SZ_FLAGS[result & 0xFF] | _f.XY_FLAGS[result & 0xFF] | ((a ^ n ^ result) & _f.HALF_CARRY_MASK)
+
+    if (a ^ n ^ 0x80) & (a ^ result) & 0x80:
+        flags |= _f.PARITY_MASK
+
+    if result > 0xFF:
+        flags |= _f.CARRY_MASK
+
+    return result & 0xFF, flags
+
+
+def _sub(a, n, carry):
+    result = a - n - carry
+    flags = _f.SZ_FLAGS[result & 0xFF] | _f.XY_FLAGS[result & 0xFF] | ((a ^ n ^ result) & _f.HALF_CARRY_MASK) | \
+        _f.ADD_MASK
+
+    if (a ^ n) & (a ^ result) & 0x80:
+        flags |= _f.PARITY_MASK
+
+    if result < 0x00:
+        flags |= _f.CARRY_MASK
+
+    return result & 0xFF, flags
+
+
+def _and(a, n, carry):
+    result = a & n
+    return result, _f.SZP_FLAGS[result] | _f.XY_FLAGS[result] | _f.HALF_CARRY_MASK
+
+
+def _xor(a, n, carry):
+    result = a ^ n
+    return result, _f.SZP_FLAGS[result] | _f.XY_FLAGS[result]
+
+
+def _or(a, n, carry):
+    result = a | n
+    return result, _f.SZP_FLAGS[result] | _f.XY_FLAGS[result]
+
+
+def _cp(a, n, carry):
+    """
+    CP is a substraction that discards its result, its undocumented
+    flags are copied from the operand instead.
+    """
+    result, flags = _sub(a, n, carry)
+    return result, (flags & ~_f.XY_MASK) | _f.XY_FLAGS[n]
+
+
+class ALU8Bit(object):
+
+    """
+    8 bit ALU operations as lookup tables. An entry holds the resulting
+    F byte in its higher byte and the result in its lower byte, it's
+    indexed by (carry << 16) | (a << 8) | n. ADD & SUB tables cover both
+    carry-in values (ADC & SBC), the rest of them ignore the carry.
+    Tables are built the first time an operation is used and shared by
+    all cpus.
+    """
+
+    ADD = 'add'
+    SUB = 'sub'
+    AND = 'and'
+    XOR = 'xor'
+    OR = 'or'
+    CP = 'cp'
+
+    _operations = {
+        ADD: (_add, [0x00, 0x01]),
+        SUB: (_sub, [0x00, 0x01]),
+        AND: (_and, [0x00]),
+        XOR: (_xor, [0x00]),
+        OR: (_or, [0x00]),
+        CP: (_cp, [0x00]),
+    }
+
+    _tables = {}
+
+    @classmethod
+    def _build_table(cls, operation):
+        try:
+            function, carries = cls._operations[operation]
+        except KeyError:
+            raise ALUError('Error - Unknown ALU operation : {0}.'.format(operation))
+
+        table = array('H')
+
+        for carry in carries:
+            for a in range(0x00, 0xFF + 1):
+                for n in range(0x00, 0xFF + 1):
+                    result, flags = function(a, n, carry)
+                    table.append((flags << 8) | result)
+
+        return table
+
+    @classmethod
+    def table(cls, operation):
+        try:
+            return cls._tables[operation]
+        except KeyError:
+            table = cls._tables[operation] = cls._build_table(operation)
+            return table
+
+    @classmethod
+    def execute(cls, operation, a, n, carry=0x00):
+        """
+        Returns the result and the F byte of a op n (with carry).
+        """
+        entry = cls.table(operation)[(carry << 16) | (a << 8) | n]
+        return entry & 0xFF, entry >> 8
+
+
+def _shift_rotate_flags(result, carry):
+    return _f.SZP_FLAGS[result] | _f.XY_FLAGS[result] | carry
+
+
+def _rlc(n, carry):
+    result = ((n << 1) | (n >> 7)) & 0xFF
+    return result, _shift_rotate_flags(result, n >> 7)
+
+
+def _rrc(n, carry):
+    result = (n >> 1) | ((n & 0x01) << 7)
+    return result, _shift_rotate_flags(result, n & 0x01)
+
+
+def _rl(n, carry):
+    result = ((n << 1) | carry) & 0xFF
+    return result, _shift_rotate_flags(result, n >> 7)
+
+
+def _rr(n, carry):
+    result = (n >> 1) | (carry << 7)
+    return result, _shift_rotate_flags(result, n & 0x01)
+
+
+def _sla(n, carry):
+    result = (n << 1) & 0xFF
+    return result, _shift_rotate_flags(result, n >> 7)
+
+
+def _sra(n, carry):
+    result = (n >> 1) | (n & 0x80)
+    return result, _shift_rotate_flags(result, n & 0x01)
+
+
+def _sll(n, carry):
+    result = ((n << 1) | 0x01) & 0xFF
+    return result, _shift_rotate_flags(result, n >> 7)
+
+
+def _srl(n, carry):
+    result = n >> 1
+    return result, _shift_rotate_flags(result, n & 0x01)
+
+
+def _bit(n, nth_bit):
+    """
+    BIT leaves its operand untouched and doesn't know about the carry,
+    its entries hold every flag but the carry one.
+    """
+    flags = _f.XY_FLAGS[n] | _f.HALF_CARRY_MASK
+
+    if n & (0x01 << nth_bit):
+        flags |= n & (0x01 << nth_bit) & _f.SIGN_MASK
+    else:
+        flags |= _f.ZERO_MASK | _f.PARITY_MASK
+
+    return n, flags
+
+
+class ALUShiftRotate(ALU8Bit):
+
+    """
+    CB prefixed rotate, shift & bit test operations as lookup tables.
+    Entries are laid out as ALU8Bit ones, but as these operations take
+    a single operand they're indexed by (carry << 8) | n, or by
+    (nth_bit << 8) | n for BIT.
+    """
+
+    RLC = 'rlc'
+    RRC = 'rrc'
+    RL = 'rl'
+    RR = 'rr'
+    SLA = 'sla'
+    SRA = 'sra'
+    SLL = 'sll'
+    SRL = 'srl'
+    BIT = 'bit'
+
+    _operations = {
+        RLC: (_rlc, [0x00]),
+        RRC: (_rrc, [0x00]),
+        RL: (_rl, [0x00, 0x01]),
+        RR: (_rr, [0x00, 0x01]),
+        SLA: (_sla, [0x00]),
+        SRA: (_sra, [0x00]),
+        SLL: (_sll, [0x00]),
+        SRL: (_srl, [0x00]),
+        BIT: (_bit, range(0, 8)),
+    }
+
+    _tables = {}
+
+    @classmethod
+    def _build_table(cls, operation):
+        try:
+            function, selectors = cls._operations[operation]
+        except KeyError:
+            raise ALUError('Error - Unknown ALU operation : {0}.'.format(operation))
+
+        table = array('H')
+
+        for selector in selectors:
+            for n in range(0x00, 0xFF + 1):
+                result, flags = function(n, selector)
+                table.append((flags << 8) | result)
+
+        return table
+
+    @classmethod
+    def execute(cls, operation, n, carry=0x00):
+        """
+        Returns the result and the F byte of operation over n. For BIT
+        carry is the number of the tested bit.
+        """
+        entry = cls.table(operation)[(carry << 8) | n]
+        return entry & 0xFF, entry >> 8
+
+
+def _daa(a, nhc):
+    add_substract, half_carry, carry = nhc & 0x02, nhc & 0x04, nhc & 0x01
+    correction = 0x00
+
+    if half_carry or ((a & 0x0F) > 0x09):
+        correction |= 0x06
+
+    if carry or (a > 0x99):
+        correction |= 0x60
+        carry = 0x01
+
+    if add_substract:
+        result = (a - correction) & 0xFF
+        half_carry = half_carry and ((a & 0x0F) < 0x06)
+    else:
+        result = (a + correction) & 0xFF
+        half_carry = (a & 0x0F) > 0x09
+
+    flags = _f.SZP_FLAGS[result] | _f.XY_FLAGS[result] | add_substract | carry
+
+    if half_carry:
+        flags |= _f.HALF_CARRY_MASK
+
+    return result, flags
+
+
+class ALUDecimalAdjust(ALUShiftRotate):
+
+    """
+    DAA as a lookup table indexed by (nhc << 8) | a, where nhc holds the
+    H, N & C flags the adjustment depends on as bits 2, 1 & 0 (see nhc()).
+    """
+
+    DAA = 'daa'
+
+    _operations = {
+        DAA: (_daa, range(0, 8)),
+    }
+
+    _tables = {}
+
+    @staticmethod
+    def nhc(flags):
+        return ((flags & _f.HALF_CARRY_MASK) >> 2) | (flags & (_f.ADD_MASK | _f.CARRY_MASK))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from ..register import Z80FlagsRegister as _f
+
+
+class ALU16Bit(object):
+
+    """
+    16 bit additions & substractions. Their operands are too wide for
+    lookup tables, so results & flags are computed with a fixed set of
+    integer operations. Each method returns the 16 bit result and the new
+    F byte. Half carry is the carry out of bit 11, that is bit 12 of
+    n ^ m ^ result, overflow comes from the signs of the operands & the
+    result and undocumented flags from the higher byte of the result.
+    """
+
+    @staticmethod
+    def add(n, m, flags):
+        """
+        ADD leaves sign, zero & parity/overflow flags untouched.
+        """
+        result = n + m
+        return result & 0xFFFF, (flags & _f.SZP_MASK) | ((result >> 8) & _f.XY_MASK) | \
+            (((n ^ m ^ result) >> 8) & _f.HALF_CARRY_MASK) | (result >> 16)
+
+    @staticmethod
+    def adc(n, m, carry):
+        result = n + m + carry
+        higher_byte = (result >> 8) & 0xFF
+        flags = (higher_byte & _f.SIGN_MASK) | _f.XY_FLAGS[higher_byte] | \
+            (((n ^ m ^ result) >> 8) & _f.HALF_CARRY_MASK) | \
+            (((n ^ m ^ 0x8000) & (n ^ result) & 0x8000) >> 13) | (result >> 16)
+
+        if result & 0xFFFF == 0x0000:
+            flags |= _f.ZERO_MASK
+
+        return result & 0xFFFF, flags
+
+    @staticmethod
+    def sbc(n, m, carry):
+        result = n - m - carry
+        higher_byte = (result >> 8) & 0xFF
+        flags = (higher_byte & _f.SIGN_MASK) | _f.XY_FLAGS[higher_byte] | \
+            (((n ^ m ^ result) >> 8) & _f.HALF_CARRY_MASK) | \
+            (((n ^ m) & (n ^ result) & 0x8000) >> 13) | _f.ADD_MASK | ((result >> 16) & _f.CARRY_MASK)
+
+        if result & 0xFFFF == 0x0000:
+            flags |= _f.ZERO_MASK
+
+        return result & 0xFFFF, flags
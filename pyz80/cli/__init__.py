@@ -50,6 +50,14 @@ class CLI(object):
             '-d', '--devices_dir', dest='devices_module_path', action='store',
             default=None, required=False
         )
+        parser.add_argument(
+            '-r', '--ram_image', dest='ram_image_path', action='store',
+            default=None, required=False
+        )
+        parser.add_argument(
+            '-c', '--clock', dest='clock', action='store', type=float,
+            default=None, required=False
+        )
         parser.add_argument(
             '-t', '--trace', dest='trace', action='store_true',
             default=False, required=False
@@ -19,12 +19,14 @@ along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
 Copyright 2014 Lucas Liendo.
 """
 
-from simplefsm.exceptions import FSMRejectedInput
-from ..register import Z80ByteRegister, Z80WordRegister, Z80FlagsRegister
-from ..fsm import Z80FSMBuilder
+from ..register import Z80FlagsRegister, Z80RegisterFile
+from ..fsm import Z80FSMBuilder, Z80FSMRejectedInput
 from ..instruction.decoder import InstructionDecoder
-from ..io import DeviceManager
+from ..instruction.generator import HandlerGenerator
+from ..io import DeviceManager, InterruptManager
 from ..ram import Ram
+from ..translator import BlockTranslator
+from ..timing import TStates, Scheduler
 
 
 class InvalidOpcodeError(Exception):
@@ -32,14 +34,41 @@ class InvalidOpcodeError(Exception):
 
 
 class Z80(object):
-    def __init__(self, ram=Ram(), device_manager=DeviceManager(), trace_fd=None):
+    def __init__(self, ram=None, device_manager=None, trace_fd=None,
+                 verify_fetch=False, predecode=False, translate_blocks=False,
+                 generated_handlers=False, lazy_flags=False, throttle=None):
         self._cpu_halted = False
+        self._slice_end_cycles = None
+        self.cycles = 0x00
+        self.throttle = throttle
+        self.scheduler = Scheduler(self)
+        self.interrupt_pending = False
+        self.lazy_flags = lazy_flags
         self._build_registers()
-        self._fsms = Z80FSMBuilder(self).build()
+        z80_fsm_builder = Z80FSMBuilder(self)
+        self._fsms = z80_fsm_builder.build(compiled=True)
+        self._length_tables = z80_fsm_builder.build_length_tables()
+        self._verify_fetch = verify_fetch
         self._instruction_decoder = InstructionDecoder(self)
-        self.ram = ram
-        self.device_manager = device_manager
+        self.ram = Ram() if ram is None else ram
+        self.interrupt_manager = InterruptManager(self)
+        self.device_manager = DeviceManager() if device_manager is None else device_manager
+        self.device_manager.attach_ram(self.ram)
+        self.device_manager.interrupt_manager = self.interrupt_manager
+        self.device_manager.scheduler = self.scheduler
         self.trace_fd = trace_fd
+        self._predecode = predecode
+        self._predecoded = [None] * (0xFFFF + 1)
+
+        if self._predecode:
+            self.ram.add_write_watcher(self._invalidate_predecoded)
+
+        self._block_translator = BlockTranslator(self) if translate_blocks else None
+        self._handler_generator = None
+
+        if generated_handlers:
+            self._handler_generator = HandlerGenerator(self._instruction_decoder)
+            self._handler_generator.build()
 
     def _build_16_bits_registers(self):
         """
@@ -48,8 +77,8 @@ class Z80(object):
         """
 
         registers = ['bc', 'de', 'hl']
-        [setattr(self, r, Z80WordRegister(label=r.upper())) for r in registers + ['sp', 'pc', 'ix', 'iy']]
-        [setattr(self, r + '_', Z80WordRegister(label=r.upper() + '\'')) for r in registers]
+        [setattr(self, r, self.registers.word_register(r, label=r.upper())) for r in registers + ['sp', 'pc', 'ix', 'iy']]
+        [setattr(self, r + '_', self.registers.word_register(r + '_', label=r.upper() + '\'')) for r in registers]
 
     def _build_8_bits_registers(self):
         """
@@ -57,12 +86,12 @@ class Z80(object):
         registers.
         """
 
-        self.i = Z80ByteRegister()
-        self.r = Z80ByteRegister()
-        self.a_ = Z80ByteRegister(label='A\'')
-        self.f_ = Z80FlagsRegister(label='F\'')
-        self.a = Z80ByteRegister()
-        self.f = Z80FlagsRegister()
+        self.i = self.registers.byte_register('i')
+        self.r = self.registers.byte_register('r')
+        self.a_ = self.registers.byte_register('a_', label='A\'')
+        self.f_ = self.registers.byte_register('f_', label='F\'', RegisterClass=Z80FlagsRegister)
+        self.a = self.registers.byte_register('a')
+        self.f = self.registers.byte_register('f', RegisterClass=Z80FlagsRegister)
         self.b = self.bc.higher
         self.c = self.bc.lower
         self.d = self.de.higher
@@ -87,6 +116,7 @@ class Z80(object):
         self.iff1, self.iff2, self.im = (0x00, 0x00, 0x00)
 
     def _build_registers(self):
+        self.registers = Z80RegisterFile()
         self._build_16_bits_registers()
         self._build_8_bits_registers()
         self._build_cpu_control_registers()
@@ -94,32 +124,239 @@ class Z80(object):
     def inc_pc(self):
         self.pc.bits += 1
 
-    # TODO: Implement processor halt & resume mechanism.
+    @property
+    def halted(self):
+        return self._cpu_halted
+
     def halt(self):
+        """
+        A halted cpu executes NOPs until an interrupt is accepted. The PC
+        is kept at the HALT, so it gets executed again and again, but
+        instead of stepping NOP by NOP the cycle count skips straight
+        to the end of the running slice (the cycle budget, the end of
+        the frame or the next scheduled event), in whole NOPs.
+        """
+
         self._cpu_halted = True
+        self.pc.bits -= 1
+
+        if (self._slice_end_cycles is not None) and (self.cycles < self._slice_end_cycles):
+            self.cycles += (self._slice_end_cycles - self.cycles + 3) & ~0x03
+
+    def resume(self):
+        if self._cpu_halted:
+            self._cpu_halted = False
+            self.pc.bits += 1
 
     def _fetch_opcode(self):
+        """
+        Opcodes are fetched with a single length lookup (indexed by the
+        prefix and the byte that follows it) and one RAM slice. If fetch
+        verification is enabled the FSMs are also run over the same bytes
+        and both results must agree.
+        """
+
+        if self._verify_fetch:
+            return self._verified_fetch_opcode()
+
+        return self._table_fetch_opcode()
+
+    def _table_fetch_opcode(self):
+        opcode = self._opcode_at(self.pc.bits)
+        self.pc.bits += len(opcode)
+        return opcode
+
+    def _opcode_length(self, address):
+        first_byte = self.ram.read(address)
+
+        if first_byte in (0xCB, 0xED, 0xDD, 0xFD):
+            return self._length_tables[(first_byte,)][self.ram.read((address + 1) & 0xFFFF)]
+
+        return self._length_tables[()][first_byte]
+
+    def _read_opcode_bytes(self, address, length):
+        """
+        Opcodes at the top of the memory wrap around to 0x0000, as the PC
+        does.
+        """
+
+        if address + length <= 0xFFFF + 1:
+            return self.ram.read_bytes(address, length)
+
+        return [self.ram.read((address + i) & 0xFFFF) for i in range(length)]
+
+    def _opcode_at(self, address):
+        length = self._opcode_length(address)
+
+        if length == 0:
+            invalid_opcode = ' '.join('{:02X}'.format(b) for b in self._read_opcode_bytes(address, 2))
+            raise InvalidOpcodeError(
+                'Error - Invalid opcode : {0}.'.format(invalid_opcode)
+            )
+
+        return self._read_opcode_bytes(address, length)
+
+    def _verified_fetch_opcode(self):
+        address = self.pc.bits
+        opcode = self._table_fetch_opcode()
+        self.pc.bits = address
+        fsm_opcode = self._fsm_fetch_opcode()
+
+        if opcode != fsm_opcode:
+            raise InvalidOpcodeError(
+                'Error - Length tables fetched : {0} but FSMs fetched : {1}.'.format(
+                    ' '.join('{:02X}'.format(b) for b in opcode),
+                    ' '.join('{:02X}'.format(b) for b in fsm_opcode))
+            )
+
+        return opcode
+
+    def _fsm_fetch_opcode(self):
         for fsm in self._fsms:
             try:
                 return fsm.run()
-            except FSMRejectedInput, e:
+            except Z80FSMRejectedInput, e:
                 invalid_opcode = ' '.join('{:02X}'.format(s) for s in e.rejected_input)
 
         raise InvalidOpcodeError(
             'Error - Invalid opcode : {0}.'.format(invalid_opcode)
         )
 
+    def _fetch_and_decode(self):
+        """
+        In predecode mode the decoded instruction, its operands, its
+        length and its T-states are cached per address, so executing the same address
+        again skips fetching and decoding. Cached bytes are watched and
+        any write to them drops the affected entries, which keeps self
+        modifying code working. Opcodes that wrap around the top of the
+        memory aren't cached.
+        """
+
+        if not self._predecode:
+            opcode = self._fetch_opcode()
+            self.cycles += TStates.of(opcode)
+            return self._instruction_decoder.decode(opcode)
+
+        address = self.pc.bits
+        predecoded = self._predecoded[address]
+
+        if predecoded is None:
+            opcode = self._fetch_opcode()
+            instruction, operands = self._instruction_decoder.decode(opcode)
+            predecoded = (instruction, operands, len(opcode), TStates.of(opcode))
+
+            if address + len(opcode) <= 0xFFFF + 1:
+                self._predecoded[address] = predecoded
+                self.ram.watch(address, len(opcode))
+        else:
+            self.pc.bits = address + predecoded[2]
+
+        self.cycles += predecoded[3]
+        return predecoded[0], predecoded[1]
+
+    def _invalidate_predecoded(self, address):
+        """
+        Opcodes are at most 4 bytes long, so only the entries starting
+        up to 3 bytes before the written address may cover it.
+        """
+
+        for start_address in range(max(address - 3, 0x00), address + 1):
+            predecoded = self._predecoded[start_address]
+
+            if (predecoded is not None) and (start_address + predecoded[2] > address):
+                self._predecoded[start_address] = None
+
+    def _execute_next(self):
+        """
+        Executes the translated block at the current PC, if block
+        translation is enabled, or a single instruction otherwise.
+        Neither blocks nor generated handlers log, so they're not used
+        while tracing. A pending interrupt is accepted first.
+        """
+
+        if self.interrupt_pending:
+            self.interrupt_manager.process()
+
+        if (self._block_translator is not None) and (self.trace_fd is None):
+            block = self._block_translator.translate(self.pc.bits)
+
+            if block is not None:
+                block()
+                return
+
+        if (self._handler_generator is not None) and (self.trace_fd is None):
+            opcode = self._fetch_opcode()
+            self.cycles += TStates.of(opcode)
+            generated_handler, operands = self._handler_generator.decode(opcode)
+            generated_handler(*operands)
+            return
+
+        instruction, operands = self._fetch_and_decode()
+        instruction.execute(operands)
+
     def load_device(self, D):
         device = D(self.device_manager)
         self.device_manager.add(device)
 
-    def run(self, program=[], address=0x00):
-        self.device_manager.run()
-        self.ram.load(program, address=address)
-        self.pc.bits = address
+    def step(self):
+        """
+        Executes the next instruction (or translated block) and returns
+        the T-states it took.
+        """
 
-        while True:
-            opcode = self._fetch_opcode()
-            instruction, operands = self._instruction_decoder.decode(opcode)
-            instruction.execute(operands)
-            # TODO: Process interruptions.
+        cycles = self.cycles
+        self._slice_end_cycles = cycles
+        self._execute_next()
+        return self.cycles - cycles
+
+    def run(self, program=None, address=0x00, cycles=None):
+        """
+        If a program is given it gets loaded at address and execution
+        starts there, otherwise it goes on from the current PC. Without
+        a cycle budget this runs forever, with one it returns as soon as
+        the budget is used up (it may overrun it by the last instruction
+        or block) and returns the T-states taken.
+
+        Instructions run in slices that end at the budget, at the next
+        scheduled event and, with a throttle, at the end of the frame.
+        Due events are called after every slice. With a throttle, it is
+        synchronized after each frame.
+        """
+
+        if program is not None:
+            self.device_manager.run()
+            self.ram.load(program, address=address)
+            self.pc.bits = address
+
+        start_cycles = self.cycles
+        end_cycles = None if cycles is None else start_cycles + cycles
+        frame_end_cycles = None
+
+        if self.throttle is not None:
+            self.throttle.synchronize(self.cycles)
+            frame_end_cycles = self.cycles + self.throttle.frame_cycles
+
+        while (end_cycles is None) or (self.cycles < end_cycles):
+            slice_ends = [c for c in (end_cycles, frame_end_cycles, self.scheduler.next_cycles) if c is not None]
+            self._run_slice(min(slice_ends) if slice_ends else None)
+            self.scheduler.run_due(self.cycles)
+
+            budget_used_up = (end_cycles is not None) and (self.cycles >= end_cycles)
+
+            if (frame_end_cycles is not None) and ((self.cycles >= frame_end_cycles) or budget_used_up):
+                self.throttle.synchronize(self.cycles)
+                frame_end_cycles = self.cycles + self.throttle.frame_cycles
+
+        return self.cycles - start_cycles
+
+    def _run_slice(self, end_cycles):
+        """
+        Runs until end_cycles, which gets brought forward by any event
+        scheduled meanwhile. Without an end the slice lasts until an
+        event gets scheduled.
+        """
+
+        self._slice_end_cycles = end_cycles
+
+        while (self._slice_end_cycles is None) or (self.cycles < self._slice_end_cycles):
+            self._execute_next()
@@ -38,6 +38,42 @@ class Z80FSM(SimpleFSM):
         self._z80.inc_pc()
 
 
+class Z80FSMRejectedInput(Exception):
+    def __init__(self, rejected_input):
+        super(Z80FSMRejectedInput, self).__init__(rejected_input)
+        self.rejected_input = rejected_input
+
+
+class Z80CompiledFSM(object):
+
+    """
+    Runs an FSM compiled by Z80FSMBuilder.build_transition_tables().
+    Each transition is a single table lookup instead of trying every
+    transition condition of the current state.
+    """
+
+    def __init__(self, z80, transition_table, final_state):
+        self._z80 = z80
+        self._transition_table = transition_table
+        self._final_state = final_state
+
+    def run(self):
+        state = 0
+        accepted_symbols = []
+
+        while state != self._final_state:
+            symbol = self._z80.ram.read(self._z80.pc.bits)
+            state = self._transition_table[state][symbol]
+
+            if state == -1:
+                raise Z80FSMRejectedInput(accepted_symbols + [symbol])
+
+            accepted_symbols.append(symbol)
+            self._z80.inc_pc()
+
+        return accepted_symbols
+
+
 class Z80FSMBuilder(object):
 
     """
@@ -52,26 +88,129 @@ class Z80FSMBuilder(object):
     sequentially in order to detect an opcode.
     """
 
+    _transition_tables = None
+    _length_tables = None
+
     def __init__(self, z80):
         self._z80 = z80
         self._ignore_byte = lambda _: True
 
-    def build(self):
+    def build(self, compiled=False):
+        if compiled:
+            return [
+                Z80CompiledFSM(self._z80, transition_table, final_state)
+                for transition_table, final_state in self.build_transition_tables()
+            ]
+
+        return [self._build_fsm(transitions) for transitions in self._fsms_transitions()]
+
+    def build_length_tables(self):
+        """
+        Returns the length of every opcode, indexed by its prefix and
+        the first byte that follows it. Lengths are taken from the same
+        byte sets the FSMs are built from. A zero length means that the
+        opcode isn't recognized.
+
+        Like the transition tables, they're built once and shared.
+        """
+
+        if Z80FSMBuilder._length_tables is None:
+            Z80FSMBuilder._length_tables = self._compile_length_tables()
+
+        return Z80FSMBuilder._length_tables
+
+    def _compile_length_tables(self):
+        unprefixed_one_byte, unprefixed_two_bytes, \
+            unprefixed_three_bytes = self._unprefixed_fsm_bytes()
+        ed_two_bytes, ed_four_bytes = self._ed_fsm_bytes()
+        dd_two_bytes, dd_three_bytes, dd_four_bytes = self._dd_fsm_bytes()
+        fd_two_bytes, fd_three_bytes, fd_four_bytes = self._fd_fsm_bytes()
+
+        length_tables = {
+            (): [(1, unprefixed_one_byte), (2, unprefixed_two_bytes), (3, unprefixed_three_bytes)],
+            (0xCB,): [(2, set(range(0x00, 0xFF + 1)))],
+            (0xED,): [(2, ed_two_bytes), (4, ed_four_bytes)],
+            (0xDD,): [(2, dd_two_bytes), (3, dd_three_bytes), (4, dd_four_bytes)],
+            (0xFD,): [(2, fd_two_bytes), (3, fd_three_bytes), (4, fd_four_bytes)],
+        }
+
+        for prefix, lengths in length_tables.iteritems():
+            length_table = [0] * (0xFF + 1)
+
+            for length, bytes in lengths:
+                for byte in bytes:
+                    length_table[byte] = length
+
+            length_tables[prefix] = length_table
+
+        return length_tables
+
+    def build_transition_tables(self):
+        """
+        Compiles every FSM into a dense transition table : table[state][byte]
+        holds the next state or -1 if the byte is rejected. State 0 is always
+        the initial state. Returns a list of (transition_table, final_state)
+        tuples that only hold integers, so they can be serialized.
+
+        Tables don't depend on any Z80 instance, so they're compiled once
+        and shared.
+        """
+
+        if Z80FSMBuilder._transition_tables is None:
+            Z80FSMBuilder._transition_tables = [
+                self._compile_fsm(transitions) for transitions in self._fsms_transitions()
+            ]
+
+        return Z80FSMBuilder._transition_tables
+
+    def _fsms_transitions(self):
         return [
-            self._build_unprefixed_fsm(),
-            self._build_cb_fsm(),
-            self._build_ed_fsm(),
-            self._build_dd_fsm(),
-            self._build_fd_fsm(),
+            self._unprefixed_fsm_transitions(),
+            self._cb_fsm_transitions(),
+            self._ed_fsm_transitions(),
+            self._dd_fsm_transitions(),
+            self._fd_fsm_transitions(),
         ]
 
-    def _build_fsm(self, states, transitions):
+    def _state_names(self, transitions):
+        state_names = ['I']
+
+        for from_state, to_state, _ in transitions:
+            [state_names.append(s) for s in (from_state, to_state) if s not in state_names]
+
+        return state_names
+
+    def _build_fsm(self, transitions):
+        state_names = self._state_names(transitions)
+        states = dict(
+            (s, State(s, start_state=(s == 'I'), final_state=(s == 'F'))) for s in state_names
+        )
+
         fsm = Z80FSM(self._z80)
-        fsm.add_states(states)
-        fsm.add_transitions(transitions)
+        fsm.add_states([states[s] for s in state_names])
+        fsm.add_transitions(
+            [Transition(states[from_state], states[to_state], condition) for from_state, to_state, condition in transitions]
+        )
 
         return fsm
 
+    def _compile_fsm(self, transitions):
+        state_names = self._state_names(transitions)
+        transition_table = []
+
+        for state_name in state_names:
+            row = [-1] * (0xFF + 1)
+
+            for byte in range(0x00, 0xFF + 1):
+                for from_state, to_state, condition in transitions:
+                    if (from_state == state_name) and condition(byte):
+                        row[byte] = state_names.index(to_state)
+                        break
+
+            transition_table.append(tuple(row))
+
+        return tuple(transition_table), state_names.index('F')
+
     def _unprefixed_fsm_bytes(self):
         unprefixed_three_bytes = set(
             [0x01, 0x11, 0x21, 0x22, 0x2A, 0x31, 0x32, 0x3A, 0xC2,
@@ -96,143 +235,113 @@ class Z80FSMBuilder(object):
     This FSM detects all opcodes that don't fall under any other category.
     """
 
-    def _build_unprefixed_fsm(self):
+    def _unprefixed_fsm_transitions(self):
         unprefixed_one_byte, unprefixed_two_bytes, \
             unprefixed_three_bytes = self._unprefixed_fsm_bytes()
 
-        i_state = State('I', start_state=True)
-        f_state = State('F', final_state=True)
-        b_state = State('B')
-        c_state = State('C')
-        d_state = State('D')
-
-        states = [i_state, f_state, b_state, c_state, d_state]
-        transitions = [
-            Transition(i_state, f_state, lambda b: b in unprefixed_one_byte),
-            Transition(i_state, b_state, lambda b: b in unprefixed_two_bytes),
-            Transition(b_state, f_state, self._ignore_byte),
-            Transition(i_state, c_state, lambda b: b in unprefixed_three_bytes),
-            Transition(c_state, d_state, self._ignore_byte),
-            Transition(d_state, f_state, self._ignore_byte),
+        return [
+            ('I', 'F', lambda b: b in unprefixed_one_byte),
+            ('I', 'B', lambda b: b in unprefixed_two_bytes),
+            ('B', 'F', self._ignore_byte),
+            ('I', 'C', lambda b: b in unprefixed_three_bytes),
+            ('C', 'D', self._ignore_byte),
+            ('D', 'F', self._ignore_byte),
         ]
 
-        return self._build_fsm(states, transitions)
+    def _build_unprefixed_fsm(self):
+        return self._build_fsm(self._unprefixed_fsm_transitions())
 
     """ The CB instruction FSM. """
 
-    def _build_cb_fsm(self):
-        i_state = State('I', start_state=True)
-        f_state = State('F', final_state=True)
-        b_state = State('B')
-
-        states = [i_state, f_state, b_state]
-        transitions = [
-            Transition(i_state, b_state, lambda b: b == 0xCB),
-            Transition(b_state, f_state, self._ignore_byte)
+    def _cb_fsm_transitions(self):
+        return [
+            ('I', 'B', lambda b: b == 0xCB),
+            ('B', 'F', self._ignore_byte)
         ]
 
-        return self._build_fsm(states, transitions)
+    def _build_cb_fsm(self):
+        return self._build_fsm(self._cb_fsm_transitions())
 
     def _ed_fsm_bytes(self):
         ed_four_bytes = set(range(0x43, 0x7B + 8, 8))
-        ed_two_bytes = set(range(0x00, 0xBB)) - ed_four_bytes
+        ed_two_bytes = set(range(0x00, 0xBB + 1)) - ed_four_bytes
 
         return ed_two_bytes, ed_four_bytes
 
     """ The ED instruction FSM. """
 
-    def _build_ed_fsm(self):
+    def _ed_fsm_transitions(self):
         ed_two_bytes, ed_four_bytes = self._ed_fsm_bytes()
 
-        i_state = State('I', start_state=True)
-        f_state = State('F', final_state=True)
-        b_state = State('B')
-        c_state = State('C')
-        d_state = State('D')
-
-        states = [i_state, f_state, b_state, c_state, d_state]
-        transitions = [
-            Transition(i_state, b_state, lambda b: b == 0xED),
-            Transition(b_state, f_state, lambda b: b in ed_two_bytes),
-            Transition(b_state, c_state, lambda b: b in ed_four_bytes),
-            Transition(c_state, d_state, self._ignore_byte),
-            Transition(d_state, f_state, self._ignore_byte)
+        return [
+            ('I', 'B', lambda b: b == 0xED),
+            ('B', 'F', lambda b: b in ed_two_bytes),
+            ('B', 'C', lambda b: b in ed_four_bytes),
+            ('C', 'D', self._ignore_byte),
+            ('D', 'F', self._ignore_byte)
         ]
 
-        return self._build_fsm(states, transitions)
+    def _build_ed_fsm(self):
+        return self._build_fsm(self._ed_fsm_transitions())
 
     def _dd_fsm_bytes(self):
         dd_four_bytes = set([0x21, 0x22, 0x2A, 0x36, 0xCB])
 
         dd_three_bytes = set([0x26, 0x2E, 0x34, 0x35, 0x46, 0x4E, 0x56, 0x5E, 0x66, 0x6E])
         dd_three_bytes = dd_three_bytes.union(range(0x70, 0x75 + 1)).union([0x77])
-        dd_three_bytes.union(range(0x7E, 0xBE + 8, 8))
+        dd_three_bytes = dd_three_bytes.union(range(0x7E, 0xBE + 8, 8))
 
         dd_two_bytes = set(range(0x09, 0xBE + 1))
         dd_two_bytes = dd_two_bytes.union([0xE1, 0xE3, 0xE5, 0xE9, 0xF9])
-        dd_two_bytes -= dd_three_bytes - dd_four_bytes
+        dd_two_bytes -= dd_three_bytes | dd_four_bytes
 
         return dd_two_bytes, dd_three_bytes, dd_four_bytes
 
     """ The DD/DDCB instrucion FSM. """
 
-    def _build_dd_fsm(self):
+    def _dd_fsm_transitions(self):
         dd_two_bytes, dd_three_bytes, dd_four_bytes = self._dd_fsm_bytes()
 
-        i_state = State('I', start_state=True)
-        f_state = State('F', final_state=True)
-        b_state = State('B')
-        c_state = State('C')
-        d_state = State('D')
-        e_state = State('E')
-
-        states = [i_state, f_state, b_state, c_state, d_state, e_state]
-        transitions = [
-            Transition(i_state, b_state, lambda b: b == 0xDD),
-            Transition(b_state, f_state, lambda b: b in dd_two_bytes),
-            Transition(b_state, c_state, lambda b: b in dd_three_bytes),
-            Transition(c_state, f_state, self._ignore_byte),
-            Transition(b_state, d_state, lambda b: b in dd_four_bytes),
-            Transition(d_state, e_state, self._ignore_byte),
-            Transition(e_state, f_state, self._ignore_byte)
+        return [
+            ('I', 'B', lambda b: b == 0xDD),
+            ('B', 'F', lambda b: b in dd_two_bytes),
+            ('B', 'C', lambda b: b in dd_three_bytes),
+            ('C', 'F', self._ignore_byte),
+            ('B', 'D', lambda b: b in dd_four_bytes),
+            ('D', 'E', self._ignore_byte),
+            ('E', 'F', self._ignore_byte)
         ]
 
-        return self._build_fsm(states, transitions)
+    def _build_dd_fsm(self):
+        return self._build_fsm(self._dd_fsm_transitions())
 
     def _fd_fsm_bytes(self):
         fd_four_bytes = set([0x21, 0x22, 0x2A, 0x36, 0xCB])
 
         fd_three_bytes = set([0x26, 0x2E, 0x34, 0x35, 0x46, 0x4E, 0x56, 0x5E, 0x66, 0x6E])
         fd_three_bytes = fd_three_bytes.union(range(0x70, 0x75 + 1)).union([0x77])
-        fd_three_bytes.union(range(0x7E, 0xBE + 8, 8))
+        fd_three_bytes = fd_three_bytes.union(range(0x7E, 0xBE + 8, 8))
 
         fd_two_bytes = set(range(0x09, 0xBE + 1))
         fd_two_bytes = fd_two_bytes.union([0xE1, 0xE3, 0xE5, 0xE9, 0xF9])
-        fd_two_bytes -= fd_three_bytes - fd_four_bytes
+        fd_two_bytes -= fd_three_bytes | fd_four_bytes
 
         return fd_two_bytes, fd_three_bytes, fd_four_bytes
 
     """ The FD/FDCB instrucion FSM. """
 
-    def _build_fd_fsm(self):
+    def _fd_fsm_transitions(self):
         fd_two_bytes, fd_three_bytes, fd_four_bytes = self._fd_fsm_bytes()
 
-        i_state = State('I', start_state=True)
-        f_state = State('F', final_state=True)
-        b_state = State('B')
-        c_state = State('C')
-        d_state = State('D')
-        e_state = State('E')
-
-        states = [i_state, f_state, b_state, c_state, d_state, e_state]
-        transitions = [
-            Transition(i_state, b_state, lambda b: b == 0xFD),
-            Transition(b_state, f_state, lambda b: b in fd_two_bytes),
-            Transition(b_state, c_state, lambda b: b in fd_three_bytes),
-            Transition(c_state, f_state, self._ignore_byte),
-            Transition(b_state, d_state, lambda b: b in fd_four_bytes),
-            Transition(d_state, e_state, self._ignore_byte),
-            Transition(e_state, f_state, self._ignore_byte)
+        return [
+            ('I', 'B', lambda b: b == 0xFD),
+            ('B', 'F', lambda b: b in fd_two_bytes),
+            ('B', 'C', lambda b: b in fd_three_bytes),
+            ('C', 'F', self._ignore_byte),
+            ('B', 'D', lambda b: b in fd_four_bytes),
+            ('D', 'E', self._ignore_byte),
+            ('E', 'F', self._ignore_byte)
         ]
 
-        return self._build_fsm(states, transitions)
+    def _build_fd_fsm(self):
+        return self._build_fsm(self._fd_fsm_transitions())
@@ -31,6 +31,7 @@ class Instruction(object):
 
     __metaclass__ = ABCMeta
     regexp = None
+    _partial_flags_update = False
 
     def __init__(self, z80):
         self._z80 = z80
@@ -53,6 +54,17 @@ class Instruction(object):
         self._instruction_logic(*operands)
         self._log(*operands)
 
+    def _record_flags(self, *operands):
+        """
+        Updates the flags right away or, if the cpu evaluates flags lazily,
+        defers the update until F gets read. _update_flags() must only
+        depend on its operands, as it may run after other instructions.
+        """
+        if self._z80.lazy_flags:
+            self._z80.f.defer(self._update_flags, operands, partial=self._partial_flags_update)
+        else:
+            self._update_flags(*operands)
+
     def _get_address(self, high_order_byte, low_order_byte):
         """
         Given high and a low order byte this method returns
@@ -69,13 +81,7 @@ class Instruction(object):
         return int(pow(2, bits) - 1)
 
     def _parity(self, n):
-        parity_even = True
-        ones_count = len([1 for bit in bin(n).lstrip('0b') if bit == '1'])
-
-        if ones_count & 0x01:
-            parity_even = False
-
-        return parity_even
+        return (self._z80.f.SZP_FLAGS[n & 0xFF] & self._z80.f.PARITY_MASK) != 0x00
 
     def _zero(self, n, bits=BYTE_SIZE):
         return (n & self._bitmask(bits=bits)) is 0x00
@@ -116,6 +122,12 @@ class Instruction(object):
         else:
             self._z80.f.reset_zero_flag()
 
+    def _update_sz_flags(self, instruction_result):
+        self._z80.f.update_sz_flags(instruction_result)
+
+    def _update_szp_flags(self, instruction_result):
+        self._z80.f.update_szp_flags(instruction_result)
+
     def _update_parity_flag(self, instruction_result):
         if self._parity(instruction_result):
             self._z80.f.set_parity_flag()
@@ -20,8 +20,8 @@ Copyright 2014 Lucas Liendo.
 """
 
 from abc import ABCMeta
-from abc_arithmetic_8_bit import Add8Bit, Sub8Bit
 from . import Instruction
+from ..alu.alu_16_bit import ALU16Bit
 
 
 class Arithmetic16Bit(Instruction):
@@ -71,25 +71,16 @@ class Add16Bit(Arithmetic16Bit):
     
     __metaclass__ = ABCMeta
 
-    def _overflow(self, operands):
-        return super(Add16Bit, self)._overflow(operands, bits=WORD_SIZE)
+    def _add(self, register, n):
+        register.bits, self._z80.f.bits = ALU16Bit.add(register.bits, n, self._z80.f.bits)
 
-    def _carry(self, operands):
-        return super(Add16Bit, self)._carry(operands, bits=WORD_SIZE)
-
-    def _half_carry(self, operands):
-        return super(Add16Bit, self)._half_carry(operands, bits=WORD_SIZE)
+    def _adc(self, register, n):
+        register.bits, self._z80.f.bits = ALU16Bit.adc(register.bits, n, self._z80.f.carry_flag)
 
 
 class Sub16Bit(Arithmetic16Bit):
 
     __metaclass__ = ABCMeta
 
-    def _overflow(self, operands):
-        return super(Sub16Bit, self)._overflow(operands, bits=WORD_SIZE)
-
-    def _carry(self, operands):
-        return super(Sub16Bit, self)._carry(operands, bits=WORD_SIZE)
-
-    def _half_carry(self, operands):
-        return super(Sub16Bit, self)._half_carry(operands, bits=WORD_SIZE)
+    def _sbc(self, register, n):
+        register.bits, self._z80.f.bits = ALU16Bit.sbc(register.bits, n, self._z80.f.carry_flag)
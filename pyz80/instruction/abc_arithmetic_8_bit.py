@@ -21,7 +21,7 @@ Copyright 2014 Lucas Liendo.
 
 from abc import ABCMeta
 from . import Instruction
-from ..arch import BYTE_SIZE
+from ..alu import ALU8Bit
 
 
 class Arithmetic8Bit(Instruction):
@@ -71,44 +71,26 @@ class Arithmetic8Bit(Instruction):
 
         return register
 
-
-class Add8Bit(Arithmetic8Bit):
-
-    __metaclass__ = ABCMeta
-
-    def _overflow(self, operands, bits=BYTE_SIZE):
-        bitmask = self._bitmask(bits=bits)
-        overflow_condition = False
-        msbs = [self._msb(operand) for operand in operands]
-
+    def _alu(self, operation, operands):
         """
-        If operands have the same sign we check
-        if the addtion results in a change of sign.
+        Looks a op n (plus carry) up in the ALU tables, sets F and
+        returns the result. Operands are [a, n] or [a, n, carry]. The
+        entry already holds the whole F byte, so it's written right away
+        even if flags are evaluated lazily.
         """
-        if not reduce(lambda n, m: n ^ m, msbs):
-            sum_msb = self._msb(sum(operands) & bitmask)
+        carry = operands[2] if len(operands) > 2 else 0x00
+        entry = ALU8Bit.table(operation)[(carry << 16) | (operands[0] << 8) | operands[1]]
+        self._z80.f.bits = entry >> 8
 
-            if operands[0] ^ sum_msb:
-                overflow_condition = True
+        return entry & 0xFF
 
-        return overflow_condition
 
-    def _carry(self, operands, bits=BYTE_SIZE):
-        bitmask = self._bitmask(bits=bits)
-        return reduce(lambda n, m: (n & bitmask) + (m & bitmask), operands) > bitmask
+class Add8Bit(Arithmetic8Bit):
 
-    def _instruction_logic(self, operands):
-        add_result = sum(operands)
-        self._update_flags(operands, add_result)
-        self._z80.a.bits = add_result
+    __metaclass__ = ABCMeta
 
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._update_half_carry_flag(operands)
-        self._update_overflow_flag(operands)
-        self._update_carry_flag(operands)
-        self._z80.f.reset_add_substract_flag()
+    def _instruction_logic(self, operands):
+        self._z80.a.bits = self._alu(ALU8Bit.ADD, operands)
 
 
 class AddAIndirectAddress(Add8Bit):
@@ -135,38 +117,8 @@ class Sub8Bit(Arithmetic8Bit):
 
     __metaclass__ = ABCMeta
 
-    def _overflow(self, operands, bits=BYTE_SIZE):
-        bitmask = self._bitmask(bits=bits)
-        overflow_condition = False
-        msbs = [self._msb(operand) for operand in operands]
-
-        """
-        If operands have different signs we check
-        if the substraction results in a change of sign.
-        """
-        if not reduce(lambda n, m: n ^ m, msbs):
-            substraction_msb = self._msb(reduce(lambda n, m: n - m, operands) & bitmask)
-
-            if operands[0] ^ substraction_msb:
-                overflow_condition = True
-
-        return overflow_condition
-
-    def _carry(self, operands, bits=BYTE_SIZE):
-        return any([operands[i] < operands[i + 1] for i in range(0, len(operands) - 1)])
-
     def _instruction_logic(self, operands):
-        sub_result = reduce(lambda n, m: n - m, operands)
-        self._update_flags(operands, sub_result)
-        self._z80.a.bits = sub_result
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._update_half_carry_flag(operands)
-        self._update_overflow_flag(operands)
-        self._update_carry_flag(operands)
-        self._z80.f.set_add_substract_flag()
+        self._z80.a.bits = self._alu(ALU8Bit.SUB, operands)
 
 
 class SubAIndirectAddress(Sub8Bit):
@@ -194,17 +146,7 @@ class And8Bit(Arithmetic8Bit):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, operands):
-        and_result = reduce(lambda n, m: n & m, operands)
-        self._update_flags(operands, and_result)
-        self._z80.a.bits = and_result
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._z80.f.set_half_carry_flag()
-        self._update_parity_flag(operands)
-        self._z80.f.reset_carry_flag()
-        self._z80.f.reset_add_substract_flag()
+        self._z80.a.bits = self._alu(ALU8Bit.AND, operands)
 
 
 class AndAIndirectAddress(And8Bit):
@@ -221,17 +163,7 @@ class Or8Bit(Arithmetic8Bit):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, operands):
-        or_result = reduce(lambda n, m: n | m, operands)
-        self._update_flags(operands, or_result)
-        self._z80.a.bits = or_result
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._z80.f.reset_half_carry_flag()
-        self._update_parity_flag(operands)
-        self._z80.f.reset_carry_flag()
-        self._z80.f.reset_add_substract_flag()
+        self._z80.a.bits = self._alu(ALU8Bit.OR, operands)
 
 
 class OrAIndirectAddress(Or8Bit):
@@ -248,17 +180,7 @@ class Xor8Bit(Arithmetic8Bit):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, operands):
-        xor_result = reduce(lambda n, m: n ^ m, operands)
-        self._update_flags(operands, xor_result)
-        self._z80.a.bits = xor_result
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._z80.f.reset_half_carry_flag()
-        self._update_parity_flag(operands)
-        self._z80.f.reset_carry_flag()
-        self._z80.f.reset_add_substract_flag()
+        self._z80.a.bits = self._alu(ALU8Bit.XOR, operands)
 
 
 class XorAIndirectAddress(Xor8Bit):
@@ -275,16 +197,7 @@ class Cp8Bit(Sub8Bit):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, operands):
-        cp_result = reduce(lambda n, m: n - m, operands)
-        self._update_flags(operands, cp_result)
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._update_half_carry_flag(instruction_result)
-        self._update_overflow_flag(operands)
-        self._z80.f.set_add_substract_flag()
-        self._update_carry_flag(operands)
+        self._alu(ALU8Bit.CP, operands)
 
 
 class CpAIndirectAddress(Cp8Bit):
@@ -299,15 +212,15 @@ class CpAIndirectAddress(Cp8Bit):
 class Inc8Bit(Add8Bit):
 
     __metaclass__ = ABCMeta
+    _partial_flags_update = True
 
     def _instruction_logic(self, operands):
         inc_result = reduce(lambda n, m: n - m, operands)
-        self._update_flags(operands, inc_result)
+        self._record_flags(operands, inc_result)
         return inc_result
 
     def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
+        self._update_sz_flags(instruction_result)
         self._update_half_carry_flag(instruction_result)
         self._update_overflow_flag(operands)
         self._z80.f.reset_add_substract_flag()
@@ -327,15 +240,15 @@ class IncIndirectAddress(Inc8Bit):
 class Dec8Bit(Sub8Bit):
 
     __metaclass__ = ABCMeta
+    _partial_flags_update = True
 
     def _instruction_logic(self, operands):
         dec_result = reduce(lambda n, m: n - m, operands)
-        self._update_flags(operands, dec_result)
+        self._record_flags(operands, dec_result)
         return dec_result
 
     def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
+        self._update_sz_flags(instruction_result)
         self._update_half_carry_flag(instruction_result)
         self._update_overflow_flag(operands)
         self._z80.f.set_add_substract_flag()
@@ -21,6 +21,7 @@ Copyright 2014 Lucas Liendo.
 
 from abc import ABCMeta
 from . import Instruction
+from ..timing import TStates
 
 
 class Exchange(Instruction):
@@ -33,7 +34,72 @@ class Exchange(Instruction):
         another_register.bits = bits
 
     def _swap_register_with_ram_word(self, address, register):
-        high_order_byte, low_order_byte = self._z80.ram.read_word(address)
-        self._z80.ram.write_word(address, register.higher.bits, register.lower.bits)
-        register.higher.bits = high_order_byte
-        register.lower.bits = low_order_byte
+        word = self._z80.ram.read_word(address)
+        self._z80.ram.write_word(address, register.bits)
+        register.bits = word
+
+
+class BlockTransfer(Instruction):
+
+    """
+    Block instructions run all of their repetitions at once. The T-states
+    of a single run are accounted when the opcode is fetched, every other
+    repetition takes TStates.REPEAT more.
+    """
+
+    __metaclass__ = ABCMeta
+
+    def _block_length(self):
+        """
+        BC is decremented before it gets tested, so starting at 0 the
+        instruction repeats 0x10000 times.
+        """
+        return self._z80.bc.bits or 0x10000
+
+    def _byte_block_length(self):
+        """
+        Same as _block_length for the IO block instructions, which count
+        with B : starting at 0 they repeat 0x100 times.
+        """
+        return self._z80.b.bits or 0x100
+
+    def _add_repeat_cycles(self, repetitions):
+        if repetitions > 1:
+            self._z80.cycles += TStates.REPEAT * (repetitions - 1)
+
+    def _bulk_range(self, address, length):
+        """
+        Ranges that wrap around or touch memory mapped IO are moved byte
+        by byte, as the slice operations of the RAM don't handle them.
+        """
+        ram = self._z80.ram
+        return (not ram.io_mapped) and (address >= 0x00) and (address + length <= ram.size)
+
+    def _transfer_up(self, source, destination, length):
+        """
+        Copies exactly as LDIR does byte by byte. If destination lies
+        within the source range the bytes in between get repeated (the
+        usual fill trick).
+        """
+        ram = self._z80.ram
+        distance = destination - source
+
+        if 0x00 < distance < length:
+            pattern = ram.dump(source, distance)
+            ram.load((pattern * (length / distance + 1))[:length], destination)
+        else:
+            ram.copy(source, destination, length)
+
+    def _transfer_down(self, source, destination, length):
+        """
+        Same as _transfer_up for LDDR, source & destination are the
+        highest addresses of both ranges.
+        """
+        ram = self._z80.ram
+        distance = source - destination
+
+        if 0x00 < distance < length:
+            pattern = ram.dump(source - distance + 1, distance)[::-1]
+            ram.load((pattern * (length / distance + 1))[:length][::-1], destination - length + 1)
+        else:
+            ram.copy(source - length + 1, destination - length + 1, length)
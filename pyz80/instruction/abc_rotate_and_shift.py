@@ -21,15 +21,14 @@ Copyright 2014 Lucas Liendo.
 
 from . import Instruction
 from abc import ABCMeta
+from ..alu import ALUShiftRotate
 
 
 class RotateAndShift(Instruction):
 
     __metaclass__ = ABCMeta
-
-    def __init__(self, *args, **kwargs):
-        super(RotateAndShift, self).__init__(*args, **kwargs)
-        self._carry_flag = self._z80.f.set_carry_flag()
+    _operation = None
+    _carry_in = False
 
     def _select_register(self, selector):
         registers = {
@@ -44,87 +43,66 @@ class RotateAndShift(Instruction):
  
         return registers[selector]
 
-    def _update_flags(self, register):
-        self._update_sign_flag(register)
-        self._update_zero_flag(register)
-        self._update_parity_flag(register)
-        self._z80.f.reset_half_carry_flag()
-        self._z80.f.reset_add_substract_flag()
-        self._update_carry_flag(register)
+    def _shift_rotate(self, n):
+        """
+        Looks n up in the table of the instruction's operation, updates
+        the flags and returns the result. The table already holds the F
+        byte, so there's nothing to save by deferring it and flags are
+        updated right away even if they're evaluated lazily.
+        """
+        carry = self._z80.f.carry_flag if self._carry_in else 0x00
+        entry = ALUShiftRotate.table(self._operation)[(carry << 8) | n]
+        self._update_flags(entry >> 8)
 
+        return entry & 0xFF
 
-class RotateLeftWithCarry(RotateAndShift):
+    def _shift_rotate_address(self, address):
+        n = self._shift_rotate(self._z80.ram.read(address))
+        self._z80.ram.write(address, n)
 
-    __metaclass__ = ABCMeta
-    
-    def _update_carry_flag(self, register):
-        if self._msb is 0x01:
-            self._z80.f.set_carry_flag()
-        else:
-            self._z80.f.reset_carry_flag()
+        return n
 
-    def _instruction_logic(self, register):
-        self._msb = register.msb
-        register.rotate_left()
-        self._update_flags(register)
+    def _update_flags(self, flags):
+        self._z80.f.bits = flags
 
+    def _instruction_logic(self, register):
+        register.bits = self._shift_rotate(register.bits)
         return register
 
 
-class RotateLeftThroughCarry(RotateLeftWithCarry):
+class RotateLeftWithCarry(RotateAndShift):
 
     __metaclass__ = ABCMeta
-
-    def _instruction_logic(self, register):
-        self._msb = register.msb
-        register.rotate_left()
-        register.bits |= self._carry_flag
-        self._update_flags(register)
-
-        return register
+    _operation = ALUShiftRotate.RLC
 
 
-class RotateRightWithCarry(RotateAndShift):
+class RlcIndirectAddress(RotateLeftWithCarry):
 
     __metaclass__ = ABCMeta
 
-    def _update_carry_flag(self, register):
-        if self._lsb is 0x01:
-            self._z80.f.set_carry_flag()
-        else:
-            self._z80.f.reset_carry_flag()
-
-    def _instruction_logic(self, register):
-        self._lsb = register.lsb
-        register.rotate_right()
-        self._update_flags(register)
-
-        return register
+    def _instruction_logic(self, address):
+        return self._shift_rotate_address(address)
 
 
-class RotateRightThroughCarry(RotateRightWithCarry):
+class RotateLeftThroughCarry(RotateLeftWithCarry):
 
     __metaclass__ = ABCMeta
+    _operation = ALUShiftRotate.RL
+    _carry_in = True
 
-    def _instruction_logic(self, register):
-        self._lsb = register.lsb
-        register.rotate_right()
-        register.bits |= (self._carry_flag << (register.size - 1))
-        self._update_flags(register)
-
-        return register
 
-
-class RlcIndirectAddress(RotateLeftWithCarry):
+class RlIndirectAddress(RotateLeftThroughCarry):
 
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(RlcIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
+        return self._shift_rotate_address(address)
 
-        return register
+
+class RotateRightWithCarry(RotateAndShift):
+
+    __metaclass__ = ABCMeta
+    _operation = ALUShiftRotate.RRC
 
 
 class RrcIndirectAddress(RotateRightWithCarry):
@@ -132,23 +110,14 @@ class RrcIndirectAddress(RotateRightWithCarry):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(RrcIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
-
-        return register
+        return self._shift_rotate_address(address)
 
 
-class RlIndirectAddress(RotateLeftThroughCarry):
+class RotateRightThroughCarry(RotateRightWithCarry):
 
     __metaclass__ = ABCMeta
-
-    def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(RlIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
-
-        return register
+    _operation = ALUShiftRotate.RR
+    _carry_in = True
 
 
 class RrIndirectAddress(RotateRightThroughCarry):
@@ -156,23 +125,13 @@ class RrIndirectAddress(RotateRightThroughCarry):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(RrIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
-
-        return register
+        return self._shift_rotate_address(address)
 
 
 class ShiftLeftArithmetic(RotateLeftWithCarry):
-    
-    __metaclass__ = ABCMeta
-
-    def _instruction_logic(self, register):
-        self._msb = register.msb
-        register.shift_left()
-        self._update_flags(register)
 
-        return register
+    __metaclass__ = ABCMeta
+    _operation = ALUShiftRotate.SLA
 
 
 class SlaIndirectAddress(ShiftLeftArithmetic):
@@ -180,24 +139,13 @@ class SlaIndirectAddress(ShiftLeftArithmetic):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(SlaIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
-
-        return register
+        return self._shift_rotate_address(address)
 
 
 class ShiftLeftLogical(RotateLeftWithCarry):
-    
-    __metaclass__ = ABCMeta
-
-    def _instruction_logic(self, register):
-        self._msb = register.msb
-        register.shift_left()
-        register.bits |= 0x01
-        self._update_flags(register)
 
-        return register
+    __metaclass__ = ABCMeta
+    _operation = ALUShiftRotate.SLL
 
 
 class SllIndirectAddress(ShiftLeftLogical):
@@ -205,25 +153,13 @@ class SllIndirectAddress(ShiftLeftLogical):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(SllIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
-
-        return register
+        return self._shift_rotate_address(address)
 
 
 class ShiftRightArithmetic(RotateRightWithCarry):
-    
-    __metaclass__ = ABCMeta
 
-    def _instruction_logic(self, register):
-        self._lsb = register.lsb
-        msb = register.msb
-        register.shift_right()
-        register.bits |= (msb << (register.size - 1))
-        self._update_flags(register)
-
-        return register
+    __metaclass__ = ABCMeta
+    _operation = ALUShiftRotate.SRA
 
 
 class SraIndirectAddress(ShiftRightArithmetic):
@@ -231,23 +167,13 @@ class SraIndirectAddress(ShiftRightArithmetic):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(SraIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
-
-        return register
+        return self._shift_rotate_address(address)
 
 
 class ShiftRightLogical(RotateRightWithCarry):
-    
-    __metaclass__ = ABCMeta
-
-    def _instruction_logic(self, register):
-        self._lsb = register.lsb
-        register.shift_right()
-        self._update_flags(register)
 
-        return register
+    __metaclass__ = ABCMeta
+    _operation = ALUShiftRotate.SRL
 
 
 class SrlIndirectAddress(ShiftRightLogical):
@@ -255,8 +181,4 @@ class SrlIndirectAddress(ShiftRightLogical):
     __metaclass__ = ABCMeta
 
     def _instruction_logic(self, address):
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register = super(SrlIndirectAddress, self)._instruction_logic(register)
-        self._z80.ram.write(address, register.bits)
-
-        return register
+        return self._shift_rotate_address(address)
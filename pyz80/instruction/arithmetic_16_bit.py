@@ -20,7 +20,7 @@ Copyright 2014 Lucas Liendo.
 """
 
 from re import compile as compile_re
-from abc_arithmetic_16_bit import Add16Bit, Sub16Bit
+from abc_arithmetic_16_bit import Arithmetic16Bit, Add16Bit, Sub16Bit
 from . import Instruction
 
 
@@ -38,18 +38,13 @@ class AddHLSS(Add16Bit):
 
     def _instruction_logic(self, selector):
         register = self._select_register(selector)
-        super(AddHLSS, self)._instruction_logic([self._z80.a.bits, register.bits])
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_half_carry_flag(operands)
-        self._update_carry_flag(operands)
-        self._z80.f.reset_add_substract_flag()
+        self._add(self._z80.hl, register.bits)
 
 
 class AddIXPP(AddHLSS):
     """ ADD IX, pp """
 
-    regexp = compile_re('^1101111000((?:0|1){2})1001$')
+    regexp = compile_re('^1101110100((?:0|1){2})1001$')
 
     def _message_log(self, selector):
         register = self._select_register(selector)
@@ -60,13 +55,13 @@ class AddIXPP(AddHLSS):
 
     def _instruction_logic(self, selector):
         register = self._select_register(selector)
-        super(AddIXPP, self)._instruction_logic([self._z80.ix.bits, register.bits])
+        self._add(self._z80.ix, register.bits)
 
 
 class AddIYQQ(AddHLSS):
     """ ADD IY, qq """
 
-    regexp = compile_re('^1111111000((?:0|1){2})1001$')
+    regexp = compile_re('^1111110100((?:0|1){2})1001$')
 
     def _message_log(self, selector):
         register = self._select_register(selector)
@@ -77,7 +72,7 @@ class AddIYQQ(AddHLSS):
 
     def _instruction_logic(self, selector):
         register = self._select_register(selector)
-        super(AddIYQQ, self)._instruction_logic([self._z80.iy.bits, register.bits])
+        self._add(self._z80.iy, register.bits)
 
 
 class AdcHLSS(Add16Bit):
@@ -94,47 +89,27 @@ class AdcHLSS(Add16Bit):
 
     def _instruction_logic(self, selector):
         register = self._select_register(selector)
-        super(AdcHLSS, self)._instruction_logic(
-            [self._z80.a.bits, register.bits, self._z80.f.carry_flag]
-        )
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._update_half_carry_flag(operands)
-        self._update_carry_flag(operands)
-        self._update_overflow_flag(operands)
-        self._z80.f.reset_add_substract_flag()
+        self._adc(self._z80.hl, register.bits)
 
 
 class SbcHLSS(Sub16Bit):
-    """ SUB HL, ss """
+    """ SBC HL, ss """
 
     regexp = compile_re('^1110110101((?:0|1){2})0010$')
 
     def _message_log(self, selector):
         register = self._select_register(selector)
-        return 'SUB HL, {:}'.format(register.label)
+        return 'SBC HL, {:}'.format(register.label)
 
     def _instruction_selector(self, selector):
         return self._ss_selector(selector)
 
     def _instruction_logic(self, selector):
         register = self._select_register(selector)
-        super(SbcHLSS, self)._instruction_logic(
-            [self._z80.a.bits, register.bits, self._z80.f.carry_flag]
-        )
-
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._update_half_carry_flag(operands)
-        self._update_carry_flag(operands)
-        self._update_overflow_flag(operands)
-        self._z80.f.set_add_substract_flag()
+        self._sbc(self._z80.hl, register.bits)
 
 
-class IncSS(Instruction):
+class IncSS(Arithmetic16Bit):
     """ INC ss """
 
     regexp = compile_re('^00((?:0|1){2})0011$')
@@ -159,7 +134,7 @@ class IncIX(Instruction):
     def _message_log(self):
         return 'INC IX'
 
-    def _instruction_logic(self, selector):
+    def _instruction_logic(self):
         self._z80.ix.bits += 1
 
 
@@ -171,11 +146,11 @@ class IncIY(Instruction):
     def _message_log(self):
         return 'INC IY'
 
-    def _instruction_logic(self, selector):
+    def _instruction_logic(self):
         self._z80.iy.bits += 1
 
 
-class DecSS(Instruction):
+class DecSS(Arithmetic16Bit):
     """ DEC ss """
 
     regexp = compile_re('^00((?:0|1){2})1011$')
@@ -189,7 +164,7 @@ class DecSS(Instruction):
 
     def _instruction_logic(self, selector):
         register = self._select_register(selector)
-        register.bits += 1
+        register.bits -= 1
 
 
 class DecIX(Instruction):
@@ -200,8 +175,8 @@ class DecIX(Instruction):
     def _message_log(self):
         return 'DEC IX'
 
-    def _instruction_logic(self, selector):
-        self._z80.ix.bits += 1
+    def _instruction_logic(self):
+        self._z80.ix.bits -= 1
 
 
 class DecIY(Instruction):
@@ -212,5 +187,5 @@ class DecIY(Instruction):
     def _message_log(self):
         return 'DEC IY'
 
-    def _instruction_logic(self, selector):
-        self._z80.iy.bits += 1
+    def _instruction_logic(self):
+        self._z80.iy.bits -= 1
@@ -21,7 +21,7 @@ Copyright 2014 Lucas Liendo.
 
 from re import compile as compile_re
 from ..instruction import Instruction
-from ..register import Z80ByteRegister
+from ..alu import ALUShiftRotate
 
 
 """ BIT instructions. """
@@ -44,6 +44,9 @@ class BitTest(Instruction):
 
         return registers[selector]
 
+    def _select_register(self, selector):
+        return self._instruction_selector(selector)
+
     def _message_log(self, nth_bit, selector):
         register = self._select_register(selector)
         return 'BIT {:}, {:}'.format(nth_bit, register.label)
@@ -52,19 +55,9 @@ class BitTest(Instruction):
         register = self._select_register(selector)
         self._update_flags(nth_bit, register.bits)
 
-    def _update_flags(self, nth_bit, register):
-        self._update_sign_flag(register.bits)
-
-        if register.nth_bit(nth_bit) == 0x00:
-            self._set_zero_flag()
-            self._set_parity_flag()
-        else:
-            self._reset_zero_flag()
-            self._reset_parity_flag()
-
-        self._update_zero_flag(register.bits)
-        self._set_half_carry_flag()
-        self._reset_add_substract_flag()
+    def _update_flags(self, nth_bit, n):
+        f = self._z80.f
+        f.bits = (ALUShiftRotate.table(ALUShiftRotate.BIT)[(nth_bit << 8) | n] >> 8) | (f.bits & f.CARRY_MASK)
 
 
 class BitTestIndirectHL(BitTest):
@@ -76,8 +69,7 @@ class BitTestIndirectHL(BitTest):
         return 'BIT {:}, (HL)'.format(nth_bit)
 
     def _instruction_logic(self, nth_bit):
-        register = Z80ByteRegister(bits=self._z80.ram.read(self._z80.hl.bits))
-        self._update_flags(nth_bit, register)
+        self._update_flags(nth_bit, self._z80.ram.read(self._z80.hl.bits))
 
 
 class BitTestIndirectIX(BitTest):
@@ -90,8 +82,7 @@ class BitTestIndirectIX(BitTest):
 
     def _instruction_logic(self, offset, nth_bit):
         address = self._z80.ix.bits + offset
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        self._update_flags(nth_bit, register)
+        self._update_flags(nth_bit, self._z80.ram.read(address))
 
 
 class BitTestIndirectIY(BitTest):
@@ -104,8 +95,7 @@ class BitTestIndirectIY(BitTest):
 
     def _instruction_logic(self, offset, nth_bit):
         address = self._z80.iy.bits + offset
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        self._update_flags(nth_bit, register)
+        self._update_flags(nth_bit, self._z80.ram.read(address))
 
 
 """ SET instructions. """
@@ -133,9 +123,7 @@ class BitSetIndirectHL(BitTest):
         return 'SET {:}, (HL)'.format(nth_bit)
 
     def _instruction_logic(self, nth_bit):
-        register = Z80ByteRegister(bits=self._z80.ram.read(self._z80.hl.bits))
-        register.set_nth_bit(nth_bit)
-        self._z80.ram.write(self._z80.hl.bits, register.bits)
+        self._z80.ram.write(self._z80.hl.bits, self._z80.ram.read(self._z80.hl.bits) | (0x01 << nth_bit))
 
 
 class BitSetIndirectIX(BitSetIndirectHL):
@@ -148,9 +136,7 @@ class BitSetIndirectIX(BitSetIndirectHL):
 
     def _instruction_logic(self, offset, nth_bit):
         address = self._z80.ix.bits + offset
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register.set_nth_bit(nth_bit)
-        self._z80.ram.write(address, register.bits)
+        self._z80.ram.write(address, self._z80.ram.read(address) | (0x01 << nth_bit))
 
 
 class BitSetIndirectIY(BitSetIndirectHL):
@@ -163,9 +149,7 @@ class BitSetIndirectIY(BitSetIndirectHL):
 
     def _instruction_logic(self, offset, nth_bit):
         address = self._z80.iy.bits + offset
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register.set_nth_bit(nth_bit)
-        self._z80.ram.write(address, register.bits)
+        self._z80.ram.write(address, self._z80.ram.read(address) | (0x01 << nth_bit))
 
 
 class BitSetIndirectIXR(BitTest):
@@ -227,9 +211,7 @@ class BitResetIndirectHL(BitTest):
         return 'RES {:}, (HL)'.format(nth_bit)
 
     def _instruction_logic(self, nth_bit):
-        register = Z80ByteRegister(bits=self._z80.ram.read(self._z80.hl.bits))
-        register.reset_nth_bit(nth_bit)
-        self._z80.ram.write(self._z80.hl.bits, register.bits)
+        self._z80.ram.write(self._z80.hl.bits, self._z80.ram.read(self._z80.hl.bits) & ~(0x01 << nth_bit))
 
 
 class BitResetIndirectIX(BitResetIndirectHL):
@@ -242,9 +224,7 @@ class BitResetIndirectIX(BitResetIndirectHL):
 
     def _instruction_logic(self, offset, nth_bit):
         address = self._z80.ix.bits + offset
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register.reset_nth_bit(nth_bit)
-        self._z80.ram.write(address, register.bits)
+        self._z80.ram.write(address, self._z80.ram.read(address) & ~(0x01 << nth_bit))
 
 
 class BitResetIndirectIY(BitResetIndirectHL):
@@ -257,6 +237,4 @@ class BitResetIndirectIY(BitResetIndirectHL):
 
     def _instruction_logic(self, offset, nth_bit):
         address = self._z80.iy.bits + offset
-        register = Z80ByteRegister(bits=self._z80.ram.read(address))
-        register.reset_nth_bit(nth_bit)
-        self._z80.ram.write(address, register.bits)
+        self._z80.ram.write(address, self._z80.ram.read(address) & ~(0x01 << nth_bit))
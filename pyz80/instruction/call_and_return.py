@@ -22,6 +22,7 @@ Copyright 2014 Lucas Liendo.
 from re import compile as compile_re
 from . import Instruction
 from abc_jump import Jp
+from ..timing import TStates
 
 
 class CallNN(Instruction):
@@ -51,7 +52,8 @@ class CallCCNN(CallNN, Jp):
 
     def _instruction_logic(self, selector, high_order_byte, low_order_byte):
         if self._condition_applies(selector):
-            super(self, CallCCNN)._instruction_logic(high_order_byte, low_order_byte)
+            super(CallCCNN, self)._instruction_logic(high_order_byte, low_order_byte)
+            self._z80.cycles += TStates.TAKEN_CALL
 
 
 class Ret(Instruction):
@@ -73,12 +75,13 @@ class RetCC(Ret, Jp):
 
     regexp = compile_re('^11((?:0|1){3})000$')
 
-    def _instruction_logic(self, selector):
+    def _message_log(self, selector):
         return 'RET {:02X}'.format(selector)
 
     def _instruction_logic(self, selector):
         if self._condition_applies(selector):
-            super(self, RetCC)._instruction_logic()
+            super(RetCC, self)._instruction_logic()
+            self._z80.cycles += TStates.TAKEN_RET
 
 
 class Reti(Ret):
@@ -90,8 +93,8 @@ class Reti(Ret):
         return 'RETI'
 
     def _instruction_logic(self):
-        super(self, Reti)._instruction_logic()
-        self._z80.iff1 = self._z80.iff2
+        super(Reti, self)._instruction_logic()
+        self._z80.interrupt_manager.restore_iff1()
 
 
 class Retn(Reti):
@@ -20,10 +20,10 @@ Copyright 2014 Lucas Liendo.
 """
 
 from re import compile as compile_re
-from . import Instruction, NotImplemented
+from . import Instruction
+from ..alu import ALUDecimalAdjust
 
 
-# TODO: Implement !
 class Daa(Instruction):
     """ DAA """
 
@@ -32,11 +32,11 @@ class Daa(Instruction):
     def _message_log(self):
         return 'DAA'
 
-    def _update_flags(self):
-        pass
-
     def _instruction_logic(self):
-        raise NotImplemented
+        nhc = ALUDecimalAdjust.nhc(self._z80.f.bits)
+        entry = ALUDecimalAdjust.table(ALUDecimalAdjust.DAA)[(nhc << 8) | self._z80.a.bits]
+        self._z80.a.bits = entry & 0xFF
+        self._z80.f.bits = entry >> 8
 
 
 class Cpl(Instruction):
@@ -65,8 +65,7 @@ class Neg(Instruction):
         return 'NEG'
 
     def _update_flags(self, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
+        self._update_sz_flags(instruction_result)
         self._update_half_carry_flag(self._z80.a.bits.lower)
         self._update_overflow_flag(self._z80.a.bits)
         self._update_carry_flag(self._z80.a.bits)
@@ -162,7 +161,7 @@ class Di(Instruction):
         return 'DI'
 
     def _instruction_logic(self):
-        self._z80.iff1, self._z80.iff2 = 0x00, 0x00
+        self._z80.interrupt_manager.disable_interrupts()
 
 
 class Ei(Instruction):
@@ -174,7 +173,7 @@ class Ei(Instruction):
         return 'EI'
 
     def _instruction_logic(self):
-        self._z80.iff1, self._z80.iff2 = 0x01, 0x01
+        self._z80.interrupt_manager.enable_interrupts()
 
 
 class Im0(Instruction):
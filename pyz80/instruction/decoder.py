@@ -19,6 +19,7 @@ along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
 Copyright 2014 Lucas Liendo.
 """
 
+from re import compile as compile_re
 from ..arch import BYTE_SIZE
 from .load_8_bit import *
 from .load_16_bit import *
@@ -39,9 +40,23 @@ class InvalidInstructionError(Exception):
 
 # TODO: Ld all classes using the ClassLder ?
 class InstructionDecoder(object):
+
+    # Matches every operand group of an instruction regexp.
+    _operand_group_regexp = compile_re(r'\(\(\?:0\|1\)\{(\d+)\}\)')
+
+    # Dispatch tables don't depend on any cpu, so they are built
+    # (and checked) only once and shared among all decoders.
+    _dispatch_tables = None
+
     def __init__(self, z80):
         self._z80 = z80
         self._instructions = self._z80_instructions()
+        self._handlers = {}
+
+        if InstructionDecoder._dispatch_tables is None:
+            dispatch_tables = self._build_dispatch_tables()
+            self._check_operand_extractors(dispatch_tables)
+            InstructionDecoder._dispatch_tables = dispatch_tables
 
     def _8_bit_load_instructions(self):
         return [
@@ -108,6 +123,10 @@ class InstructionDecoder(object):
             Ldir,
             Ldd,
             Lddr,
+            Cpi,
+            Cpir,
+            Cpd,
+            Cpdr,
         ]
 
     def _8_bit_arithmetic_instructions(self):
@@ -353,19 +372,205 @@ class InstructionDecoder(object):
         n = self._bytes_to_int(bytes)
         return bin(n).lstrip('0b').zfill(len(bytes) * BYTE_SIZE)
 
+    def _bit_template(self, Instruction):
+        """
+        Translates an instruction regexp into a bit template where
+        every operand bit is replaced by an 'x'.
+        E.g.
+            Given '^01((?:0|1){3})110$'
+            then this method will return
+            01xxx110
+        """
+
+        pattern = Instruction.regexp.pattern.strip('^$')
+        return self._operand_group_regexp.sub(lambda m: 'x' * int(m.group(1)), pattern)
+
+    def _matching_bytes(self, byte_template):
+        """
+        Returns all bytes that match an 8 bit template.
+        """
+
+        mask = int(byte_template.replace('0', '1').replace('x', '0'), base=2)
+        value = int(byte_template.replace('x', '0'), base=2)
+        return [byte for byte in range(0x00, 0xFF + 1) if (byte & mask) == value]
+
+    def _dispatch_key(self, opcode):
+        """
+        Returns the prefix and the byte that select an opcode's
+        instruction within the dispatch tables.
+        E.g.
+            Given [0xDD, 0xCB, 0x05, 0x06]
+            then this method will return
+            ((0xDD, 0xCB), 0x06)
+        """
+
+        first_byte = opcode[0]
+
+        if first_byte in (0xCB, 0xED):
+            return (first_byte,), opcode[1]
+
+        if first_byte in (0xDD, 0xFD):
+            if len(opcode) == 4 and opcode[1] == 0xCB:
+                return (first_byte, 0xCB), opcode[3]
+
+            return (first_byte,), opcode[1]
+
+        return (), first_byte
+
+    def _check_dispatch_bytes(self, byte_templates, dispatch_key_bytes):
+        """
+        Checks that an instruction only fixes bits in the bytes that
+        select it within the dispatch tables, as all other bytes are
+        not looked at when an opcode is dispatched.
+        """
+
+        for n, byte_template in enumerate(byte_templates):
+            if (n not in dispatch_key_bytes) and (byte_template != 'x' * BYTE_SIZE):
+                raise InvalidInstructionError(
+                    'Error - Byte {0} of template {1} can\'t be dispatched.'.format(n, ''.join(byte_templates))
+                )
+
+    def _dispatch_keys(self, Instruction):
+        """
+        Yields every (prefix, byte) pair under which an instruction
+        is reachable. This mirrors _dispatch_key() over all opcodes
+        the instruction regexp matches.
+        """
+
+        bit_template = self._bit_template(Instruction)
+        byte_templates = [bit_template[i:i + BYTE_SIZE] for i in range(0, len(bit_template), BYTE_SIZE)]
+        length = len(byte_templates)
+
+        for first_byte in self._matching_bytes(byte_templates[0]):
+            if length == 1 or first_byte not in (0xCB, 0xED, 0xDD, 0xFD):
+                self._check_dispatch_bytes(byte_templates, [0])
+                yield (), first_byte
+                continue
+
+            for second_byte in self._matching_bytes(byte_templates[1]):
+                if first_byte in (0xDD, 0xFD) and length == 4 and second_byte == 0xCB:
+                    self._check_dispatch_bytes(byte_templates, [0, 1, 3])
+
+                    for fourth_byte in self._matching_bytes(byte_templates[3]):
+                        yield (first_byte, 0xCB), fourth_byte
+                else:
+                    self._check_dispatch_bytes(byte_templates, [0, 1])
+                    yield (first_byte,), second_byte
+
+    def _operand_extractors(self, Instruction):
+        """
+        Compiles the operand groups of an instruction regexp into
+        (byte index, shift, mask) extractors.
+        E.g.
+            Given '^01((?:0|1){3})110$'
+            then this method will return
+            [(0, 3, 0b111)]
+        """
+
+        operand_extractors = []
+        bit_template = self._bit_template(Instruction)
+        pattern = Instruction.regexp.pattern.strip('^$')
+        bit_position = 0
+
+        for match in self._operand_group_regexp.finditer(pattern):
+            bit_position = bit_template.index('x', bit_position)
+            operand_size = int(match.group(1))
+            byte_index = bit_position / BYTE_SIZE
+            shift = BYTE_SIZE - (bit_position % BYTE_SIZE) - operand_size
+
+            if shift < 0:
+                raise InvalidInstructionError(
+                    'Error - An operand of {0} spans more than one byte.'.format(Instruction.__name__)
+                )
+
+            operand_extractors.append((byte_index, shift, (1 << operand_size) - 1))
+            bit_position += operand_size
+
+        return operand_extractors
+
+    def _build_dispatch_tables(self):
+        """
+        Builds one 256 entry table per prefix (unprefixed, CB, ED, DD, FD,
+        DDCB and FDCB). Each entry maps an opcode length to its instruction
+        and its operand extractors. Instructions are registered in order so,
+        as in a sequential scan, the last instruction matching an opcode wins.
+        """
+
+        prefixes = [(), (0xCB,), (0xED,), (0xDD,), (0xFD,), (0xDD, 0xCB), (0xFD, 0xCB)]
+        dispatch_tables = dict((prefix, [{} for _ in range(0x00, 0xFF + 1)]) for prefix in prefixes)
+
+        for Instruction in self._instructions:
+            length = len(self._bit_template(Instruction)) / BYTE_SIZE
+            operand_extractors = self._operand_extractors(Instruction)
+
+            for prefix, byte in self._dispatch_keys(Instruction):
+                dispatch_tables[prefix][byte][length] = (Instruction, operand_extractors)
+
+        return dispatch_tables
+
+    def _sample_opcode(self, prefix, byte, length, operand_byte):
+        """
+        Builds an opcode that is dispatched through the given prefix
+        table entry, filling all operand bytes with operand_byte.
+        """
+
+        if len(prefix) == 2:
+            return [prefix[0], prefix[1], operand_byte, byte]
+
+        opcode = list(prefix) + [byte]
+        return opcode + [operand_byte] * (length - len(opcode))
+
+    def _check_operand_extractors(self, dispatch_tables):
+        """
+        Checks that the operand extractors of every dispatched opcode
+        give the same operands as matching the instruction regexp.
+        """
+
+        for prefix, dispatch_table in dispatch_tables.iteritems():
+            for byte, instructions in enumerate(dispatch_table):
+                for length, (Instruction, operand_extractors) in instructions.iteritems():
+                    for operand_byte in [0x00, 0xFF, 0xA5, 0x5A]:
+                        opcode = self._sample_opcode(prefix, byte, length, operand_byte)
+
+                        if self._extract_operands(operand_extractors, opcode) != self._get_operands(Instruction, opcode):
+                            raise InvalidInstructionError(
+                                'Error - Operand extractors of {0} don\'t match its regexp.'.format(Instruction.__name__)
+                            )
+
+    def _lookup(self, opcode):
+        prefix, byte = self._dispatch_key(opcode)
+        return self._dispatch_tables[prefix][byte][len(opcode)]
+
     def _get_instruction(self, opcode):
-        return filter(lambda I: I.regexp.match(self._translate(opcode)), self._instructions).pop()
+        Instruction, _ = self._lookup(opcode)
+        return Instruction
 
     def _get_operands(self, Instruction, opcode):
         return map(lambda s: int(s, base=2), Instruction.regexp.match(self._translate(opcode)).groups())
 
+    def _extract_operands(self, operand_extractors, opcode):
+        return [(opcode[n] >> shift) & mask for n, shift, mask in operand_extractors]
+
+    def _get_handler(self, Instruction):
+        """
+        Returns the instance bound to this decoder's cpu that executes
+        all opcodes of an instruction. Instructions keep no state between
+        executions, so a single instance is built the first time it is needed.
+        """
+
+        try:
+            return self._handlers[Instruction]
+        except KeyError:
+            handler = self._handlers[Instruction] = Instruction(self._z80)
+            return handler
+
     def decode(self, opcode):
         try:
-            Instruction = self._get_instruction(opcode)
-        except IndexError:
+            Instruction, operand_extractors = self._lookup(opcode)
+        except (IndexError, KeyError):
             invalid_instruction = ' '.join('{:02X}'.format(byte) for byte in opcode)
             raise InvalidInstructionError(
                 'Error - Invalid instruction: {0}.'.format(invalid_instruction)
             )
 
-        return Instruction(self._z80), self._get_operands(Instruction, opcode)
+        return self._get_handler(Instruction), self._extract_operands(operand_extractors, opcode)
@@ -20,9 +20,8 @@ Copyright 2014 Lucas Liendo.
 """
 
 from re import compile as compile_re
-from abc_arithmetic_8_bit import Cp8Bit
-from abc_exchange_and_transfer import Exchange
-from . import Instruction
+from abc_exchange_and_transfer import Exchange, BlockTransfer
+from ..alu import ALU8Bit
 
 
 class Ex(Exchange):
@@ -46,8 +45,7 @@ class ExAFAF_(Exchange):
         return 'EX AF, AF'
 
     def _instruction_logic(self):
-        self._swap_registers(self._z80.a, self._z80.a_)
-        self._swap_registers(self._z80.f, self._z80.f_)
+        self._z80.registers.exchange(['af'], ['af_'])
 
 
 class Exx(Exchange):
@@ -59,9 +57,7 @@ class Exx(Exchange):
         return 'EXX'
 
     def _instruction_logic(self):
-        self._swap_registers(self._z80.bc, self._z80.bc_)
-        self._swap_registers(self._z80.de, self._z80.de_)
-        self._swap_registers(self._z80.hl, self._z80.hl_)
+        self._z80.registers.exchange(['bc', 'de', 'hl'], ['bc_', 'de_', 'hl_'])
 
 
 class ExIndirectSPHL(Exchange):
@@ -100,7 +96,7 @@ class ExIndirectSPIY(Exchange):
         self._swap_register_with_ram_word(self._z80.sp.bits, self._z80.iy)
 
 
-class Ldi(Instruction):
+class Ldi(BlockTransfer):
     """ LDI """
 
     regexp = compile_re('^1110110110100000$')
@@ -113,7 +109,7 @@ class Ldi(Instruction):
 
     def _update_flags(self):
         self._z80.f.reset_half_carry_flag()
-        self._update_parity_flag(self._z80.bc.bits - 1)
+        self._update_parity_flag(self._z80.bc.bits)
         self._z80.f.reset_add_substract_flag()
 
     def _move_byte(self):
@@ -140,11 +136,23 @@ class Ldir(Ldi):
         self._z80.f.reset_parity_flag()
         self._z80.f.reset_add_substract_flag()
 
-    def _instruction_logic(self):
-        while self._z80.bc.bits > 0x00:
-            self._move_byte()
+    def _move_bytes(self, length):
+        source, destination = self._z80.hl.bits, self._z80.de.bits
+
+        if self._bulk_range(source, length) and self._bulk_range(destination, length):
+            self._transfer_up(source, destination, length)
+            self._z80.hl.bits += length
+            self._z80.de.bits += length
+            self._z80.bc.bits = 0x00
+        else:
+            for _ in range(length):
+                self._move_byte()
 
+    def _instruction_logic(self):
+        length = self._block_length()
+        self._move_bytes(length)
         self._update_flags()
+        self._add_repeat_cycles(length)
 
 
 class Ldd(Ldi):
@@ -179,14 +187,26 @@ class Lddr(Ldd):
         self._z80.f.reset_parity_flag()
         self._z80.f.reset_add_substract_flag()
 
-    def _instruction_logic(self):
-        while self._z80.bc.bits > 0x00:
-            self._move_byte()
+    def _move_bytes(self, length):
+        source, destination = self._z80.hl.bits, self._z80.de.bits
+
+        if self._bulk_range(source - length + 1, length) and self._bulk_range(destination - length + 1, length):
+            self._transfer_down(source, destination, length)
+            self._z80.hl.bits -= length
+            self._z80.de.bits -= length
+            self._z80.bc.bits = 0x00
+        else:
+            for _ in range(length):
+                self._move_byte()
 
+    def _instruction_logic(self):
+        length = self._block_length()
+        self._move_bytes(length)
         self._update_flags()
+        self._add_repeat_cycles(length)
 
 
-class Cpi(Cp8Bit):
+class Cpi(BlockTransfer):
     """ CPI """
 
     regexp = compile_re('^1110110110100001$')
@@ -194,23 +214,27 @@ class Cpi(Cp8Bit):
     def _message_log(self):
         return 'CPI'
 
-    def _update_flags(self, operands, instruction_result):
-        self._update_sign_flag(instruction_result)
-        self._update_zero_flag(instruction_result)
-        self._update_half_carry_flag(instruction_result)
-        self._update_overflow_flag(operands)
-        self._z80.f.set_add_substract_flag()
+    def _update_flags(self, operands):
+        """
+        S, Z & H come from A - (HL), P/V is set while BC isn't zero and C
+        is left untouched.
+        """
+        f = self._z80.f
+        _, flags = ALU8Bit.execute(ALU8Bit.SUB, *operands)
+        parity = f.PARITY_MASK if self._z80.bc.bits else 0x00
+        f.bits = (flags & (f.SZ_MASK | f.HALF_CARRY_MASK)) | f.ADD_MASK | parity | (f.bits & f.CARRY_MASK)
 
-    def _compare(self, operands):
-        cp_result = reduce(lambda n, m: n - m, operands)
-        self._z80.hl.bits += 1
+    def _step(self):
+        return 1
+
+    def _compare(self):
+        operands = [self._z80.a.bits, self._z80.ram.read(self._z80.hl.bits)]
+        self._z80.hl.bits += self._step()
         self._z80.bc.bits -= 1
-        return cp_result
+        return operands
 
     def _instruction_logic(self):
-        operands = [self._z80.a.bits, self._z80.ram.read(self._z80.hl.bits)]
-        instruction_result = self._compare(operands)
-        self._update_flags(operands, instruction_result)
+        self._update_flags(self._compare())
 
 
 class Cpir(Cpi):
@@ -221,12 +245,41 @@ class Cpir(Cpi):
     def _message_log(self):
         return 'CPIR'
 
-    def _instruction_logic(self):
-        while self._z80.bc.bits > 0x00 and (self._z80.a.bits != self._z80.ram.read(self._z80.hl.bits)):
-            operands = [self._z80.a.bits, self._z80.ram.read(self._z80.hl.bits)]
-            instruction_result = self._compare(operands)
+    def _search(self, length):
+        """
+        Returns how many bytes get compared until A is found (or length
+        if it isn't) and the last compared byte.
+        """
+        data = self._z80.ram.dump(self._z80.hl.bits, length)
+        index = data.find(chr(self._z80.a.bits))
+        repetitions = length if index < 0x00 else index + 1
+
+        return repetitions, data[repetitions - 1]
 
-        self._update_flags(operands, instruction_result)
+    def _search_range(self, length):
+        return self._z80.hl.bits, length
+
+    def _compare_bytes(self, length):
+        if self._bulk_range(*self._search_range(length)):
+            repetitions, n = self._search(length)
+            self._z80.hl.bits += repetitions * self._step()
+            self._z80.bc.bits -= repetitions
+            return repetitions, [self._z80.a.bits, n]
+
+        repetitions = 0x00
+
+        while True:
+            operands = self._compare()
+            repetitions += 1
+
+            if (self._z80.bc.bits == 0x00) or (operands[0] == operands[1]):
+                return repetitions, operands
+
+    def _instruction_logic(self):
+        length = self._block_length()
+        repetitions, operands = self._compare_bytes(length)
+        self._update_flags(operands)
+        self._add_repeat_cycles(repetitions)
 
 
 class Cpd(Cpi):
@@ -237,14 +290,11 @@ class Cpd(Cpi):
     def _message_log(self):
         return 'CPD'
 
-    def _compare(self, operands):
-        cp_result = reduce(lambda n, m: n - m, operands)
-        self._z80.hl.bits -= 1
-        self._z80.bc.bits -= 1
-        return cp_result
+    def _step(self):
+        return -1
 
 
-class Cpdr(Cpd):
+class Cpdr(Cpir):
     """ CPDR """
 
     regexp = compile_re('^1110110110111001$')
@@ -252,9 +302,15 @@ class Cpdr(Cpd):
     def _message_log(self):
         return 'CPDR'
 
-    def _instruction_logic(self):
-        while self._z80.bc.bits > 0x00 and (self._z80.a.bits != self._z80.ram.read(self._z80.hl.bits)):
-            operands = [self._z80.a.bits, self._z80.ram.read(self._z80.hl.bits)]
-            instruction_result = self._compare(operands)
+    def _step(self):
+        return -1
+
+    def _search(self, length):
+        data = self._z80.ram.dump(self._z80.hl.bits - length + 1, length)
+        index = data.rfind(chr(self._z80.a.bits))
+        repetitions = length if index < 0x00 else length - index
+
+        return repetitions, data[length - repetitions]
 
-        self._update_flags(operands, instruction_result)
+    def _search_range(self, length):
+        return self._z80.hl.bits - length + 1, length
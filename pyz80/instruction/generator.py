@@ -0,0 +1,645 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from inspect import getsource
+from types import CodeType, FunctionType
+from textwrap import dedent
+from re import compile as compile_re
+from .decoder import InvalidInstructionError
+
+
+class HandlerGeneratorError(Exception):
+    pass
+
+
+class HandlerGenerator(object):
+
+    """
+    Generates a flat module with one function per opcode encoding, the
+    encoding being an instruction with all of its selectors (every operand
+    narrower than a byte) fixed. Only byte wide operands (n, d, nn) are
+    left as arguments of the generated functions.
+
+    Each function is the body of its instruction's _instruction_logic()
+    specialized for the encoding : calls to the _instruction_logic() of base
+    classes are inlined, selectors are replaced by their values, calls to
+    selector methods (e.g. _select_register()) are resolved at generation
+    time and cpu registers are bound once when the module is built. Whenever
+    a body can't be specialized the function just calls the reference
+    instruction.
+
+    The instruction classes remain the reference implementation. Generated
+    functions don't log, so they aren't used while tracing.
+    """
+
+    _register_names = [
+        'a', 'f', 'b', 'c', 'd', 'e', 'h', 'l', 'i', 'r',
+        'ixh', 'ixl', 'iyh', 'iyl', 'bc', 'de', 'hl', 'sp', 'pc', 'ix', 'iy',
+        'a_', 'f_', 'bc_', 'de_', 'hl_',
+    ]
+
+    _super_regexp = compile_re(r'super\((\w+), self\)\.(\w+)')
+    _super_call_regexp = compile_re(r'^(\s*)(?:([\w\.]+) = )?super\((\w+), self\)\.(\w+)\((.*)\)$')
+    _selector_call_regexp = compile_re(r'self\.(_\w*select\w*)\((\w+)\)')
+    _string_regexp = compile_re(r'''('[^'\\]*(?:\\.[^'\\]*)*'|"[^"\\]*(?:\\.[^"\\]*)*")''')
+    _name_regexp = compile_re(r'^\w+$')
+    _dotted_name_regexp = compile_re(r'^[\w\.]+$')
+    _keyword_argument_regexp = compile_re(r'^\w+\s*=[^=]')
+    _return_regexp = compile_re(r'^\s*return\b')
+    _alias_regexp = compile_re(r'^(\w+) = (reg_\w+|ram|\d+|0x[0-9A-Fa-f]+)$')
+    _z80_attribute_regexp = compile_re(r'self\._z80\.(\w+)')
+    _self_regexp = compile_re(r'\bself\b')
+
+    _module_source = None
+    _module_code = None
+    _function_bodies = None
+
+    def __init__(self, instruction_decoder):
+        self._instruction_decoder = instruction_decoder
+        self._z80 = instruction_decoder._z80
+        self._generated_handlers = None
+        self._namespace = None
+
+    def _function_name(self, prefix, byte, length):
+        return 'op_{0}_len{1}'.format('_'.join('{:02x}'.format(b) for b in prefix + (byte,)), length)
+
+    def _encodings(self):
+        """
+        Yields every dispatched encoding as a (dispatch key, instruction,
+        operand extractors, operands) tuple. Selector operands take the
+        values of the encoding, byte wide operands are None.
+        """
+
+        for prefix, dispatch_table in sorted(self._instruction_decoder._dispatch_tables.iteritems()):
+            for byte, instructions in enumerate(dispatch_table):
+                for length, (Instruction, operand_extractors) in sorted(instructions.iteritems()):
+                    opcode = self._instruction_decoder._sample_opcode(prefix, byte, length, 0x00)
+                    operands = [
+                        None if mask == 0xFF else operand
+                        for (_, _, mask), operand in zip(operand_extractors, self._instruction_decoder._extract_operands(operand_extractors, opcode))
+                    ]
+
+                    yield (prefix, byte, length), Instruction, operand_extractors, operands
+
+    def _code_sub(self, regexp, replacement, line):
+        """ Applies a substitution to a line leaving its string literals untouched. """
+
+        segments = self._string_regexp.split(line)
+        segments[::2] = [regexp.sub(replacement, segment) for segment in segments[::2]]
+        return ''.join(segments)
+
+    def _name_regexp_for(self, name):
+        """
+        Matches a name unless it is an attribute or a keyword argument.
+        Assignments to the name are matched as they start a statement.
+        """
+
+        return compile_re(
+            r'(?<![\.\w]){0}\b(?!\s*=[^=])|^(\s*(?:[\w\.]+\s*,\s*)*){0}\b(?=\s*=[^=])'.format(name)
+        )
+
+    def _replace_name(self, name, replacement, line):
+        return self._code_sub(self._name_regexp_for(name), lambda m: (m.group(1) or '') + replacement, line)
+
+    def _bracket_depth(self, line):
+        code = ''.join(self._string_regexp.split(line)[::2])
+        return sum(code.count(c) for c in '([{') - sum(code.count(c) for c in ')]}')
+
+    def _logical_lines(self, lines):
+        """
+        Joins the physical lines of every statement and drops comments and
+        blank lines.
+        """
+
+        logical_lines = []
+        statement, depth = None, 0
+
+        for line in lines:
+            segments = self._string_regexp.split(line)
+
+            for n in range(0, len(segments), 2):
+                if '#' in segments[n]:
+                    segments = segments[:n] + [segments[n].split('#')[0]]
+                    break
+
+            line = ''.join(segments).rstrip()
+            continued = line.endswith('\\')
+            line = line.rstrip('\\').rstrip()
+
+            if not line.strip():
+                continue
+
+            if statement is None:
+                statement = line
+            elif statement.endswith(('(', '[', '{')) or line.strip().startswith((')', ']', '}')):
+                statement += line.strip()
+            else:
+                statement += ' ' + line.strip()
+
+            depth += self._bracket_depth(line)
+
+            if depth <= 0 and not continued:
+                logical_lines.append(statement)
+                statement, depth = None, 0
+
+        if statement is not None:
+            raise HandlerGeneratorError('Error - Unbalanced statement : {0}.'.format(statement))
+
+        return logical_lines
+
+    def _method_source(self, function):
+        """
+        Returns the names of the arguments of a method and its dedented body
+        as logical lines.
+        """
+
+        lines = getsource(function).splitlines()
+        definition = lines[0].strip()
+
+        if not definition.endswith(':'):
+            raise HandlerGeneratorError(
+                'Error - Can\'t specialize {0}().'.format(function.__name__)
+            )
+
+        arguments = [a.strip() for a in definition[definition.index('(') + 1:definition.rindex(')')].split(',')]
+        return arguments[1:], self._logical_lines(dedent('\n'.join(lines[1:])).splitlines())
+
+    def _logic_source(self, Instruction):
+        """
+        Returns the class that defines the _instruction_logic() of an
+        instruction, the names of its arguments and its body.
+        """
+
+        for Class in Instruction.__mro__:
+            if '_instruction_logic' in Class.__dict__:
+                break
+
+        arguments, body = self._method_source(Class.__dict__['_instruction_logic'])
+        return Class, arguments, body
+
+    def _super_method(self, Instruction, class_name, method_name):
+        class_names = [C.__name__ for C in Instruction.__mro__]
+
+        if class_name not in class_names:
+            return None
+
+        for Class in Instruction.__mro__[class_names.index(class_name) + 1:]:
+            if method_name in Class.__dict__:
+                method = Class.__dict__[method_name]
+                return method if isinstance(method, FunctionType) else None
+
+        return None
+
+    def _split_arguments(self, arguments):
+        """
+        Splits the arguments of a call, returns None if they aren't
+        balanced or if any of them is a keyword argument.
+        """
+
+        split_arguments, current, depth = [], '', 0
+
+        for n, segment in enumerate(self._string_regexp.split(arguments)):
+            if n % 2:
+                current += segment
+                continue
+
+            for c in segment:
+                depth += 1 if c in '([{' else -1 if c in ')]}' else 0
+
+                if depth < 0:
+                    return None
+
+                if c == ',' and depth == 0:
+                    split_arguments.append(current.strip())
+                    current = ''
+                else:
+                    current += c
+
+        if depth != 0:
+            return None
+
+        if current.strip():
+            split_arguments.append(current.strip())
+
+        if any(self._keyword_argument_regexp.match(a) for a in split_arguments):
+            return None
+
+        return split_arguments
+
+    def _is_reassigned(self, name, body):
+        assignment_regexp = compile_re(
+            r'(?:^\s*|\bfor\s+|,\s*){0}\s*(?:[-+*/%&|^]|<<|>>)?=(?!=)|\bfor\s+{0}\b'.format(name)
+        )
+        return any(assignment_regexp.search(''.join(self._string_regexp.split(l)[::2])) for l in body)
+
+    def _uses(self, name, line):
+        return len(self._name_regexp_for(name).findall(''.join(self._string_regexp.split(line)[::2])))
+
+    def _inline_super_call(self, Instruction, match, functions, counter):
+        """
+        Returns the body of the base class method a super() call statement
+        invokes, with its locals renamed and its arguments bound. Returns
+        None if the call can't be inlined.
+        """
+
+        indentation, target, class_name, method_name, call_arguments = match.groups()
+        call_arguments = self._split_arguments(call_arguments)
+        function = self._super_method(Instruction, class_name, method_name)
+
+        if call_arguments is None or function is None:
+            return None
+
+        try:
+            arguments, body = self._method_source(function)
+        except HandlerGeneratorError:
+            return None
+
+        if len(arguments) != len(call_arguments) or any(a.startswith('*') for a in arguments):
+            return None
+
+        returns = [n for n, line in enumerate(body) if self._return_regexp.match(line)]
+
+        if returns and (returns != [len(body) - 1] or body[-1] != body[-1].lstrip()):
+            return None
+
+        counter[0] += 1
+        code = function.func_code
+        local_names = [n for n in code.co_varnames + code.co_cellvars if n != 'self']
+
+        for name in local_names:
+            body = [self._replace_name(name, '{0}_{1}'.format(name, counter[0]), line) for line in body]
+
+        bindings = []
+
+        for argument, call_argument in zip(arguments, call_arguments):
+            argument = '{0}_{1}'.format(argument, counter[0])
+
+            if self._is_reassigned(argument, body):
+                bindings.append('{0} = {1}'.format(argument, call_argument))
+            elif self._name_regexp.match(call_argument):
+                body = [self._replace_name(argument, call_argument, line) for line in body]
+            elif body and sum(self._uses(argument, line) for line in body) == self._uses(argument, body[0]) == 1:
+                if not call_argument.startswith(('[', '(')) and not self._dotted_name_regexp.match(call_argument):
+                    call_argument = '(' + call_argument + ')'
+
+                body[0] = self._replace_name(argument, call_argument, body[0])
+            else:
+                bindings.append('{0} = {1}'.format(argument, call_argument))
+
+        return_value = None
+
+        if returns:
+            return_value = body.pop()[len('return'):].strip() or None
+
+        if target is not None:
+            body.append('{0} = {1}'.format(target, return_value))
+        elif return_value is not None and not self._dotted_name_regexp.match(return_value):
+            body.append(return_value)
+
+        functions.append(function)
+        body = self._inline_super_calls(Instruction, bindings + body, functions, counter)
+
+        return [indentation + line for line in body] or [indentation + 'pass']
+
+    def _inline_super_calls(self, Instruction, body, functions, counter):
+        inlined_body = []
+
+        for line in body:
+            match = self._super_call_regexp.match(line)
+            inlined_lines = self._inline_super_call(Instruction, match, functions, counter) if match else None
+            inlined_body.extend([line] if inlined_lines is None else inlined_lines)
+
+        return inlined_body
+
+    def _propagate_aliases(self, body):
+        """
+        Replaces locals that are only bound once to a register or a number
+        by their value.
+        """
+
+        n = 0
+
+        while n < len(body):
+            match = self._alias_regexp.match(body[n])
+
+            if match is None or self._is_reassigned(match.group(1), body[:n] + body[n + 1:]):
+                n += 1
+                continue
+
+            name, value = match.groups()
+            body = body[:n] + [self._replace_name(name, value, line) for line in body[n + 1:]]
+
+        return body
+
+    def _register_name(self, register):
+        for register_name in self._register_names:
+            if getattr(self._z80, register_name) is register:
+                return register_name
+
+        return None
+
+    def _resolve_selector_call(self, handler, selectors, match):
+        """
+        Selector methods only depend on their selector, so they are called
+        here and replaced by the register (or number) they return.
+        """
+
+        method_name, argument = match.groups()
+
+        try:
+            selector = selectors[argument] if argument in selectors else int(argument, 0)
+        except ValueError:
+            return match.group(0)
+
+        try:
+            value = getattr(handler, method_name)(selector)
+        except (KeyError, AttributeError, TypeError):
+            return match.group(0)
+
+        if isinstance(value, (int, long)):
+            return repr(value)
+
+        register_name = self._register_name(value)
+
+        if register_name is None:
+            return match.group(0)
+
+        return 'reg_' + register_name
+
+    def _super_name(self, Instruction, super_methods, match):
+        """ Returns the name a super() call that can't be inlined is bound to. """
+
+        class_name, method_name = match.groups()
+
+        if self._super_method(Instruction, class_name, method_name) is None:
+            raise HandlerGeneratorError(
+                'Error - Can\'t resolve super({0}) of {1}.'.format(class_name, Instruction.__name__)
+            )
+
+        return super_methods.setdefault((Instruction, class_name, method_name), 'super_{0}'.format(len(super_methods)))
+
+    def _resolve_z80_attribute(self, match):
+        attribute = match.group(1)
+
+        if attribute in self._register_names:
+            return 'reg_' + attribute
+
+        if attribute == 'ram':
+            return 'ram'
+
+        return 'z80.' + attribute
+
+    def _specialize(self, Instruction, handler_name, operands, super_methods):
+        """
+        Returns the specialized arguments and body of an encoding and the
+        methods its body was taken from or raises HandlerGeneratorError if
+        its _instruction_logic() can't be specialized.
+        """
+
+        try:
+            handler = self._instruction_decoder._get_handler(Instruction)
+        except Exception, e:
+            raise HandlerGeneratorError(
+                'Error - Can\'t build {0} : {1}.'.format(Instruction.__name__, e)
+            )
+
+        Class, arguments, body = self._logic_source(Instruction)
+
+        if len(arguments) != len(operands):
+            raise HandlerGeneratorError(
+                'Error - {0}._instruction_logic() doesn\'t take its operands.'.format(Class.__name__)
+            )
+
+        selectors = dict((a, o) for a, o in zip(arguments, operands) if o is not None)
+        functions = [Class.__dict__['_instruction_logic']]
+        body = self._inline_super_calls(Instruction, body, functions, [0])
+        specialized_body = []
+
+        for line in body:
+            line = self._super_regexp.sub(lambda m: self._super_name(Instruction, super_methods, m), line)
+            line = self._selector_call_regexp.sub(lambda m: self._resolve_selector_call(handler, selectors, m), line)
+            line = self._z80_attribute_regexp.sub(self._resolve_z80_attribute, line)
+            line = self._self_regexp.sub(handler_name, line)
+
+            for argument, value in selectors.iteritems():
+                line = self._replace_name(argument, repr(value), line)
+
+            specialized_body.append(line)
+
+        specialized_arguments = [a for a, o in zip(arguments, operands) if o is None]
+        return specialized_arguments, self._propagate_aliases(specialized_body), functions
+
+    def _fallback(self, Instruction, operands):
+        arguments = ['operand_{0}'.format(n) for n, o in enumerate(operands) if o is None]
+        call_operands = ['operand_{0}'.format(n) if o is None else repr(o) for n, o in enumerate(operands)]
+        body = ['handler({0})._instruction_logic({1})'.format(Instruction.__name__, ', '.join(call_operands))]
+
+        return arguments, body
+
+    def _function_source(self, function_name, arguments, body):
+        return '\n'.join(
+            ['    def {0}({1}):'.format(function_name, ', '.join(arguments))] +
+            ['        ' + line if line else '' for line in body]
+        )
+
+    def _global_names(self, code):
+        names = set(code.co_names)
+
+        for constant in code.co_consts:
+            if isinstance(constant, CodeType):
+                names |= self._global_names(constant)
+
+        return names
+
+    def _module_globals(self, Instruction, function_source, functions, module_globals):
+        """
+        Finds the globals of the instruction modules a specialized function
+        uses (e.g. exceptions) and adds them to module_globals, so they can
+        be imported by the generated module. functions are the methods the
+        specialized function was taken from.
+        """
+
+        try:
+            code = compile(dedent(function_source), '<generated>', 'exec')
+        except SyntaxError:
+            raise HandlerGeneratorError(
+                'Error - Specialized {0} doesn\'t compile.'.format(Instruction.__name__)
+            )
+
+        function_globals = {}
+
+        for function in functions:
+            for name in self._global_names(code) & set(function.func_globals):
+                value = function.func_globals[name]
+
+                if function_globals.get(name, module_globals.get(name, (None, value)))[1] is not value:
+                    raise HandlerGeneratorError(
+                        'Error - Global {0} of {1} is ambiguous.'.format(name, Instruction.__name__)
+                    )
+
+                function_globals[name] = (function.__module__, value)
+
+        module_globals.update(function_globals)
+
+    def generate(self):
+        """
+        Returns the source of the generated module. The module defines a
+        build(z80, handler) function that returns a dictionary mapping every
+        (prefix, byte, length) dispatch key to its generated function and
+        the names the generated functions are bound to.
+        """
+
+        if HandlerGenerator._module_source is not None:
+            return HandlerGenerator._module_source
+
+        classes = set()
+        module_globals = {}
+        handler_names = {}
+        super_methods = {}
+        functions = []
+        function_bodies = {}
+        dispatch_keys = []
+
+        for dispatch_key, Instruction, _, operands in self._encodings():
+            function_name = self._function_name(*dispatch_key)
+            handler_name = 'h_' + Instruction.__name__
+
+            try:
+                arguments, body, logic_functions = self._specialize(Instruction, handler_name, operands, super_methods)
+                function_source = self._function_source(function_name, arguments, body)
+                self._module_globals(Instruction, function_source, logic_functions, module_globals)
+                handler_names[Instruction] = handler_name
+            except HandlerGeneratorError:
+                arguments, body = self._fallback(Instruction, operands)
+                function_source = self._function_source(function_name, arguments, body)
+
+            classes.add(Instruction)
+            functions.append(function_source)
+            function_bodies[dispatch_key] = (arguments, body)
+            dispatch_keys.append((dispatch_key, function_name))
+
+        super_classes = set()
+
+        for (Instruction, class_name, _) in super_methods:
+            super_classes.update(C for C in Instruction.__mro__ if C.__name__ == class_name)
+
+        source = ['# -*- coding: utf-8 -*-', '', '"""', 'Generated by pyz80.instruction.generator. Do not edit.', '"""', '']
+        imports = set((C.__module__, C.__name__) for C in classes | super_classes)
+        imports |= set((module_name, name) for name, (module_name, _) in module_globals.iteritems())
+        source.extend('from {0} import {1}'.format(module_name, name) for module_name, name in sorted(imports))
+        source.extend(['', '', 'def build(z80, handler):'])
+        source.extend('    reg_{0} = z80.{0}'.format(r) for r in self._register_names)
+        source.append('    ram = z80.ram')
+        source.extend(
+            '    {0} = handler({1})'.format(handler_name, Instruction.__name__)
+            for Instruction, handler_name in sorted(handler_names.iteritems(), key=lambda i: i[1])
+        )
+        source.extend(
+            '    {0} = super({1}, {2}).{3}'.format(super_name, class_name, handler_names[Instruction], method_name)
+            for (Instruction, class_name, method_name), super_name in sorted(super_methods.iteritems(), key=lambda s: int(s[1].split('_')[1]))
+            if Instruction in handler_names
+        )
+        source.append('')
+
+        for function_source in functions:
+            source.extend([function_source, ''])
+
+        source.append('    functions = {')
+        source.extend(
+            '        ({0!r}, 0x{1:02X}, {2}): {3},'.format(prefix, byte, length, function_name)
+            for (prefix, byte, length), function_name in dispatch_keys
+        )
+        source.extend(['    }', '', '    return functions, locals()', ''])
+
+        HandlerGenerator._function_bodies = function_bodies
+        HandlerGenerator._module_source = '\n'.join(source)
+        return HandlerGenerator._module_source
+
+    def build(self):
+        """
+        Builds the generated module for the decoder's cpu. Returns a dictionary
+        mapping every dispatch key to its generated function and the operand
+        extractors of its byte wide operands.
+        """
+
+        if HandlerGenerator._module_code is None:
+            HandlerGenerator._module_code = compile(self.generate(), '<generated handlers>', 'exec')
+
+        namespace = {}
+        exec HandlerGenerator._module_code in namespace
+        functions, build_namespace = namespace['build'](self._z80, self._instruction_decoder._get_handler)
+        namespace.update(build_namespace)
+        self._namespace = namespace
+
+        self._generated_handlers = dict(
+            (dispatch_key, (functions[dispatch_key], [e for e in operand_extractors if e[2] == 0xFF]))
+            for dispatch_key, _, operand_extractors, _ in self._encodings()
+        )
+
+        return self._generated_handlers
+
+    def inline(self, dispatch_key, operands, suffix):
+        """
+        Returns the body of the generated function of an encoding with its
+        byte wide operands bound to operands and its locals renamed with
+        suffix, so that the bodies of several encodings can be joined into
+        one function. Bodies run in the namespace of the built module.
+        Returns None if the body may return before its end.
+        """
+
+        arguments, body = HandlerGenerator._function_bodies[dispatch_key]
+
+        if any(self._return_regexp.match(line) for line in body):
+            return None
+
+        code = compile(dedent(self._function_source('inlined', arguments, body)), '<inlined>', 'exec')
+        function_code = [c for c in code.co_consts if isinstance(c, CodeType)][0]
+
+        for name in function_code.co_varnames + function_code.co_cellvars:
+            body = [self._replace_name(name, name + suffix, line) for line in body]
+
+        bindings = []
+
+        for argument, operand in zip(arguments, operands):
+            if self._is_reassigned(argument + suffix, body):
+                bindings.append('{0}{1} = {2!r}'.format(argument, suffix, operand))
+            else:
+                body = [self._replace_name(argument + suffix, repr(operand), line) for line in body]
+
+        return bindings + body
+
+    def decode(self, opcode):
+        """
+        Returns the generated function of an opcode and its byte wide
+        operands.
+        """
+
+        prefix, byte = self._instruction_decoder._dispatch_key(opcode)
+
+        try:
+            generated_handler, operand_extractors = self._generated_handlers[(prefix, byte, len(opcode))]
+        except KeyError:
+            invalid_instruction = ' '.join('{:02X}'.format(b) for b in opcode)
+            raise InvalidInstructionError(
+                'Error - Invalid instruction: {0}.'.format(invalid_instruction)
+            )
+
+        return generated_handler, self._instruction_decoder._extract_operands(operand_extractors, opcode)
@@ -21,6 +21,7 @@ Copyright 2014 Lucas Liendo.
 
 from re import compile as compile_re
 from . import Instruction
+from abc_exchange_and_transfer import BlockTransfer
 from ..register import Z80ByteRegister
 
 
@@ -61,10 +62,8 @@ class InRIndirectC(Instruction):
         return 'IN {:}, (C)'.format(register.bits)
 
     def _update_flags(self, input_byte):
-        self._update_sign_flag(input_byte)
-        self._update_zero_flag(input_byte)
+        self._update_szp_flags(input_byte)
         self._z80.f.reset_half_carry_flag()
-        self._update_parity_flag(input_byte)
         self._z80.f.reset_add_substract_flag()
 
     def _instruction_logic(self, selector):
@@ -105,12 +104,12 @@ class Ini(Instruction):
         return self._carry(input_byte)
 
     def _update_flags(self, input_byte):
-        self._update_sign_flag(self.z80.b.bits)
-        self._update_zero_flag(self.z80.b.bits)
-        self._update_half_carry(input_byte)
+        self._update_sign_flag(self._z80.b.bits)
+        self._update_zero_flag(self._z80.b.bits)
+        self._update_half_carry_flag(input_byte)
         self._update_parity_flag(input_byte)
         self._update_carry_flag(input_byte)
-        self._update_add_substract(input_byte)
+        self._update_add_substract_flag(input_byte)
 
     def _read(self):
         input_byte = self._z80.device_manager.read(self._z80.c.bits)
@@ -125,7 +124,7 @@ class Ini(Instruction):
         self._update_flags(input_byte)
 
 
-class Inir(Ini):
+class Inir(Ini, BlockTransfer):
     """ INIR """
 
     regexp = compile_re('^1110110110110010$')
@@ -136,16 +135,34 @@ class Inir(Ini):
     def _update_flags(self, input_byte):
         self._z80.f.reset_sign_flag()
         self._z80.f.set_zero_flag()
-        self._update_half_carry(input_byte)
+        self._update_half_carry_flag(input_byte)
         self._update_parity_flag(input_byte)
         self._update_carry_flag(input_byte)
-        self._update_add_substract(input_byte)
+        self._update_add_substract_flag(input_byte)
+
+    def _read_bytes(self, length):
+        """
+        Bytes are read from the device one at a time but written to the
+        RAM as a single block.
+        """
+        input_bytes = [self._z80.device_manager.read(self._z80.c.bits) for _ in range(length)]
+        self._z80.ram.load(input_bytes, self._z80.hl.bits)
+        self._z80.hl.bits += length
+        self._z80.b.bits = 0x00
+
+        return input_bytes[-1]
 
     def _instruction_logic(self):
-        while self._z80.b.bits > 0x00:
-            input_byte = self._read()
+        length = self._byte_block_length()
+
+        if self._bulk_range(self._z80.hl.bits, length):
+            input_byte = self._read_bytes(length)
+        else:
+            for _ in range(length):
+                input_byte = self._read()
 
         self._update_flags(input_byte)
+        self._add_repeat_cycles(length)
 
 
 class Ind(Instruction):
@@ -169,12 +186,12 @@ class Ind(Instruction):
         return self._carry(input_byte)
 
     def _update_flags(self, input_byte):
-        self._update_sign_flag(self.z80.b.bits)
-        self._update_zero_flag(self.z80.b.bits)
-        self._update_half_carry(input_byte)
+        self._update_sign_flag(self._z80.b.bits)
+        self._update_zero_flag(self._z80.b.bits)
+        self._update_half_carry_flag(input_byte)
         self._update_parity_flag(input_byte)
         self._update_carry_flag(input_byte)
-        self._update_add_substract(input_byte)
+        self._update_add_substract_flag(input_byte)
 
     def _read(self):
         input_byte = self._z80.device_manager.read(self._z80.c.bits)
@@ -182,12 +199,14 @@ class Ind(Instruction):
         self._z80.hl.bits -= 1
         self._z80.b.bits -= 1
 
+        return input_byte
+
     def _instruction_logic(self):
         input_byte = self._read()
         self._update_flags(input_byte)
 
 
-class Indr(Ind):
+class Indr(Ind, BlockTransfer):
     """ INDR """
 
     regexp = compile_re('^1110110110111010$')
@@ -198,16 +217,19 @@ class Indr(Ind):
     def _update_flags(self, input_byte):
         self._z80.f.reset_sign_flag()
         self._z80.f.set_zero_flag()
-        self._update_half_carry(input_byte)
+        self._update_half_carry_flag(input_byte)
         self._update_parity_flag(input_byte)
         self._update_carry_flag(input_byte)
-        self._update_add_substract(input_byte)
+        self._update_add_substract_flag(input_byte)
 
     def _instruction_logic(self):
-        while self._z80.b.bits > 0x00:
+        repetitions = self._byte_block_length()
+
+        for _ in range(repetitions):
             input_byte = self._read()
 
         self._update_flags(input_byte)
+        self._add_repeat_cycles(repetitions)
 
 
 """ Output instructions. """
@@ -271,12 +293,12 @@ class Outi(Instruction):
         return self._carry(output_byte)
 
     def _update_flags(self, output_byte):
-        self._update_sign_flag(self.z80.b.bits)
-        self._update_zero_flag(self.z80.b.bits)
-        self._update_half_carry(output_byte)
+        self._update_sign_flag(self._z80.b.bits)
+        self._update_zero_flag(self._z80.b.bits)
+        self._update_half_carry_flag(output_byte)
         self._update_parity_flag(output_byte)
         self._update_carry_flag(output_byte)
-        self._update_add_substract(output_byte)
+        self._update_add_substract_flag(output_byte)
 
     def _write(self):
         output_byte = self._z80.ram.read(self._z80.hl.bits)
@@ -291,7 +313,7 @@ class Outi(Instruction):
         self._update_flags(output_byte)
 
 
-class Otir(Outi):
+class Otir(Outi, BlockTransfer):
     """ OTIR """
 
     regexp = compile_re('^1110110110110011$')
@@ -302,16 +324,34 @@ class Otir(Outi):
     def _update_flags(self, output_byte):
         self._z80.f.reset_sign_flag()
         self._z80.f.set_zero_flag()
-        self._update_half_carry(output_byte)
+        self._update_half_carry_flag(output_byte)
         self._update_parity_flag(output_byte)
         self._update_carry_flag(output_byte)
-        self._update_add_substract(output_byte)
+        self._update_add_substract_flag(output_byte)
+
+    def _write_bytes(self, length):
+        """
+        Bytes are read from the RAM as a single block and then written to
+        the device one at a time.
+        """
+        output_bytes = self._z80.ram.dump(self._z80.hl.bits, length)
+        [self._z80.device_manager.write(self._z80.c.bits, output_byte) for output_byte in output_bytes]
+        self._z80.hl.bits += length
+        self._z80.b.bits = 0x00
+
+        return output_bytes[-1]
 
     def _instruction_logic(self):
-        while self._z80.b.bits > 0x00:
-            output_byte = self._write()
+        length = self._byte_block_length()
+
+        if self._bulk_range(self._z80.hl.bits, length):
+            output_byte = self._write_bytes(length)
+        else:
+            for _ in range(length):
+                output_byte = self._write()
 
         self._update_flags(output_byte)
+        self._add_repeat_cycles(length)
 
 
 class Outd(Outi):
@@ -335,7 +375,7 @@ class Outd(Outi):
         self._update_flags(output_byte)
 
 
-class Otdr(Outd):
+class Otdr(Outd, BlockTransfer):
     """ OTDR """
 
     regexp = compile_re('^1110110110111011$')
@@ -344,7 +384,10 @@ class Otdr(Outd):
         return 'OTDR'
 
     def _instruction_logic(self):
-        while self._z80.b.bits > 0x00:
+        repetitions = self._byte_block_length()
+
+        for _ in range(repetitions):
             output_byte = self._write()
 
         self._update_flags(output_byte)
+        self._add_repeat_cycles(repetitions)
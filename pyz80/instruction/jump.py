@@ -22,6 +22,7 @@ Copyright 2014 Lucas Liendo.
 from re import compile as compile_re
 from . import Instruction
 from abc_jump import *
+from ..timing import TStates
 
 
 # TODO: Check if _get_signed_offset is really needed. Check if offset
@@ -78,6 +79,7 @@ class JrSSE(Jp):
         if self._condition_applies(selector):
             #self._z80.pc.bits += self._get_signed_offset(offset)
             self._z80.pc.bits += offset
+            self._z80.cycles += TStates.TAKEN_JR
 
 
 class JpIndirectHL(JpIndirectAddress):
@@ -130,3 +132,4 @@ class DjnzE(Jp):
         if self._z80.b.bits != 0x00:
             #self._z80.pc.bits += self._get_signed_offset(offset)
             self._z80.pc.bits += offset
+            self._z80.cycles += TStates.TAKEN_JR
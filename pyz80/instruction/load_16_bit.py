@@ -78,7 +78,7 @@ class LdHLIndirectNN(Instruction):
 
     def _instruction_logic(self, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
-        self._z80.hl.higher.bits, self._z80.hl.lower.bits = self._z80.ram.read_word(address)
+        self._z80.hl.bits = self._z80.ram.read_word(address)
 
 
 class LdDDIndirectNN(LdRegister16Bit):
@@ -94,7 +94,7 @@ class LdDDIndirectNN(LdRegister16Bit):
     def _instruction_logic(self, selector, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
         register = self._select_register(selector)
-        register.higher.bits, register.lower.bits = self._z80.ram.read_word(address)
+        register.bits = self._z80.ram.read_word(address)
 
 
 class LdIXIndirectNN(Instruction):
@@ -108,7 +108,7 @@ class LdIXIndirectNN(Instruction):
 
     def _instruction_logic(self, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
-        self._z80.ix.higher.bits, self._z80.ix.lower.bits = self._z80.ram.read_word(address)
+        self._z80.ix.bits = self._z80.ram.read_word(address)
 
 
 class LdIYIndirectNN(Instruction):
@@ -122,7 +122,7 @@ class LdIYIndirectNN(Instruction):
 
     def _instruction_logic(self, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
-        self._z80.iy.higher.bits, self._z80.iy.lower.bits = self._z80.ram.read_word(address)
+        self._z80.iy.bits = self._z80.ram.read_word(address)
 
 
 class LdIndirectNNHL(Instruction):
@@ -136,7 +136,7 @@ class LdIndirectNNHL(Instruction):
 
     def _instruction_logic(self, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
-        self._z80.ram.write_word(address, self._z80.h.bits, self._z80.l.bits)
+        self._z80.ram.write_word(address, self._z80.hl.bits)
 
 
 class LdIndirectNNDD(LdRegister16Bit):
@@ -152,7 +152,7 @@ class LdIndirectNNDD(LdRegister16Bit):
     def _instruction_logic(self, selector, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
         register = self._select_register(selector)
-        self._z80.ram.write_word(address, register.higher.bits, register.lower.bits)
+        self._z80.ram.write_word(address, register.bits)
 
 
 class LdIndirectNNIX(Instruction):
@@ -165,7 +165,7 @@ class LdIndirectNNIX(Instruction):
 
     def _instruction_logic(self, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
-        self._z80.ram.write_word(address, self._z80.ix.higher.bits, self._z80.ix.lower.bits)
+        self._z80.ram.write_word(address, self._z80.ix.bits)
 
 
 class LdIndirectNNIY(Instruction):
@@ -179,7 +179,7 @@ class LdIndirectNNIY(Instruction):
 
     def _instruction_logic(self, high_order_byte, low_order_byte):
         address = self._get_address(high_order_byte, low_order_byte)
-        self._z80.ram.write_word(address, self._z80.iy.higher.bits, self._z80.iy.lower.bits)
+        self._z80.ram.write_word(address, self._z80.iy.bits)
 
 
 class LdSPHL(Instruction):
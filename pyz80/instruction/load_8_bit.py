@@ -289,8 +289,7 @@ class LdAI(Instruction):
 
     # TODO: Set parity/overflow flag if iff2 is set.
     def _update_flags(self):
-        self._update_sign_flag(self._z80.a.bits)
-        self._update_zero_flag(self._z80.a.bits)
+        self._update_sz_flags(self._z80.a.bits)
         self._z80.f.reset_half_carry_flag()
         self._z80.f.reset_add_substract_flag()
 
@@ -308,8 +307,7 @@ class LdAR(Instruction):
 
     # TODO: Set parity/overflow flag if iff2 is set.
     def _update_flags(self):
-        self._update_sign_flag(self._z80.a.bits)
-        self._update_zero_flag(self._z80.a.bits)
+        self._update_sz_flags(self._z80.a.bits)
         self._z80.f.reset_half_carry_flag()
         self._z80.f.reset_add_substract_flag()
 
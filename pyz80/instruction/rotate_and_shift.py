@@ -21,6 +21,7 @@ Copyright 2014 Lucas Liendo.
 
 from re import compile as compile_re
 from abc_rotate_and_shift import *
+from ..register import Z80ByteRegister
 
 
 """ RLC instructions. """
@@ -33,14 +34,9 @@ class Rlca(RotateLeftWithCarry):
     def _message_log(self):
         return 'RLCA'
 
-    def _update_sign_flag(register):
-        pass
-
-    def _update_zero_flag(register):
-        pass
-
-    def _update_parity_flag(register):
-        pass
+    def _update_flags(self, flags):
+        f = self._z80.f
+        f.bits = (f.bits & f.SZP_MASK) | (flags & ~f.SZP_MASK)
 
     def _instruction_logic(self):
         super(Rlca, self)._instruction_logic(self._z80.a)
@@ -110,8 +106,11 @@ class RlcIndirectIXR(RlcIndirectAddress):
 
     def _instruction_logic(self, offset, selector):
         address = self._z80.ix.bits + offset
-        register = self._select_register(selector)
-        register.bits = super(RlcIndirectIXR, self)._instruction_logic(address).bits
+        n = super(RlcIndirectIXR, self)._instruction_logic(address)
+
+        # Selector 110 is RLC (IX + d) itself, which has no register to copy to.
+        if selector != 0b110:
+            self._select_register(selector).bits = n
 
 
 class RlcIndirectIYR(RlcIndirectAddress):
@@ -125,8 +124,11 @@ class RlcIndirectIYR(RlcIndirectAddress):
 
     def _instruction_logic(self, offset, selector):
         address = self._z80.iy.bits + offset
-        register = self._select_register(selector)
-        register.bits = super(RlcIndirectIYR, self)._instruction_logic(address).bits
+        n = super(RlcIndirectIYR, self)._instruction_logic(address)
+
+        # Selector 110 is RLC (IY + d) itself, which has no register to copy to.
+        if selector != 0b110:
+            self._select_register(selector).bits = n
 
 
 """ RRC instructions. """
@@ -139,14 +141,9 @@ class Rrca(RotateRightWithCarry):
     def _message_log(self):
         return 'RRCA'
 
-    def _update_sign_flag(register):
-        pass
-
-    def _update_zero_flag(register):
-        pass
-
-    def _update_parity_flag(register):
-        pass
+    def _update_flags(self, flags):
+        f = self._z80.f
+        f.bits = (f.bits & f.SZP_MASK) | (flags & ~f.SZP_MASK)
 
     def _instruction_logic(self):
         super(Rrca, self)._instruction_logic(self._z80.a)
@@ -215,14 +212,9 @@ class Rla(RotateLeftThroughCarry):
     def _message_log(self):
         return 'RLA'
 
-    def _update_sign_flag(register):
-        pass
-
-    def _update_zero_flag(register):
-        pass
-
-    def _update_parity_flag(register):
-        pass
+    def _update_flags(self, flags):
+        f = self._z80.f
+        f.bits = (f.bits & f.SZP_MASK) | (flags & ~f.SZP_MASK)
 
     def _instruction_logic(self):
         super(Rla, self)._instruction_logic(self._z80.a)
@@ -291,14 +283,9 @@ class Rra(RotateRightThroughCarry):
     def _message_log(self):
         return 'RRA'
 
-    def _update_sign_flag(register):
-        pass
-
-    def _update_zero_flag(register):
-        pass
-
-    def _update_parity_flag(register):
-        pass
+    def _update_flags(self, flags):
+        f = self._z80.f
+        f.bits = (f.bits & f.SZP_MASK) | (flags & ~f.SZP_MASK)
 
     def _instruction_logic(self):
         super(Rra, self)._instruction_logic(self._z80.a)
@@ -22,7 +22,9 @@ Copyright 2014 Lucas Liendo.
 
 from abc import ABCMeta, abstractmethod
 from Queue import Queue
-from threading import Thread
+from threading import Thread, Lock
+from ..timing import TStates
+from ..instruction.decoder import InvalidInstructionError
 
 
 class DeviceManagerError(Exception):
@@ -31,8 +33,18 @@ class DeviceManagerError(Exception):
 
 class Device(Thread):
 
+    """
+    Devices may also be mapped into memory by setting memory_address and
+    memory_length and defining read_memory(address) and/or
+    write_memory(address, byte). Those get called from the CPU thread.
+    """
+
     __metaclass__ = ABCMeta
     address = None
+    memory_address = None
+    memory_length = 0x00
+    read_memory = None
+    write_memory = None
 
     def __init__(self, device_manager):
         super(Device, self).__init__()
@@ -50,10 +62,23 @@ class Device(Thread):
     def _write(self, data, block=False, timeout=0):
         self._output.put(data, block, timeout)
 
+    def _nmi(self):
+        self._device_manager.interrupt_manager.nmi()
+
+    def _int(self, data=0xFF):
+        self._device_manager.interrupt_manager.int(data)
+
+    def _schedule(self, cycles, callback):
+        self._device_manager.scheduler.schedule(cycles, callback)
+
 
 class DeviceManager(object):
     def __init__(self):
         self._devices = []
+        self._ram = None
+        self.interrupt_manager = None
+        self.scheduler = None
+        self._memory_mappings = []
 
     def _get_device(self, address):
         try:
@@ -66,35 +91,194 @@ class DeviceManager(object):
         return device
 
     def add(self, device):
-        try:
-            registered_device = self._get_device(device.address)
-        except DeviceManagerError:
-            self._devices.append(device)
-
-        if registered_device:
+        if device.address is not None and [d for d in self._devices if d.address == device.address]:
             raise DeviceManagerError(
                 'Error - A device is already registered at address : {:02X}'.format(device.address)
             )
 
+        self._devices.append(device)
+
+        if device.memory_address is not None:
+            self.map_memory(
+                device.memory_address, device.memory_length,
+                read_handler=device.read_memory, write_handler=device.write_memory
+            )
+
+    def attach_ram(self, ram):
+        self._ram = ram
+        [self._map_pages(*mapping) for mapping in self._memory_mappings]
+
+    def _map_pages(self, address, length, read_handler, write_handler):
+        first_page = address / self._ram.IO_PAGE_SIZE
+        last_page = (address + length - 1) / self._ram.IO_PAGE_SIZE
+
+        for page in range(first_page, last_page + 1):
+            self._ram.map_io_page(page, read_handler=read_handler, write_handler=write_handler)
+
+    def map_memory(self, address, length, read_handler=None, write_handler=None):
+        """
+        Maps the pages covering length bytes starting at address to the
+        given handlers. Mappings are kept, so they also apply to a RAM
+        attached later on.
+        """
+
+        if length <= 0x00:
+            raise DeviceManagerError(
+                'Error - Invalid memory mapping length : {0}.'.format(length)
+            )
+
+        mapping = (address, length, read_handler, write_handler)
+        self._memory_mappings.append(mapping)
+
+        if self._ram is not None:
+            self._map_pages(*mapping)
+
     def read(self, address, block=False, timeout=0):
-        return self._get_device(address).output.get(block, timeout)
+        return self._get_device(address)._output.get(block, timeout)
 
     def write(self, address, data, block=False, timeout=0):
-        self._get_device(address).input.put(data, block, timeout)
+        self._get_device(address)._input.put(data, block, timeout)
 
     def run(self):
         [d.start() for d in self._devices]
         [d.join() for d in self._devices]
 
 
+class InterruptManagerError(Exception):
+    pass
+
+
 class InterruptManager(object):
+
+    """
+    Interrupt requests are latched until the cpu accepts them. The cpu
+    only checks its interrupt_pending flag before every instruction (or
+    translated block), which is set whenever there's a request it may
+    accept, so nothing is spent on interrupts while there are none.
+
+    Requests may come from device threads, so latches are guarded by a
+    lock.
+    """
+
+    NMI_ADDRESS = 0x66
+    IM1_ADDRESS = 0x38
+
     def __init__(self, z80):
-        self._z80
+        self._z80 = z80
+        self._lock = Lock()
+        self._nmi_requested = False
+        self._int_requested = False
+        self._int_data = 0xFF
+        self._ei_pending = False
+
+    @property
+    def int_requested(self):
+        return self._int_requested
 
     def nmi(self):
-        # No state at all is held for non maskable interrupts.
-        pass
+        with self._lock:
+            self._nmi_requested = True
+            self._z80.interrupt_pending = True
 
-    def int(self, address, data):
-        # Maskable interrupts hold a line state.
-        pass
+    def int(self, data=0xFF):
+        """
+        Requests a maskable interrupt, data is the byte the device puts
+        on the data bus: an opcode in IM 0 or the low byte of the vector
+        address in IM 2.
+        """
+        with self._lock:
+            self._int_requested = True
+            self._int_data = data & 0xFF
+            self._update_pending()
+
+    def clear_int(self):
+        with self._lock:
+            self._int_requested = False
+            self._update_pending()
+
+    def _update_pending(self):
+        self._z80.interrupt_pending = \
+            self._nmi_requested or self._ei_pending or (self._int_requested and bool(self._z80.iff1))
+
+    def enable_interrupts(self):
+        """
+        EI. Interrupts are not accepted until the instruction that
+        follows EI has run. The cpu gets a pending interrupt anyway, so
+        process() is called before that instruction and clears the delay.
+        """
+        with self._lock:
+            self._z80.iff1, self._z80.iff2 = 0x01, 0x01
+            self._ei_pending = True
+            self._update_pending()
+
+    def disable_interrupts(self):
+        with self._lock:
+            self._z80.iff1, self._z80.iff2 = 0x00, 0x00
+            self._update_pending()
+
+    def restore_iff1(self):
+        """ RETI & RETN. """
+        with self._lock:
+            self._z80.iff1 = self._z80.iff2
+            self._update_pending()
+
+    def _push_pc(self):
+        z80 = self._z80
+        z80.sp.bits -= 2
+        z80.ram.write_word(z80.sp.bits, z80.pc.bits)
+
+    def _accept_nmi(self):
+        self._nmi_requested = False
+        self._z80.iff1 = 0x00
+        self._push_pc()
+        self._z80.pc.bits = self.NMI_ADDRESS
+        self._z80.cycles += 11
+
+    def _accept_int(self):
+        z80 = self._z80
+        self._int_requested = False
+        z80.iff1, z80.iff2 = 0x00, 0x00
+
+        if z80.im == 0x00:
+            self._execute_im0(self._int_data)
+        elif z80.im == 0x01:
+            self._push_pc()
+            z80.pc.bits = self.IM1_ADDRESS
+            z80.cycles += 13
+        else:
+            self._push_pc()
+            z80.pc.bits = z80.ram.read_word((z80.i.bits << 8) | self._int_data)
+            z80.cycles += 19
+
+    def _execute_im0(self, opcode):
+        """
+        Only single byte opcodes (usually a RST) may be put on the bus.
+        Acknowledging the interrupt takes 2 more T-states.
+        """
+        try:
+            instruction, operands = self._z80._instruction_decoder.decode([opcode])
+        except InvalidInstructionError:
+            raise InterruptManagerError(
+                'Error - Opcode : {:02X} can\'t be executed in interrupt mode 0.'.format(opcode)
+            )
+
+        self._z80.cycles += TStates.of([opcode]) + 2
+        instruction.execute(operands)
+
+    def process(self):
+        """
+        Accepts the pending NMI or, if interrupts are enabled and the
+        instruction that follows EI has been given its turn, the pending
+        maskable interrupt. A halted cpu is resumed.
+        """
+        with self._lock:
+            if self._nmi_requested:
+                self._z80.resume()
+                self._accept_nmi()
+            elif self._ei_pending:
+                self._ei_pending = False
+            elif self._int_requested and self._z80.iff1:
+                self._z80.resume()
+                self._accept_int()
+
+            self._update_pending()
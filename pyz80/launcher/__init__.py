@@ -24,6 +24,9 @@ from ..cli import CLI
 from ..cpu import Z80
 from ..class_loader import ClassLoader
 from ..io import Device
+from ..ram import Ram
+from ..ram.mapped_ram import MappedRam, MappedRamError
+from ..timing import Throttle
 
 
 class PyZ80LauncherError(Exception):
@@ -33,7 +36,7 @@ class PyZ80LauncherError(Exception):
 class PyZ80Launcher(object):
     def __init__(self):
         self._cli = CLI()
-        self._z80_cpu = Z80(trace_fd=self._open_trace())
+        self._z80_cpu = Z80(ram=self._open_ram(), trace_fd=self._open_trace(), throttle=self._build_throttle())
 
     def _open_trace(self):
         trace_fd = None
@@ -43,19 +46,52 @@ class PyZ80Launcher(object):
 
         return trace_fd
 
-    def _read_program(self):
+    def _map_file(self, path, read_only):
         try:
-            with open(self._cli.program_path, 'rb') as fd:
-                program = [ord(opcode) for opcode in fd.read()]
-        except IOError:
+            return MappedRam(path, read_only=read_only)
+        except (IOError, OSError):
             raise PyZ80LauncherError(
-                'Error - File: {0} does not exist.'.format(self._cli.program_path)
+                'Error - File: {0} does not exist.'.format(path)
             )
-        except TypeError:
+        except MappedRamError, e:
+            raise PyZ80LauncherError(str(e))
+
+    def _build_throttle(self):
+        """
+        The clock is given in MHz, without it the cpu runs at full speed.
+        """
+
+        if self._cli.clock is None:
+            return None
+
+        if self._cli.clock <= 0x00:
             raise PyZ80LauncherError(
-                'Error - Invalid program opcode in: {0}.'.format(self._cli.program_path)
+                'Error - {0} is not a valid clock frequency.'.format(self._cli.clock)
             )
 
+        return Throttle(frequency=int(self._cli.clock * 1000000))
+
+    def _open_ram(self):
+        """
+        If a RAM image is given the RAM is mapped from it, so its contents
+        persist across runs.
+        """
+
+        if self._cli.ram_image_path:
+            return self._map_file(self._cli.ram_image_path, read_only=False)
+
+        return Ram()
+
+    def _read_program(self):
+        """
+        The program is mapped read only and copied into the RAM as a
+        single block.
+        """
+
+        program_image = self._map_file(self._cli.program_path, read_only=True)
+        program = program_image.dump()
+        program_image.close()
+
         return program
 
     def _read_address(self):
@@ -25,10 +25,21 @@ class RamInvalidAddress(Exception):
 
 
 class Ram(object):
-    def __init__(self, size=1024 * 64):
+
+    """
+    Memory is kept in a bytearray. Words are stored little endian (lower
+    byte first) and are read & written as ints. Subclasses that keep
+    memory elsewhere pass their own storage instead.
+    """
+
+    IO_PAGE_SIZE = 0x100
+
+    def __init__(self, size=1024 * 64, storage=None):
         self._size = size
-        self._ram = None
-        self.clear()
+        self._ram = bytearray(self._size) if storage is None else storage
+        self._watched_addresses = bytearray(self._size)
+        self._write_watchers = []
+        self._io_pages = {}
 
     @property
     def size(self):
@@ -39,18 +50,100 @@ class Ram(object):
         return self._ram[address]
 
     def read_word(self, address):
-        high_order_byte = self.read(address + 1)
-        low_order_byte = self.read(address)
+        self._check_address(address)
+        self._check_address(address + 1)
+        return self._ram[address] | (self._ram[address + 1] << 8)
 
-        return high_order_byte, low_order_byte
+    def read_bytes(self, address, length):
+        self._check_address(address)
+        self._check_address(address + length - 1)
+        return list(self._ram[address:address + length])
 
     def write(self, address, byte):
         self._check_address(address)
-        self._ram[address] = byte
+        self._ram[address] = byte & 0xFF
+
+        if self._watched_addresses[address]:
+            self._notify_write_watchers(address)
+
+    def write_word(self, address, word):
+        self.write(address, word)
+        self.write(address + 1, word >> 8)
+
+    def add_write_watcher(self, write_watcher):
+        """
+        Registers a callable that gets called with the address of any
+        write that touches a watched address. Watchers are used to drop
+        anything cached from the contents of the RAM.
+        """
+        self._write_watchers.append(write_watcher)
+
+    def watch(self, address, length):
+        for watched_address in range(address, min(address + length, self._size)):
+            self._watched_addresses[watched_address] = 0x01
+
+    def _notify_write_watchers(self, address):
+        for write_watcher in self._write_watchers:
+            write_watcher(address)
+
+    def _notify_range_write_watchers(self, address, length):
+        watched_addresses = self._watched_addresses[address:address + length]
+
+        if watched_addresses.count('\x01'):
+            for offset, watched in enumerate(watched_addresses):
+                if watched:
+                    self._notify_write_watchers(address + offset)
+
+    @property
+    def io_mapped(self):
+        return bool(self._io_pages)
+
+    def map_io_page(self, page, read_handler=None, write_handler=None):
+        """
+        Sends reads and/or writes of a page of IO_PAGE_SIZE bytes to the
+        given handlers, called as read_handler(address) and
+        write_handler(address, byte). As long as no page is mapped the
+        plain accessors are used, once one is, the per access cost for
+        the rest of the pages is a single dict lookup. Bulk operations
+        always go straight to memory.
+        """
+        self._check_range(page * self.IO_PAGE_SIZE, self.IO_PAGE_SIZE)
+        self._io_pages[page] = (read_handler, write_handler)
+        self._install_io_accessors()
+
+    def unmap_io_page(self, page):
+        self._io_pages.pop(page, None)
+
+        if not self._io_pages:
+            [self.__dict__.pop(accessor, None) for accessor in ('read', 'write', 'read_word', 'read_bytes')]
+
+    def _install_io_accessors(self):
+        self.read = self._io_read
+        self.write = self._io_write
+        self.read_word = self._io_read_word
+        self.read_bytes = self._io_read_bytes
+
+    def _io_read(self, address):
+        read_handler, _ = self._io_pages.get(address / self.IO_PAGE_SIZE, (None, None))
+
+        if read_handler is None:
+            return type(self).read(self, address)
+
+        return read_handler(address) & 0xFF
 
-    def write_word(self, address, high_order_byte, low_order_byte):
-        self.write(address + 1, high_order_byte)
-        self.write(address, low_order_byte)
+    def _io_write(self, address, byte):
+        _, write_handler = self._io_pages.get(address / self.IO_PAGE_SIZE, (None, None))
+
+        if write_handler is None:
+            return type(self).write(self, address, byte)
+
+        write_handler(address, byte & 0xFF)
+
+    def _io_read_word(self, address):
+        return self._io_read(address) | (self._io_read(address + 1) << 8)
+
+    def _io_read_bytes(self, address, length):
+        return [self._io_read(address + n) for n in range(length)]
 
     def _check_address(self, address):
         if (address < 0x00) or (address > self._size - 1):
@@ -58,12 +151,82 @@ class Ram(object):
                 'Error - {0} is not a valid RAM address.'.format(address)
             )
 
-    def load(self, opcodes, address=0x00):
+    def _check_range(self, address, length):
         self._check_address(address)
+        self._check_address(address + max(length, 1) - 1)
 
-        for opcode in opcodes:
-            self.write(address, opcode)
-            address += 1
+    def view(self, address=0x00, length=None):
+        """
+        Returns a memoryview over length bytes of the RAM, nothing is
+        copied. Writes through the view are not seen by write watchers.
+        """
+        length = self._size - address if length is None else length
+        self._check_range(address, length)
+        return memoryview(self._ram)[address:address + length]
+
+    def load(self, opcodes, address=0x00):
+        opcodes = bytearray(opcodes)
+        self._check_range(address, len(opcodes))
+        self._ram[address:address + len(opcodes)] = opcodes
+        self._notify_range_write_watchers(address, len(opcodes))
+
+    def dump(self, address=0x00, length=None):
+        """
+        Returns a copy of length bytes of the RAM as a bytearray.
+        """
+        length = self._size - address if length is None else length
+        self._check_range(address, length)
+        return self._ram[address:address + length]
+
+    def fill(self, address, length, byte):
+        self._check_range(address, length)
+        self._ram[address:address + length] = bytearray([byte & 0xFF]) * length
+        self._notify_range_write_watchers(address, length)
+
+    def copy(self, source, destination, length):
+        """
+        Copies length bytes from source to destination as a single block,
+        overlapping areas are copied as if an intermediate buffer was used.
+        """
+        self._check_range(source, length)
+        self._check_range(destination, length)
+        self._ram[destination:destination + length] = self._ram[source:source + length]
+        self._notify_range_write_watchers(destination, length)
 
     def clear(self):
-        self._ram = [0x00 for i in range(0, self._size)]
+        self._notify_range_write_watchers(0x00, self._size)
+        self._ram[:] = bytearray(self._size)
+        self._watched_addresses[:] = bytearray(self._size)
+
+
+class UncheckedRam(Ram):
+
+    """
+    A 64 KB RAM whose single byte & word accesses skip bounds checking,
+    addresses wrap around at 16 bits instead (as they do on a Z80). Bulk
+    operations are still checked.
+    """
+
+    def __init__(self):
+        super(UncheckedRam, self).__init__(size=0xFFFF + 1)
+
+    def read(self, address):
+        return self._ram[address & 0xFFFF]
+
+    def read_word(self, address):
+        return self._ram[address & 0xFFFF] | (self._ram[(address + 1) & 0xFFFF] << 8)
+
+    def read_bytes(self, address, length):
+        address &= 0xFFFF
+
+        if address + length > 0xFFFF + 1:
+            return list(self._ram[address:] + self._ram[:address + length - (0xFFFF + 1)])
+
+        return list(self._ram[address:address + length])
+
+    def write(self, address, byte):
+        address &= 0xFFFF
+        self._ram[address] = byte & 0xFF
+
+        if self._watched_addresses[address]:
+            self._notify_write_watchers(address)
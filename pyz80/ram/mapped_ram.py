@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from os import open as os_open, fdopen, O_RDWR, O_CREAT
+from mmap import mmap, ACCESS_READ, ACCESS_WRITE
+from . import Ram
+
+
+class MappedRamError(Exception):
+    pass
+
+
+class MappedRam(Ram):
+
+    """
+    A RAM backed by an mmap of a file. Read only maps are meant for ROM
+    images, nothing is read into Python and any write fails. Writable
+    maps are extended to size if the file is shorter and every write goes
+    straight to the file (the OS persists it, there's no save step). A
+    missing writable image is created.
+
+    mmap items are single character strings, so every access that touches
+    the map is overridden.
+    """
+
+    def __init__(self, path, size=None, read_only=False):
+        self._read_only = read_only
+        storage = self._map(path, size)
+        super(MappedRam, self).__init__(size=len(storage), storage=storage)
+
+    def _open(self, path):
+        if self._read_only:
+            return open(path, 'rb')
+
+        return fdopen(os_open(path, O_RDWR | O_CREAT, 0644), 'r+b')
+
+    def _map(self, path, size):
+        with self._open(path) as fd:
+            fd.seek(0x00, 2)
+            file_size = fd.tell()
+
+            if self._read_only:
+                size = file_size if size is None else min(size, file_size)
+            else:
+                size = 1024 * 64 if size is None else size
+
+                if file_size < size:
+                    fd.truncate(size)
+
+            if size == 0x00:
+                raise MappedRamError(
+                    'Error - Can\'t map empty file : {0}.'.format(path)
+                )
+
+            return mmap(fd.fileno(), size, access=ACCESS_READ if self._read_only else ACCESS_WRITE)
+
+    @property
+    def read_only(self):
+        return self._read_only
+
+    def _check_writable(self):
+        if self._read_only:
+            raise MappedRamError('Error - Can\'t write to a read only RAM.')
+
+    def read(self, address):
+        self._check_address(address)
+        return ord(self._ram[address])
+
+    def read_word(self, address):
+        self._check_address(address)
+        self._check_address(address + 1)
+        return ord(self._ram[address]) | (ord(self._ram[address + 1]) << 8)
+
+    def read_bytes(self, address, length):
+        self._check_range(address, length)
+        return list(bytearray(self._ram[address:address + length]))
+
+    def write(self, address, byte):
+        self._check_writable()
+        self._check_address(address)
+        self._ram[address] = chr(byte & 0xFF)
+
+        if self._watched_addresses[address]:
+            self._notify_write_watchers(address)
+
+    def view(self, address=0x00, length=None):
+        """
+        Returns a read only buffer over length bytes of the map.
+        """
+        length = self._size - address if length is None else length
+        self._check_range(address, length)
+        return buffer(self._ram, address, length)
+
+    def load(self, opcodes, address=0x00):
+        self._check_writable()
+        opcodes = str(bytearray(opcodes))
+        self._check_range(address, len(opcodes))
+        self._ram[address:address + len(opcodes)] = opcodes
+        self._notify_range_write_watchers(address, len(opcodes))
+
+    def dump(self, address=0x00, length=None):
+        length = self._size - address if length is None else length
+        self._check_range(address, length)
+        return bytearray(self._ram[address:address + length])
+
+    def fill(self, address, length, byte):
+        self._check_writable()
+        self._check_range(address, length)
+        self._ram[address:address + length] = chr(byte & 0xFF) * length
+        self._notify_range_write_watchers(address, length)
+
+    def copy(self, source, destination, length):
+        self._check_writable()
+        self._check_range(source, length)
+        self._check_range(destination, length)
+        self._ram.move(destination, source, length)
+        self._notify_range_write_watchers(destination, length)
+
+    def clear(self):
+        self._check_writable()
+        self._notify_range_write_watchers(0x00, self._size)
+        self._ram[:] = '\x00' * self._size
+        self._watched_addresses[:] = bytearray(self._size)
+
+    def flush(self):
+        if not self._read_only:
+            self._ram.flush()
+
+    def close(self):
+        self._ram.close()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from . import Ram, RamInvalidAddress
+
+
+class PagedRamError(Exception):
+    pass
+
+
+class PagedRam(Ram):
+
+    """
+    A 64 KB address space split into pages, each one pointing into a
+    larger backing store. Switching a bank is just a page table update,
+    nothing gets copied.
+
+    Pages may be read only. As on real hardware, writes to a read only
+    page are silently ignored. ROM contents are loaded straight into the
+    store with load_store.
+
+    Write watchers are notified for the whole range of a page whenever it
+    gets remapped, as its contents may have changed. The backing store is
+    the storage of the RAM.
+    """
+
+    def __init__(self, store_size=1024 * 128, page_size=1024 * 4):
+        self._check_page_size(page_size, store_size)
+        super(PagedRam, self).__init__(size=0xFFFF + 1, storage=bytearray(store_size))
+        self._page_size = page_size
+        self._page_shift = page_size.bit_length() - 1
+        self._page_mask = page_size - 1
+        self._pages = [page * page_size for page in range(self._size / page_size)]
+        self._read_only_pages = bytearray(len(self._pages))
+
+    def _check_page_size(self, page_size, store_size):
+        if (page_size <= 0x00) or (page_size & (page_size - 1)) or (page_size > 0xFFFF + 1):
+            raise PagedRamError(
+                'Error - Page size : {0} is not a power of two up to 64 KB.'.format(page_size)
+            )
+
+        if (store_size < 0xFFFF + 1) or (store_size % page_size):
+            raise PagedRamError(
+                'Error - Store size : {0} must be a multiple of the page size of at least 64 KB.'.format(store_size)
+            )
+
+    @property
+    def page_size(self):
+        return self._page_size
+
+    @property
+    def store_size(self):
+        return len(self._ram)
+
+    def _check_page(self, page):
+        if (page < 0x00) or (page > len(self._pages) - 1):
+            raise PagedRamError('Error - {0} is not a valid page.'.format(page))
+
+    def _check_store_page(self, store_page):
+        if (store_page < 0x00) or (store_page > len(self._ram) / self._page_size - 1):
+            raise PagedRamError('Error - {0} is not a valid store page.'.format(store_page))
+
+    def map_page(self, page, store_page, read_only=False):
+        self._check_page(page)
+        self._check_store_page(store_page)
+        self._pages[page] = store_page * self._page_size
+        self._read_only_pages[page] = read_only
+        self._notify_range_write_watchers(page * self._page_size, self._page_size)
+
+    def map_bank(self, address, store_address, length, read_only=False):
+        """
+        Maps length bytes of the store starting at store_address into the
+        address space starting at address. All of them have to be page
+        aligned.
+        """
+        if (address | store_address | length) & self._page_mask:
+            raise PagedRamError('Error - Banks must be page aligned.')
+
+        for n in range(length / self._page_size):
+            self.map_page((address / self._page_size) + n, (store_address / self._page_size) + n, read_only)
+
+    def set_read_only(self, page, read_only=True):
+        self._check_page(page)
+        self._read_only_pages[page] = read_only
+
+    def is_read_only(self, address):
+        self._check_address(address)
+        return bool(self._read_only_pages[address >> self._page_shift])
+
+    def load_store(self, data, store_address=0x00):
+        """
+        Loads data straight into the store, read only pages included.
+        """
+        data = bytearray(data)
+
+        if (store_address < 0x00) or (store_address + len(data) > len(self._ram)):
+            raise PagedRamError(
+                'Error - {0} is not a valid store address.'.format(store_address)
+            )
+
+        self._ram[store_address:store_address + len(data)] = data
+
+        for page, page_address in enumerate(self._pages):
+            if (page_address < store_address + len(data)) and (store_address < page_address + self._page_size):
+                self._notify_range_write_watchers(page * self._page_size, self._page_size)
+
+    def _chunks(self, address, length):
+        """
+        Splits a range of the address space at page boundaries, yields
+        (address, store address, length, read only) for every chunk.
+        """
+        end_address = address + length
+
+        while address < end_address:
+            page = address >> self._page_shift
+            chunk_length = min(self._page_size - (address & self._page_mask), end_address - address)
+            yield address, self._pages[page] + (address & self._page_mask), chunk_length, self._read_only_pages[page]
+            address += chunk_length
+
+    def read(self, address):
+        self._check_address(address)
+        return self._ram[self._pages[address >> self._page_shift] + (address & self._page_mask)]
+
+    def read_word(self, address):
+        return self.read(address) | (self.read(address + 1) << 8)
+
+    def read_bytes(self, address, length):
+        self._check_range(address, length)
+        return [self.read(address + n) for n in range(length)]
+
+    def write(self, address, byte):
+        self._check_address(address)
+        page = address >> self._page_shift
+
+        if self._read_only_pages[page]:
+            return
+
+        self._ram[self._pages[page] + (address & self._page_mask)] = byte & 0xFF
+
+        if self._watched_addresses[address]:
+            self._notify_write_watchers(address)
+
+    def view(self, address=0x00, length=None):
+        """
+        Returns a memoryview over length bytes of the store, the range
+        has to lie within a single page.
+        """
+        length = self._size - address if length is None else length
+        self._check_range(address, length)
+        chunks = list(self._chunks(address, length))
+
+        if len(chunks) > 1:
+            raise RamInvalidAddress(
+                'Error - Range at {0} of {1} bytes spans more than one page.'.format(address, length)
+            )
+
+        store_address = chunks[0][1] if chunks else 0x00
+        return memoryview(self._ram)[store_address:store_address + length]
+
+    def dump(self, address=0x00, length=None):
+        length = self._size - address if length is None else length
+        self._check_range(address, length)
+        data = bytearray()
+
+        for _, store_address, chunk_length, _ in self._chunks(address, length):
+            data += self._ram[store_address:store_address + chunk_length]
+
+        return data
+
+    def load(self, opcodes, address=0x00):
+        opcodes = bytearray(opcodes)
+        self._check_range(address, len(opcodes))
+        offset = 0x00
+
+        for chunk_address, store_address, chunk_length, read_only in self._chunks(address, len(opcodes)):
+            if not read_only:
+                self._ram[store_address:store_address + chunk_length] = opcodes[offset:offset + chunk_length]
+                self._notify_range_write_watchers(chunk_address, chunk_length)
+
+            offset += chunk_length
+
+    def fill(self, address, length, byte):
+        self.load(bytearray([byte & 0xFF]) * length, address)
+
+    def copy(self, source, destination, length):
+        self._check_range(destination, length)
+        self.load(self.dump(source, length), destination)
+
+    def clear(self):
+        """
+        Zeroes every writable page of the address space.
+        """
+        self.fill(0x00, self._size, 0x00)
+        self._watched_addresses[:] = bytearray(self._size)
@@ -30,27 +30,51 @@ class Z80RegisterError(Exception):
 class Z80Register(object):
 
     __metaclass__ = ABCMeta
+    __slots__ = ('_size', '_storage', '_offset', '_msb_mask', '_higher_mask', '_lower_mask', '_mask', 'label')
 
-    def __init__(self, bits=0x00, size=BYTE_SIZE, label=''):
+    _lsb_mask = 0x01
+    _size_masks = {}
+
+    def __init__(self, bits=None, size=BYTE_SIZE, label='', storage=None, offset=0):
+        """
+        A register's bits are kept (most significant byte first) in
+        storage, starting at offset. Registers that share storage are
+        views of the same bytes, e.g. all registers of a Z80RegisterFile.
+        If no bits are given the register keeps the contents of storage
+        (new storage is zeroed).
+        """
         self._size = size
-        self._lsb_mask = 0x01
-        self._msb_mask = self._most_significant_bit_mask()
-        self._higher_mask, self._lower_mask = self._build_masks()
-        self._bits = self._apply_bit_mask(bits)
+        self._storage = bytearray(size / BYTE_SIZE) if storage is None else storage
+        self._offset = offset
+        self._msb_mask, self._higher_mask, self._lower_mask, self._mask = self._masks(size)
         self.label = label
 
-    def _build_masks(self):
-        lower_mask = self._lsb_mask
+        if bits is not None:
+            self.bits = bits
 
-        for i in range(0, (self.size / 2) - 1):
-            lower_mask = (lower_mask << 1) | self._lsb_mask
+    @classmethod
+    def _masks(cls, size):
+        """
+        Returns the msb, higher half, lower half and whole register masks.
+        Masks only depend on the register size, so they're built once per
+        size and shared by all registers.
+        """
 
-        higher_mask = lower_mask << (self.size / 2)
+        try:
+            return Z80Register._size_masks[size]
+        except KeyError:
+            lower_mask = (cls._lsb_mask << (size / 2)) - 1
+            masks = Z80Register._size_masks[size] = (
+                cls._lsb_mask << (size - 1),
+                lower_mask << (size / 2),
+                lower_mask,
+                (cls._lsb_mask << size) - 1,
+            )
 
-        return higher_mask, lower_mask
+            return masks
 
     def _apply_bit_mask(self, n):
-        return n & (self._higher_mask | self._lower_mask)
+        return n & self._mask
 
     def _nth_bit_mask(self, n):
         """
@@ -66,26 +90,23 @@ class Z80Register(object):
         """
         nth_bit = 0x00
 
-        if (self._bits & self._nth_bit_mask(n)) is not 0x00:
+        if (self.bits & self._nth_bit_mask(n)) is not 0x00:
             nth_bit = 0x01
 
         return nth_bit
 
     def set_nth_bit(self, nth_bit):
-        self._bits |= self._nth_bit_mask(nth_bit)
+        self.bits |= self._nth_bit_mask(nth_bit)
 
     def reset_nth_bit(self, nth_bit):
         if self.nth_bit(nth_bit) is 0x01:
-            self._bits ^= self._nth_bit_mask(nth_bit)
-
-    def _most_significant_bit_mask(self):
-        return self._nth_bit_mask(self._size - 1)
+            self.bits ^= self._nth_bit_mask(nth_bit)
 
     def invert(self):
         """
         Performs ones compliment.
         """
-        self._bits = (~self._bits) & (self._higher_mask | self._lower_mask)
+        self.bits = (~self.bits) & self._mask
 
     @property
     def msb(self):
@@ -97,11 +118,20 @@ class Z80Register(object):
 
     @property
     def bits(self):
-        return self._bits
+        bits = 0x00
+
+        for byte in self._storage[self._offset:self._offset + self._size / BYTE_SIZE]:
+            bits = (bits << BYTE_SIZE) | byte
+
+        return bits
 
     @bits.setter
     def bits(self, n):
-        self._bits = self._apply_bit_mask(n)
+        n = self._apply_bit_mask(n)
+
+        for i in reversed(range(self._offset, self._offset + self._size / BYTE_SIZE)):
+            self._storage[i] = n & 0xFF
+            n >>= BYTE_SIZE
 
     @property
     def size(self):
@@ -124,11 +154,11 @@ class Z80Register(object):
         pass
 
     def shift_right(self):
-        self.bits = (self.bits >> 1) & (self._higher_mask | self._lower_mask)
+        self.bits = (self.bits >> 1) & self._mask
         return self
 
     def shift_left(self):
-        self.bits = (self.bits << 1) & (self._higher_mask | self._lower_mask)
+        self.bits = (self.bits << 1) & self._mask
         return self
 
     def rotate_right(self):
@@ -176,6 +206,17 @@ class Z80Register(object):
 
 
 class Z80ByteRegister(Z80Register):
+
+    __slots__ = ()
+
+    @property
+    def bits(self):
+        return self._storage[self._offset]
+
+    @bits.setter
+    def bits(self, n):
+        self._storage[self._offset] = n & self._mask
+
     @property
     def lower(self):
         return self.bits & self._lower_mask
@@ -200,20 +241,27 @@ class Z80ByteRegister(Z80Register):
 
 
 class Z80WordRegister(Z80Register):
-    def __init__(self, bits=0x00, size=WORD_SIZE, label=''):
-        super(Z80WordRegister, self).__init__(bits=bits, size=size, label=label)
-        self._lower = Z80ByteRegister()
-        self._higher = Z80ByteRegister()
-        self.bits = bits
+
+    """
+    The higher and lower parts of a word register are byte registers
+    over the same storage, so writing to any of them is seen by all.
+    """
+
+    __slots__ = ('_higher', '_lower')
+
+    def __init__(self, bits=None, size=WORD_SIZE, label='', storage=None, offset=0):
+        super(Z80WordRegister, self).__init__(bits=bits, size=size, label=label, storage=storage, offset=offset)
+        self._higher = Z80ByteRegister(storage=self._storage, offset=self._offset)
+        self._lower = Z80ByteRegister(storage=self._storage, offset=self._offset + 1)
 
     @property
     def bits(self):
-        return (self.higher.bits << (self.size / 2)) | self.lower.bits
+        return (self._storage[self._offset] << BYTE_SIZE) | self._storage[self._offset + 1]
 
     @bits.setter
     def bits(self, n):
-        self.lower.bits = n & self._lower_mask
-        self.higher.bits = (n & self._higher_mask) >> (self.size / 2)
+        self._storage[self._offset] = (n >> BYTE_SIZE) & 0xFF
+        self._storage[self._offset + 1] = n & 0xFF
 
     @property
     def lower(self):
@@ -235,15 +283,98 @@ class Z80WordRegister(Z80Register):
         return self._add(other, Z80WordRegister)
 
 
+def _sz_flags(n):
+    return (n & 0x80) | (0x40 if n == 0x00 else 0x00)
+
+
+def _szp_flags(n):
+    return _sz_flags(n) | (0x04 if bin(n).count('1') % 2 == 0 else 0x00)
+
+
 # TODO: Add undocumented flags YF (bit 5), XF (bit 3) and its properties.
 class Z80FlagsRegister(Z80ByteRegister):
+
+    """
+    SZ_FLAGS, SZP_FLAGS and XY_FLAGS hold, for every 8 bit result, the
+    sign & zero (& parity) flags and the undocumented bits 5 & 3 it sets.
+    Instructions that set all flags at once can build the whole F byte
+    from these tables and write it in one go.
+
+    Flags may also be evaluated lazily: an instruction defers its update
+    of F, which is only performed when F is read. Writing the whole F
+    byte discards a deferred update.
+    """
+
+    __slots__ = ('_deferred_update',)
+
     SIGN_BIT = 7
     ZERO_BIT = 6
+    Y_BIT = 5
     HALF_CARRY_BIT = 4
+    X_BIT = 3
     PARITY_BIT = 2
     ADD_BIT = 1
     CARRY_BIT = 0
 
+    SIGN_MASK = 0x01 << SIGN_BIT
+    ZERO_MASK = 0x01 << ZERO_BIT
+    HALF_CARRY_MASK = 0x01 << HALF_CARRY_BIT
+    PARITY_MASK = 0x01 << PARITY_BIT
+    ADD_MASK = 0x01 << ADD_BIT
+    CARRY_MASK = 0x01 << CARRY_BIT
+    SZ_MASK = SIGN_MASK | ZERO_MASK
+    SZP_MASK = SZ_MASK | PARITY_MASK
+    XY_MASK = (0x01 << Y_BIT) | (0x01 << X_BIT)
+
+    SZ_FLAGS = bytearray(_sz_flags(n) for n in range(0x00, 0xFF + 1))
+    SZP_FLAGS = bytearray(_szp_flags(n) for n in range(0x00, 0xFF + 1))
+    XY_FLAGS = bytearray(n & 0x28 for n in range(0x00, 0xFF + 1))
+
+    def __init__(self, bits=None, size=BYTE_SIZE, label='', storage=None, offset=0):
+        self._deferred_update = None
+        super(Z80FlagsRegister, self).__init__(bits=bits, size=size, label=label, storage=storage, offset=offset)
+
+    @property
+    def bits(self):
+        if self._deferred_update is not None:
+            self.evaluate()
+
+        return self._storage[self._offset]
+
+    @bits.setter
+    def bits(self, n):
+        self._deferred_update = None
+        self._storage[self._offset] = n & self._mask
+
+    def defer(self, update, operands, partial=False):
+        """
+        Records an update of the flags instead of performing it, update
+        gets called with operands the next time F is read. A partial update
+        leaves some flags untouched, so the previously deferred update (if
+        any) is performed first. Otherwise it's just dropped.
+        """
+        if partial and self._deferred_update is not None:
+            self.evaluate()
+
+        self._deferred_update = (update, operands)
+
+    def evaluate(self):
+        if self._deferred_update is not None:
+            update, operands = self._deferred_update
+            self._deferred_update = None
+            update(*operands)
+
+    def discard_deferred_update(self):
+        self._deferred_update = None
+
+    def update_sz_flags(self, n):
+        self.evaluate()
+        self._storage[self._offset] = (self._storage[self._offset] & ~self.SZ_MASK) | self.SZ_FLAGS[n & 0xFF]
+
+    def update_szp_flags(self, n):
+        self.evaluate()
+        self._storage[self._offset] = (self._storage[self._offset] & ~self.SZP_MASK) | self.SZP_FLAGS[n & 0xFF]
+
     @property
     def sign_flag(self):
         return self.nth_bit(self.SIGN_BIT)
@@ -303,3 +434,74 @@ class Z80FlagsRegister(Z80ByteRegister):
 
     def reset_carry_flag(self):
         self.reset_nth_bit(self.CARRY_BIT)
+
+
+class Z80RegisterFile(object):
+
+    """
+    Keeps all cpu registers in a single bytearray. Registers are built
+    as views of it, so snapshots and exchanges of register banks are just
+    slice copies. Byte registers are laid out as the higher or lower part
+    of a word (e.g. A & F are AF, I & R are IR).
+    """
+
+    _word_offsets = {
+        'af': 0, 'bc': 2, 'de': 4, 'hl': 6,
+        'af_': 8, 'bc_': 10, 'de_': 12, 'hl_': 14,
+        'ix': 16, 'iy': 18, 'sp': 20, 'pc': 22, 'ir': 24,
+    }
+
+    _byte_offsets = {
+        'a': 0, 'f': 1, 'a_': 8, 'f_': 9, 'i': 24, 'r': 25,
+    }
+
+    def __init__(self):
+        self._storage = bytearray(len(self._word_offsets) * WORD_SIZE / BYTE_SIZE)
+        self._flags_registers = []
+
+    def word_register(self, name, label='', RegisterClass=Z80WordRegister):
+        return RegisterClass(label=label, storage=self._storage, offset=self._word_offsets[name])
+
+    def byte_register(self, name, label='', RegisterClass=Z80ByteRegister):
+        register = RegisterClass(label=label, storage=self._storage, offset=self._byte_offsets[name])
+
+        if isinstance(register, Z80FlagsRegister):
+            self._flags_registers.append(register)
+
+        return register
+
+    def evaluate_flags(self):
+        """
+        Performs any deferred flags update, so storage holds the actual
+        contents of the flags registers.
+        """
+        [f.evaluate() for f in self._flags_registers]
+
+    def exchange(self, names, alternate_names):
+        """
+        Exchanges the contents of two banks of consecutive word registers,
+        e.g. exchange(['bc', 'de', 'hl'], ['bc_', 'de_', 'hl_']).
+        """
+
+        offset = self._word_offsets[names[0]]
+        alternate_offset = self._word_offsets[alternate_names[0]]
+        length = len(names) * WORD_SIZE / BYTE_SIZE
+
+        if [self._word_offsets[n] for n in names + alternate_names] != \
+            range(offset, offset + length, 2) + range(alternate_offset, alternate_offset + length, 2):
+            raise Z80RegisterError(
+                'Error - Can\'t exchange {0} and {1}.'.format(', '.join(names), ', '.join(alternate_names))
+            )
+
+        self.evaluate_flags()
+        bank = self._storage[offset:offset + length]
+        self._storage[offset:offset + length] = self._storage[alternate_offset:alternate_offset + length]
+        self._storage[alternate_offset:alternate_offset + length] = bank
+
+    def snapshot(self):
+        self.evaluate_flags()
+        return str(self._storage)
+
+    def restore(self, snapshot):
+        [f.discard_deferred_update() for f in self._flags_registers]
+        self._storage[:] = snapshot
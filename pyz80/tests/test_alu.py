@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from nose.tools import raises
+from unittest import TestCase
+from ..alu import ALU8Bit, ALUShiftRotate, ALUDecimalAdjust, ALUError
+from ..alu.alu_16_bit import ALU16Bit
+from ..register import Z80ByteRegister
+
+
+class TestALU8Bit(TestCase):
+
+    def test_add(self):
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.ADD, 0x7F, 0x01), (0x80, 0x94))
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.ADD, 0xFF, 0x00, carry=0x01), (0x00, 0x51))
+
+    def test_sub(self):
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.SUB, 0x00, 0x01), (0xFF, 0xBB))
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.SUB, 0x80, 0x00, carry=0x01), (0x7F, 0x3E))
+
+    def test_logical(self):
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.AND, 0xF0, 0x0F), (0x00, 0x54))
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.XOR, 0xFF, 0x7F), (0x80, 0x80))
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.OR, 0x03, 0x00), (0x03, 0x04))
+
+    def test_cp_undocumented_flags_come_from_operand(self):
+        self.assertEqual(ALU8Bit.execute(ALU8Bit.CP, 0x10, 0x28), (0xE8, 0xBB))
+
+    def test_add_and_sub_results(self):
+        add_table = ALU8Bit.table(ALU8Bit.ADD)
+        sub_table = ALU8Bit.table(ALU8Bit.SUB)
+
+        for carry in [0x00, 0x01]:
+            for a in range(0x00, 0xFF + 1):
+                for n in range(0x00, 0xFF + 1, 0x0F):
+                    index = (carry << 16) | (a << 8) | n
+                    self.assertEqual(add_table[index] & 0xFF, (a + n + carry) & 0xFF)
+                    self.assertEqual(add_table[index] >> 8 & 0x01, int(a + n + carry > 0xFF))
+                    self.assertEqual(sub_table[index] & 0xFF, (a - n - carry) & 0xFF)
+                    self.assertEqual(sub_table[index] >> 8 & 0x01, int(a - n - carry < 0x00))
+
+    @raises(ALUError)
+    def test_unknown_operation_fails(self):
+        ALU8Bit.table('nop')
+
+
+class TestALUShiftRotate(TestCase):
+
+    def test_rotates_match_register_rotates(self):
+        for n in range(0x00, 0xFF + 1):
+            left, right = Z80ByteRegister(bits=n), Z80ByteRegister(bits=n)
+            left.rotate_left()
+            right.rotate_right()
+            self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.RLC, n)[0], left.bits)
+            self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.RRC, n)[0], right.bits)
+
+    def test_shifts(self):
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.SLA, 0x81), (0x02, 0x01))
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.SRA, 0x81), (0xC0, 0x85))
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.SLL, 0x80), (0x01, 0x01))
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.SRL, 0x01), (0x00, 0x45))
+
+    def test_rotates_through_carry(self):
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.RL, 0x80, carry=0x01), (0x01, 0x01))
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.RR, 0x00, carry=0x01), (0x80, 0x80))
+
+    def test_bit(self):
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.BIT, 0x80, carry=7), (0x80, 0x90))
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.BIT, 0x80, carry=0), (0x80, 0x54))
+        self.assertEqual(ALUShiftRotate.execute(ALUShiftRotate.BIT, 0x81, carry=0), (0x81, 0x10))
+
+
+class TestALU16Bit(TestCase):
+
+    def test_add_keeps_sign_zero_and_parity_flags(self):
+        self.assertEqual(ALU16Bit.add(0x0FFF, 0x0001, 0xC5), (0x1000, 0xD4))
+        self.assertEqual(ALU16Bit.add(0xFFFF, 0x0001, 0x00), (0x0000, 0x11))
+
+    def test_adc(self):
+        self.assertEqual(ALU16Bit.adc(0x7FFF, 0x0000, 0x01), (0x8000, 0x94))
+        self.assertEqual(ALU16Bit.adc(0xFFFF, 0x0000, 0x01), (0x0000, 0x51))
+
+    def test_sbc(self):
+        self.assertEqual(ALU16Bit.sbc(0x0000, 0x0001, 0x00), (0xFFFF, 0xBB))
+        self.assertEqual(ALU16Bit.sbc(0x8000, 0x0000, 0x01), (0x7FFF, 0x3E))
+
+
+class TestALUDecimalAdjust(TestCase):
+
+    def _bcd(self, n):
+        return ((n / 10) << 4) | (n % 10)
+
+    def _daa(self, operation, x, y):
+        result, flags = ALU8Bit.execute(operation, self._bcd(x), self._bcd(y))
+        return ALUDecimalAdjust.execute(ALUDecimalAdjust.DAA, result, carry=ALUDecimalAdjust.nhc(flags))
+
+    def test_bcd_addition_and_substraction(self):
+        for x in range(0, 100):
+            for y in range(0, 100):
+                result, flags = self._daa(ALU8Bit.ADD, x, y)
+                self.assertEqual((result, flags & 0x01), (self._bcd((x + y) % 100), int(x + y > 99)))
+                result, flags = self._daa(ALU8Bit.SUB, x, y)
+                self.assertEqual((result, flags & 0x01), (self._bcd((x - y) % 100), int(x < y)))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from ..instruction.arithmetic_16_bit import *
+from .test_z80_base import TestZ80
+
+
+class TestArithmetic16Bit(TestZ80):
+
+    def test_add_hl_ss(self):
+        """ Test ADD HL, ss """
+
+        instruction = AddHLSS(self._z80)
+        self._z80.hl.bits = self._get_random_word()
+        self._z80.de.bits = self._get_random_word()
+        instruction_result = self._z80.hl.bits + self._z80.de.bits
+        instruction.execute([0b01])
+        self.assertEqual(self._z80.hl.bits, instruction_result & 0xFFFF)
+        self.assertEqual(self._z80.f.carry_flag, int(instruction_result > 0xFFFF))
+
+    def test_add_ix_pp(self):
+        """ Test ADD IX, pp """
+
+        instruction = AddIXPP(self._z80)
+        self._z80.ix.bits = 0x1234
+        instruction.execute([0b10])
+        self.assertEqual(self._z80.ix.bits, 0x2468)
+
+    def test_sbc_hl_ss(self):
+        """ Test SBC HL, ss """
+
+        instruction = SbcHLSS(self._z80)
+        self._z80.f.set_carry_flag()
+        self._z80.hl.bits = 0x1000
+        self._z80.bc.bits = 0x0FFF
+        instruction.execute([0b00])
+        self.assertEqual(self._z80.hl.bits, 0x0000)
+        self.assertEqual(self._z80.f.zero_flag, 0x01)
+        self.assertEqual(self._z80.f.carry_flag, 0x00)
+
+    def test_inc_and_dec_ss(self):
+        """ Test INC ss & DEC ss """
+
+        self._z80.sp.bits = 0xFFFF
+        IncSS(self._z80).execute([0b11])
+        self.assertEqual(self._z80.sp.bits, 0x0000)
+        DecSS(self._z80).execute([0b11])
+        self.assertEqual(self._z80.sp.bits, 0xFFFF)
+
+    def test_inc_and_dec_ix(self):
+        """ Test INC IX & DEC IX """
+
+        DecIX(self._z80).execute()
+        self.assertEqual(self._z80.ix.bits, 0xFFFF)
+        IncIX(self._z80).execute()
+        self.assertEqual(self._z80.ix.bits, 0x0000)
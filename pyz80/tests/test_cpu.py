@@ -20,7 +20,28 @@ Copyright 2014 Lucas Liendo.
 """
 
 from unittest import TestCase
-from ..cpu import Z80
+from ..cpu import Z80, InvalidOpcodeError
+from ..ram import Ram
+from ..io import Device, DeviceManager
+
+
+class MemoryMappedDevice(Device):
+
+    memory_address = 0x4000
+    memory_length = 0x02
+
+    def __init__(self, device_manager):
+        super(MemoryMappedDevice, self).__init__(device_manager)
+        self.registers = [0x00, 0x00]
+
+    def run(self):
+        pass
+
+    def read_memory(self, address):
+        return self.registers[address - self.memory_address] + 1
+
+    def write_memory(self, address, byte):
+        self.registers[address - self.memory_address] = byte
 
 
 class TestZ80(TestCase):
@@ -37,3 +58,121 @@ class TestZ80(TestCase):
     def test_16_bit_register_properties(self):
         registers = ['bc', 'de', 'hl', 'sp', 'pc', 'ix', 'iy']
         [self.assertTrue(hasattr(self._z80, r)) for r in registers]
+
+    def _fetch_opcode(self, fetch_opcode):
+        self._z80.pc.bits = 0x00
+
+        try:
+            return fetch_opcode(), self._z80.pc.bits
+        except InvalidOpcodeError:
+            return None
+
+    def test_length_tables_match_fsms(self):
+        for first_byte in range(0x00, 0xFF + 1):
+            second_bytes = range(0x00, 0xFF + 1) if first_byte in [0xCB, 0xED, 0xDD, 0xFD] else [0x00]
+
+            for second_byte in second_bytes:
+                self._z80.ram.load([first_byte, second_byte, 0x00, 0x00])
+                self.assertEqual(
+                    self._fetch_opcode(self._z80._table_fetch_opcode),
+                    self._fetch_opcode(self._z80._fsm_fetch_opcode)
+                )
+
+    def test_length_tables_are_shared(self):
+        self.assertTrue(Z80()._length_tables is self._z80._length_tables)
+
+    def test_fetch_wraps_around(self):
+        for z80 in [Z80(ram=Ram()), Z80(ram=Ram(), predecode=True)]:
+            z80.ram.write(0xFFFF, 0xDD)
+            z80.ram.load([0x21, 0x12, 0x34])                    # LD IX, nn
+            z80.pc.bits = 0xFFFF
+            self.assertEqual(z80.step(), 14)
+            self.assertEqual(z80.pc.bits, 0x03)
+            self.assertEqual(z80.ix.bits, 0x1234)
+
+        z80.pc.bits = 0xFFFF
+        self.assertEqual(z80._table_fetch_opcode(), [0xDD, 0x21, 0x12, 0x34])
+        z80.pc.bits = 0xFFFF
+        self.assertEqual(z80._fsm_fetch_opcode(), [0xDD, 0x21, 0x12, 0x34])
+
+    def test_predecoded_fetch_and_decode(self):
+        z80 = Z80(ram=Ram(), predecode=True)
+        z80.ram.load([0x3E, 0x01, 0x3E, 0x01])
+        instruction, operands = z80._fetch_and_decode()
+        self.assertEqual(z80._predecoded[0x00], (instruction, operands, 2, 7))
+
+        z80.pc.bits = 0x00
+        self.assertEqual(z80._fetch_and_decode(), (instruction, operands))
+        self.assertEqual(z80.pc.bits, 0x02)
+
+    def test_predecoded_write_invalidation(self):
+        z80 = Z80(ram=Ram(), predecode=True)
+        z80.ram.load([0x3E, 0x01, 0x3E, 0x01])
+        z80._fetch_and_decode()
+        z80._fetch_and_decode()
+
+        z80.ram.write(0x01, 0x02)
+        self.assertEqual(z80._predecoded[0x00], None)
+        self.assertNotEqual(z80._predecoded[0x02], None)
+
+        z80.pc.bits = 0x00
+        _, operands = z80._fetch_and_decode()
+        self.assertEqual(operands, z80._instruction_decoder.decode([0x3E, 0x02])[1])
+
+    def test_lazy_flags(self):
+        program = [0xC6, 0x7F, 0x07, 0xD6, 0x10, 0x17, 0xC6, 0x81, 0x0F]
+        z80 = Z80(ram=Ram())
+        lazy_z80 = Z80(ram=Ram(), lazy_flags=True)
+
+        for cpu in [z80, lazy_z80]:
+            cpu.ram.load(program)
+            cpu.a.bits = 0x01
+
+        for _ in range(6):
+            z80._execute_next()
+            lazy_z80._execute_next()
+            self.assertEqual(lazy_z80.f._deferred_update, None)
+            self.assertEqual(lazy_z80.registers.snapshot(), z80.registers.snapshot())
+
+    def test_memory_mapped_device(self):
+        z80 = Z80(ram=Ram(), device_manager=DeviceManager())
+        z80.load_device(MemoryMappedDevice)
+        device = z80.device_manager._devices[0]
+        z80.ram.load([0x3E, 0x10, 0x32, 0x40, 0x01, 0x3A, 0x40, 0x01, 0x32, 0x50, 0x00])
+        [z80._execute_next() for _ in range(4)]
+        self.assertEqual(device.registers, [0x00, 0x10])
+        self.assertEqual(z80.a.bits, 0x11)
+        self.assertEqual(z80.ram.read(0x5000), 0x11)
+
+    def test_cycles(self):
+        program = [
+            0x06, 0x02,                     # LD B, 2           7
+            0x10, 0x00,                     # DJNZ 0            13
+            0x10, 0x00,                     # DJNZ 0            8
+            0x20, 0x00,                     # JR NZ, 0          12
+            0x21, 0x80, 0x00,               # LD HL, 0x8000     10
+            0x11, 0x80, 0x01,               # LD DE, 0x8001     10
+            0x01, 0x04, 0x00,               # LD BC, 0x400      10
+            0xED, 0xB0,                     # LDIR              21 * 0x3FF + 16
+            0xDD, 0xCB, 0x00, 0x46,         # BIT 0, (IX + 0)   20
+        ]
+        t_states = [7, 13, 8, 12, 10, 10, 10, 21 * 0x3FF + 16, 20]
+
+        for z80 in [Z80(ram=Ram()), Z80(ram=Ram(), predecode=True)]:
+            z80.ram.load(program)
+            self.assertEqual([z80.step() for _ in t_states], t_states)
+            self.assertEqual(z80.cycles, sum(t_states))
+
+    def test_run_cycles(self):
+        z80 = Z80(ram=Ram())
+        z80.ram.load([0x00] * 0x10)
+        self.assertEqual(z80.run(cycles=10), 12)
+        self.assertEqual(z80.pc.bits, 0x03)
+        self.assertEqual(z80.run(cycles=8), 8)
+        self.assertEqual(z80.pc.bits, 0x05)
+
+    def test_default_ram_and_device_manager_are_not_shared(self):
+        z80 = Z80()
+        self.assertFalse(z80.ram is self._z80.ram)
+        self.assertFalse(z80.device_manager is self._z80.device_manager)
+        self.assertTrue(z80.device_manager.interrupt_manager is z80.interrupt_manager)
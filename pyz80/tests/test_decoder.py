@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from unittest import TestCase
+from itertools import product
+from nose.tools import raises
+from ..instruction.decoder import InstructionDecoder, InvalidInstructionError
+
+
+class TestInstructionDecoder(TestCase):
+    def setUp(self):
+        self._instruction_decoder = InstructionDecoder(None)
+
+    def _scan_instruction(self, opcode):
+        """
+        Returns the instruction a sequential scan over all
+        instruction regexps would pick for the given opcode.
+        """
+        binary_opcode = self._instruction_decoder._translate(opcode)
+        instructions = [I for I in self._instruction_decoder._instructions if I.regexp.match(binary_opcode)]
+
+        return instructions.pop() if instructions else None
+
+    def _dispatch_instruction(self, opcode):
+        try:
+            return self._instruction_decoder._get_instruction(opcode)
+        except (IndexError, KeyError):
+            return None
+
+    def _test_dispatch_matches_scan(self, opcodes):
+        for opcode in opcodes:
+            opcode = list(opcode)
+            self.assertEqual(
+                self._dispatch_instruction(opcode),
+                self._scan_instruction(opcode),
+                msg='Opcode : {0}'.format(' '.join('{:02X}'.format(b) for b in opcode))
+            )
+
+    def test_unprefixed_dispatch(self):
+        bytes = range(0x00, 0xFF + 1)
+        self._test_dispatch_matches_scan(product(bytes))
+        self._test_dispatch_matches_scan(product(bytes, [0xA5]))
+        self._test_dispatch_matches_scan(product(bytes, [0xA5], [0x5A]))
+
+    def test_prefixed_dispatch(self):
+        bytes = range(0x00, 0xFF + 1)
+        self._test_dispatch_matches_scan(product([0xCB, 0xED, 0xDD, 0xFD], bytes))
+        self._test_dispatch_matches_scan(product([0xDD, 0xFD], bytes, [0xA5]))
+        self._test_dispatch_matches_scan(product([0xED, 0xDD, 0xFD], bytes, [0xA5], [0x5A]))
+
+    def test_indexed_bit_dispatch(self):
+        bytes = range(0x00, 0xFF + 1)
+        self._test_dispatch_matches_scan(product([0xDD, 0xFD], [0xCB], [0xA5], bytes))
+
+    def test_operand_extractors(self):
+        Instruction = self._instruction_decoder._get_instruction([0xDD, 0xCB, 0x00, 0xC6])
+        self.assertEqual(
+            self._instruction_decoder._operand_extractors(Instruction),
+            [(2, 0, 0xFF), (3, 3, 0b111), (3, 0, 0b111)]
+        )
+
+    def test_extracted_operands_match_regexp(self):
+        bytes = range(0x00, 0xFF + 1)
+        opcodes = list(product(bytes, [0x12], [0x34])) + list(product([0xDD, 0xFD], [0xCB], [0x80], bytes))
+
+        for opcode in [list(opcode) for opcode in opcodes]:
+            for length in range(1, len(opcode) + 1):
+                try:
+                    Instruction, operand_extractors = self._instruction_decoder._lookup(opcode[:length])
+                except (IndexError, KeyError):
+                    continue
+
+                self.assertEqual(
+                    self._instruction_decoder._extract_operands(operand_extractors, opcode[:length]),
+                    self._instruction_decoder._get_operands(Instruction, opcode[:length])
+                )
+
+    def test_decode_reuses_handlers(self):
+        handler, operands = self._instruction_decoder.decode([0x41])
+        another_handler, another_operands = self._instruction_decoder.decode([0x7F])
+        self.assertIs(handler, another_handler)
+        self.assertEqual(operands, [0b000, 0b001])
+        self.assertEqual(another_operands, [0b111, 0b111])
+
+    @raises(InvalidInstructionError)
+    def test_decode_invalid_instruction_fails(self):
+        self._instruction_decoder.decode([0xED, 0xFF])
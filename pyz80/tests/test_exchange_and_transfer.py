@@ -20,6 +20,9 @@ Copyright 2014 Lucas Liendo.
 """
 
 from ..instruction.exchange_and_transfer import *
+from ..cpu import Z80
+from ..ram import Ram
+from ..timing import TStates
 from .test_z80_base import TestZ80
 
 
@@ -206,7 +209,7 @@ class TestExchangeAndTransfer(TestZ80):
         de_bits = self._get_random_word()
         hl_bits = self._get_random_word()
         bc_bits = self._get_random_word()
-        byte = self._get_random_word()
+        byte = self._get_random_byte()
         self._z80.ram.write(hl_bits, byte)
         self._z80.de.bits = de_bits
         self._z80.hl.bits = hl_bits
@@ -278,7 +281,7 @@ class TestExchangeAndTransfer(TestZ80):
         de_bits = self._get_random_word()
         hl_bits = self._get_random_word()
         bc_bits = self._get_random_word()
-        byte = self._get_random_word()
+        byte = self._get_random_byte()
         self._z80.ram.write(hl_bits, byte)
         self._z80.de.bits = de_bits
         self._z80.hl.bits = hl_bits
@@ -342,3 +345,71 @@ class TestExchangeAndTransfer(TestZ80):
                 byte,
                 msg='Ram byte = {:02X}, Test byte = {:02X}'.format(self._z80.ram.read(de_bits - i), byte)
             )
+
+    def _repeat_single(self, z80, Instruction, counter):
+        """
+        Runs the non repeating version of a block instruction until it
+        would stop repeating and returns the number of repetitions.
+        """
+        instruction = Instruction(z80)
+        repetitions = 0
+
+        while True:
+            instruction.execute()
+            repetitions += 1
+
+            if counter.bits == 0x00:
+                return repetitions
+
+            if isinstance(instruction, Cpi) and z80.f.zero_flag:
+                return repetitions
+
+    def _check_block_instruction(self, Single, opcode, hl_bits, de_bits, bc_bits, a_bits=0x00):
+        program = [self._get_random_byte() for _ in range(0x40)]
+        z80s = [Z80(ram=Ram()) for _ in range(2)]
+
+        for z80 in z80s:
+            z80.ram.load(program, 0x100)
+            z80.hl.bits, z80.de.bits, z80.bc.bits, z80.a.bits = hl_bits, de_bits, bc_bits, a_bits
+
+        repetitions = self._repeat_single(z80s[0], Single, z80s[0].bc)
+        z80s[1].ram.load(opcode)
+        z80s[0].pc.bits = len(opcode)
+
+        self.assertEqual(z80s[1].step(), TStates.of(opcode) + TStates.REPEAT * (repetitions - 1))
+        self.assertEqual(z80s[1].registers.snapshot(), z80s[0].registers.snapshot())
+        self.assertEqual(z80s[1].ram.dump(0x100, 0x40), z80s[0].ram.dump(0x100, 0x40))
+
+    def test_ldir_overlapping_ranges(self):
+        for distance in range(-0x08, 0x09):
+            self._check_block_instruction(Ldi, [0xED, 0xB0], 0x110, 0x110 + distance, 0x10)
+
+    def test_lddr_overlapping_ranges(self):
+        for distance in range(-0x08, 0x09):
+            self._check_block_instruction(Ldd, [0xED, 0xB8], 0x120, 0x120 + distance, 0x10)
+
+    def test_cpir_cpdr(self):
+        for a_bits in range(0x00, 0xFF + 1, 0x11):
+            self._check_block_instruction(Cpi, [0xED, 0xB1], 0x100, 0x00, 0x40, a_bits=a_bits)
+            self._check_block_instruction(Cpd, [0xED, 0xB9], 0x13F, 0x00, 0x40, a_bits=a_bits)
+
+    def test_cpi_cpd_decode(self):
+        self._z80.ram.load([0xED, 0xA1, 0xED, 0xA9])
+        self._z80.hl.bits, self._z80.bc.bits = 0x10, 0x02
+        self.assertEqual([self._z80.step() for _ in range(2)], [16, 16])
+        self.assertEqual((self._z80.hl.bits, self._z80.bc.bits), (0x10, 0x00))
+
+    def test_zero_length_repeats_0x10000_times(self):
+        self._z80.ram.load([0xED, 0xB0, 0xED, 0xB1])
+        self._z80.a.bits = 0x01
+        self.assertEqual([self._z80.step() for _ in range(2)], [21 * 0xFFFF + 16] * 2)
+        self.assertEqual((self._z80.hl.bits, self._z80.de.bits, self._z80.bc.bits), (0x00, 0x00, 0x00))
+        self.assertFalse(self._z80.f.zero_flag)
+
+    def test_ldir_wraps_around(self):
+        self._z80.ram.write(0xFFFF, 0x01)
+        self._z80.ram.write(0x00, 0x02)
+        self._z80.hl.bits, self._z80.de.bits, self._z80.bc.bits = 0xFFFF, 0x10, 0x02
+        Ldir(self._z80).execute()
+        self.assertEqual(self._z80.ram.read_bytes(0x10, 2), [0x01, 0x02])
+        self.assertEqual(self._z80.hl.bits, 0x01)
@@ -98,3 +98,34 @@ class TestZ80Flags(TestCase):
         self.assertEqual(self._flags_register.parity_flag, False)
         self.assertEqual(self._flags_register.add_substract_flag, False)
         self.assertEqual(self._flags_register.sign_flag, False)
+
+    def test_szp_flags_tables(self):
+        for n in range(0x00, 0xFF + 1):
+            parity_even = bin(n).count('1') % 2 == 0
+            self._flags_register.bits = 0x00
+            self._flags_register.update_szp_flags(n)
+            self.assertEqual(self._flags_register.sign_flag, bool(n & 0x80))
+            self.assertEqual(self._flags_register.zero_flag, n == 0x00)
+            self.assertEqual(self._flags_register.parity_flag, parity_even)
+
+    def test_update_sz_flags_keeps_other_flags(self):
+        self._flags_register.bits = 0xFF
+        self._flags_register.update_sz_flags(0x01)
+        self.assertEqual(self._flags_register.bits, 0x3F)
+        self._flags_register.update_szp_flags(0x100)
+        self.assertEqual(self._flags_register.bits, 0x7F)
+
+    def test_deferred_update_is_evaluated_on_read(self):
+        self._flags_register.defer(self._flags_register.update_szp_flags, (0x00,))
+        self.assertEqual(self._flags_register.zero_flag, True)
+        self.assertEqual(self._flags_register.parity_flag, True)
+
+    def test_partial_deferred_update_keeps_previous_update(self):
+        self._flags_register.defer(self._flags_register.set_carry_flag, ())
+        self._flags_register.defer(self._flags_register.update_sz_flags, (0x80,), partial=True)
+        self.assertEqual(self._flags_register.bits, 0x81)
+
+    def test_writing_flags_discards_deferred_update(self):
+        self._flags_register.defer(self._flags_register.set_carry_flag, ())
+        self._flags_register.bits = 0x40
+        self.assertEqual(self._flags_register.bits, 0x40)
@@ -23,13 +23,15 @@ from unittest import TestCase
 from random import randint
 from itertools import product
 from mock import patch
-from ..fsm import Z80FSM, Z80FSMBuilder
+from nose.tools import raises
+from ..fsm import Z80FSM, Z80FSMBuilder, Z80FSMRejectedInput
 from ..cpu import Z80
 
 
 class TestZ80ByteRegister(TestCase):
     def setUp(self):
-        self._z80_fsm_builder = Z80FSMBuilder(Z80())
+        self._z80 = Z80()
+        self._z80_fsm_builder = Z80FSMBuilder(self._z80)
 
     def _get_ignore_byte(self):
         return randint(0x00, 0xFF)
@@ -114,3 +116,41 @@ class TestZ80ByteRegister(TestCase):
         _, _, fd_four_bytes= self._z80_fsm_builder._fd_fsm_bytes()
         opcodes = [i for i in product([0xFD], fd_four_bytes, [self._get_ignore_byte()], [self._get_ignore_byte()])]
         self._test_fsm_accepts_opcodes(fsm, opcodes)
+
+    def _run_compiled_fsm(self, fsm, opcode):
+        self._z80.ram.load(opcode)
+        self._z80.pc.bits = 0x00
+        return fsm.run()
+
+    def _test_compiled_fsm_accepts_opcodes(self, fsm, *fsm_bytes):
+        for opcode in product(*fsm_bytes):
+            self.assertEqual(self._run_compiled_fsm(fsm, list(opcode)), list(opcode))
+            self.assertEqual(self._z80.pc.bits, len(opcode))
+
+    def test_compiled_fsms(self):
+        unprefixed_fsm, cb_fsm, ed_fsm, dd_fsm, fd_fsm = self._z80_fsm_builder.build(compiled=True)
+        ignore_byte = [self._get_ignore_byte()]
+
+        unprefixed_one_byte, unprefixed_two_bytes, unprefixed_three_bytes = \
+            self._z80_fsm_builder._unprefixed_fsm_bytes()
+        self._test_compiled_fsm_accepts_opcodes(unprefixed_fsm, unprefixed_one_byte)
+        self._test_compiled_fsm_accepts_opcodes(unprefixed_fsm, unprefixed_two_bytes, ignore_byte)
+        self._test_compiled_fsm_accepts_opcodes(unprefixed_fsm, unprefixed_three_bytes, ignore_byte, ignore_byte)
+
+        self._test_compiled_fsm_accepts_opcodes(cb_fsm, [0xCB], range(0x00, 0xFF + 1))
+
+        ed_two_bytes, ed_four_bytes = self._z80_fsm_builder._ed_fsm_bytes()
+        self._test_compiled_fsm_accepts_opcodes(ed_fsm, [0xED], ed_two_bytes)
+        self._test_compiled_fsm_accepts_opcodes(ed_fsm, [0xED], ed_four_bytes, ignore_byte, ignore_byte)
+
+        for prefix, fsm, fsm_bytes in [(0xDD, dd_fsm, self._z80_fsm_builder._dd_fsm_bytes()),
+                                       (0xFD, fd_fsm, self._z80_fsm_builder._fd_fsm_bytes())]:
+            two_bytes, three_bytes, four_bytes = fsm_bytes
+            self._test_compiled_fsm_accepts_opcodes(fsm, [prefix], two_bytes)
+            self._test_compiled_fsm_accepts_opcodes(fsm, [prefix], three_bytes, ignore_byte)
+            self._test_compiled_fsm_accepts_opcodes(fsm, [prefix], four_bytes, ignore_byte, ignore_byte)
+
+    @raises(Z80FSMRejectedInput)
+    def test_compiled_fsm_rejects_opcode(self):
+        _, _, ed_fsm, _, _ = self._z80_fsm_builder.build(compiled=True)
+        self._run_compiled_fsm(ed_fsm, [0xED, 0xFF])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from unittest import TestCase
+from random import Random
+from ..cpu import Z80
+from ..ram import Ram
+
+
+class TestHandlerGenerator(TestCase):
+
+    _register_names = [
+        'a', 'f', 'b', 'c', 'd', 'e', 'h', 'l', 'i', 'r',
+        'ix', 'iy', 'sp', 'pc', 'a_', 'f_', 'bc_', 'de_', 'hl_',
+    ]
+
+    def setUp(self):
+        self._random = Random(0x280)
+        self._reference_z80 = Z80(ram=Ram())
+        self._generated_z80 = Z80(ram=Ram(), generated_handlers=True)
+        self._handler_generator = self._generated_z80._handler_generator
+
+    def _set_state(self, z80, state):
+        for register_name, bits in zip(self._register_names, state):
+            getattr(z80, register_name).bits = bits
+
+        z80.cycles = 0
+
+    def _get_state(self, z80):
+        return [getattr(z80, r).bits for r in self._register_names] + \
+            [z80.iff1, z80.iff2, z80.im, z80._cpu_halted, z80.cycles]
+
+    def _execute(self, decode, opcode):
+        try:
+            handler, operands = decode(opcode)
+            handler(*operands)
+        except Exception, e:
+            return type(e)
+
+        return None
+
+    def _decode_reference(self, opcode):
+        handler, operands = self._reference_z80._instruction_decoder.decode(opcode)
+        return handler._instruction_logic, operands
+
+    def test_generated_module_compiles(self):
+        compile(self._handler_generator.generate(), '<generated handlers>', 'exec')
+
+    def test_generated_handlers_match_reference(self):
+        instruction_decoder = self._generated_z80._instruction_decoder
+
+        for (prefix, byte, length), Instruction, _, _ in self._handler_generator._encodings():
+            opcode = instruction_decoder._sample_opcode(prefix, byte, length, self._random.randint(0x00, 0xFF))
+            state = [self._random.randint(0x00, 0xFFFF) for _ in self._register_names]
+            self._set_state(self._reference_z80, state)
+            self._set_state(self._generated_z80, state)
+
+            self.assertEqual(
+                self._execute(self._decode_reference, opcode),
+                self._execute(self._handler_generator.decode, opcode),
+                msg='{0} {1}'.format(Instruction.__name__, opcode)
+            )
+            self.assertEqual(
+                self._get_state(self._reference_z80), self._get_state(self._generated_z80),
+                msg='{0} {1}'.format(Instruction.__name__, opcode)
+            )
+            self.assertTrue(
+                self._reference_z80.ram._ram == self._generated_z80.ram._ram,
+                msg='{0} {1}'.format(Instruction.__name__, opcode)
+            )
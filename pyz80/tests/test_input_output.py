@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from ..instruction.input_output import Inir, Otir
+from ..io import Device
+from ..timing import TStates
+from .test_z80_base import TestZ80
+
+
+class QueueDevice(Device):
+
+    address = 0x10
+
+    def run(self):
+        pass
+
+
+class TestInputOutput(TestZ80):
+    def setUp(self):
+        super(TestInputOutput, self).setUp()
+        self._z80.load_device(QueueDevice)
+        self._device = self._z80.device_manager._devices[0]
+        self._z80.c.bits = QueueDevice.address
+
+    def test_inir(self):
+        input_bytes = [self._get_random_byte() for _ in range(0x10)]
+        [self._device._write(byte) for byte in input_bytes]
+        self._z80.hl.bits, self._z80.b.bits = 0x2000, len(input_bytes)
+        Inir(self._z80).execute()
+
+        self.assertEqual(self._z80.ram.read_bytes(0x2000, len(input_bytes)), input_bytes)
+        self.assertEqual(self._z80.hl.bits, 0x2000 + len(input_bytes))
+        self.assertEqual(self._z80.b.bits, 0x00)
+        self.assertTrue(self._z80.f.zero_flag)
+        self.assertEqual(self._z80.cycles, TStates.REPEAT * (len(input_bytes) - 1))
+
+    def test_otir(self):
+        output_bytes = [self._get_random_byte() for _ in range(0x10)]
+        self._z80.ram.load(output_bytes, 0x2000)
+        self._z80.hl.bits, self._z80.b.bits = 0x2000, len(output_bytes)
+        Otir(self._z80).execute()
+
+        self.assertEqual([self._device._read() for _ in output_bytes], output_bytes)
+        self.assertEqual(self._z80.hl.bits, 0x2000 + len(output_bytes))
+        self.assertEqual(self._z80.b.bits, 0x00)
+        self.assertTrue(self._z80.f.zero_flag)
+        self.assertEqual(self._z80.cycles, TStates.REPEAT * (len(output_bytes) - 1))
+
+    def test_inir_with_b_0_repeats_0x100_times(self):
+        input_bytes = [self._get_random_byte() for _ in range(0x100)]
+        [self._device._write(byte) for byte in input_bytes]
+        self._z80.ram.load([0xED, 0xB2])
+        self._z80.hl.bits, self._z80.b.bits = 0x2000, 0x00
+
+        self.assertEqual(self._z80.step(), TStates.REPEAT * 0xFF + 16)
+        self.assertEqual(self._z80.ram.read_bytes(0x2000, 0x100), input_bytes)
+        self.assertEqual((self._z80.hl.bits, self._z80.b.bits), (0x2100, 0x00))
+
+    def test_otir_with_b_0_repeats_0x100_times(self):
+        output_bytes = [self._get_random_byte() for _ in range(0x100)]
+        self._z80.ram.load(output_bytes, 0x2000)
+        self._z80.ram.load([0xED, 0xB3])
+        self._z80.hl.bits, self._z80.b.bits = 0x2000, 0x00
+
+        self.assertEqual(self._z80.step(), TStates.REPEAT * 0xFF + 16)
+        self.assertEqual([self._device._read() for _ in output_bytes], output_bytes)
+        self.assertEqual((self._z80.hl.bits, self._z80.b.bits), (0x2100, 0x00))
+
+    def test_indr(self):
+        input_bytes = [self._get_random_byte() for _ in range(0x10)]
+        [self._device._write(byte) for byte in input_bytes]
+        self._z80.ram.load([0xED, 0xBA])
+        self._z80.hl.bits, self._z80.b.bits = 0x200F, len(input_bytes)
+
+        self.assertEqual(self._z80.step(), TStates.of([0xED, 0xBA]) + TStates.REPEAT * (len(input_bytes) - 1))
+        self.assertEqual(self._z80.ram.read_bytes(0x2000, len(input_bytes)), input_bytes[::-1])
+        self.assertEqual(self._z80.hl.bits, 0x1FFF)
+        self.assertEqual(self._z80.b.bits, 0x00)
+        self.assertTrue(self._z80.f.zero_flag)
+
+    def test_otdr(self):
+        output_bytes = [self._get_random_byte() for _ in range(0x10)]
+        self._z80.ram.load(output_bytes, 0x2000)
+        self._z80.ram.load([0xED, 0xBB])
+        self._z80.hl.bits, self._z80.b.bits = 0x200F, len(output_bytes)
+
+        self.assertEqual(self._z80.step(), TStates.of([0xED, 0xBB]) + TStates.REPEAT * (len(output_bytes) - 1))
+        self.assertEqual([self._device._read() for _ in output_bytes], output_bytes[::-1])
+        self.assertEqual(self._z80.hl.bits, 0x1FFF)
+        self.assertEqual(self._z80.b.bits, 0x00)
+        self.assertTrue(self._z80.f.zero_flag)
+
+    def test_indr_otdr_with_b_0_repeat_0x100_times(self):
+        [self._device._write(0x00) for _ in range(0x100)]
+        self._z80.ram.load([0xED, 0xBA, 0xED, 0xBB])
+        self._z80.hl.bits, self._z80.b.bits = 0x20FF, 0x00
+        self.assertEqual(self._z80.step(), TStates.REPEAT * 0xFF + 16)
+        self.assertEqual((self._z80.hl.bits, self._z80.b.bits), (0x1FFF, 0x00))
+
+        self._z80.hl.bits = 0x20FF
+        self.assertEqual(self._z80.step(), TStates.REPEAT * 0xFF + 16)
+        self.assertEqual((self._z80.hl.bits, self._z80.b.bits), (0x1FFF, 0x00))
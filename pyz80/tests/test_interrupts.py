@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from nose.tools import raises
+from unittest import TestCase
+from ..cpu import Z80
+from ..io import DeviceManager, InterruptManagerError
+from ..ram import Ram
+
+
+class TestInterrupts(TestCase):
+    def setUp(self):
+        self._z80 = Z80(ram=Ram(), device_manager=DeviceManager())
+        self._z80.sp.bits = 0x1000
+        self._z80.ram.fill(0x00, 0x100, 0x00)
+
+    def _pop(self):
+        self._z80.sp.bits += 2
+        return self._z80.ram.read_word(self._z80.sp.bits - 2)
+
+    def test_no_interrupt_pending(self):
+        self._z80.step()
+        self.assertFalse(self._z80.interrupt_pending)
+
+    def test_im1(self):
+        self._z80.ram.load([0xFB, 0x00, 0x00])                  # EI, NOP, NOP
+        self._z80.im = 0x01
+        self._z80.interrupt_manager.int()
+        self.assertFalse(self._z80.interrupt_pending)
+
+        self._z80.step()
+        self.assertTrue(self._z80.interrupt_pending)
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x02)
+
+        self.assertEqual(self._z80.step(), 13 + 4)
+        self.assertEqual(self._z80.pc.bits, 0x39)
+        self.assertEqual((self._z80.iff1, self._z80.iff2), (0x00, 0x00))
+        self.assertFalse(self._z80.interrupt_pending)
+        self.assertEqual(self._pop(), 0x02)
+
+    def test_di_masks_interrupts(self):
+        self._z80.ram.load([0xFB, 0x00, 0xF3, 0x00, 0xFB, 0x00, 0x00])  # EI, NOP, DI, NOP, EI, NOP, NOP
+        self._z80.im = 0x01
+        [self._z80.step() for _ in range(3)]
+        self._z80.interrupt_manager.int()
+        self.assertFalse(self._z80.interrupt_pending)
+        [self._z80.step() for _ in range(3)]
+        self.assertEqual(self._z80.pc.bits, 0x06)
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x39)
+
+    def test_clear_int(self):
+        self._z80.ram.load([0xFB, 0x00, 0x00])
+        self._z80.interrupt_manager.int()
+        self._z80.step()
+        self._z80.interrupt_manager.clear_int()
+        self._z80.step()
+        self.assertFalse(self._z80.interrupt_pending)
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x03)
+
+    def test_ei_delay_does_not_depend_on_cycles(self):
+        self._z80.ram.load([0xFB, 0x00, 0x00])
+        self._z80.im = 0x01
+        self._z80.step()
+        self._z80.cycles = 0x00
+        self._z80.interrupt_manager.int()
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x02)
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x39)
+
+    def test_ei_delay_only_covers_the_next_instruction(self):
+        self._z80.ram.load([0xFB, 0x00, 0x00, 0x00])
+        self._z80.im = 0x01
+        [self._z80.step() for _ in range(2)]
+        self.assertFalse(self._z80.interrupt_pending)
+        self._z80.interrupt_manager.int()
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x39)
+
+    def test_im2(self):
+        self._z80.ram.load([0xFB, 0x00])
+        self._z80.ram.write_word(0x8010, 0x1234)
+        self._z80.im, self._z80.i.bits = 0x02, 0x80
+        self._z80.interrupt_manager.int(0x10)
+        [self._z80.step() for _ in range(2)]
+        self.assertEqual(self._z80.step(), 19 + 4)
+        self.assertEqual(self._z80.pc.bits, 0x1235)
+
+    def test_im0(self):
+        self._z80.ram.load([0xFB, 0x00])
+        self._z80.interrupt_manager.int(0xD7)                   # RST 10
+        [self._z80.step() for _ in range(2)]
+        self.assertEqual(self._z80.step(), 13 + 4)
+        self.assertEqual(self._z80.pc.bits, 0x11)
+        self.assertEqual(self._pop(), 0x02)
+
+    @raises(InterruptManagerError)
+    def test_im0_multi_byte_opcode_fails(self):
+        self._z80.ram.load([0xFB, 0x00])
+        self._z80.interrupt_manager.int(0xCD)
+        [self._z80.step() for _ in range(3)]
+
+    def test_nmi_and_retn(self):
+        self._z80.ram.load([0xFB, 0x00])
+        self._z80.ram.load([0x00, 0xED, 0x45], 0x66)            # NOP, RETN
+        self._z80.step()
+        self._z80.interrupt_manager.nmi()
+        self.assertEqual(self._z80.step(), 11 + 4)
+        self.assertEqual(self._z80.pc.bits, 0x67)
+        self.assertEqual((self._z80.iff1, self._z80.iff2), (0x00, 0x01))
+
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x01)
+        self.assertEqual((self._z80.iff1, self._z80.iff2), (0x01, 0x01))
+
+    def test_nmi_ignores_di(self):
+        self._z80.interrupt_manager.nmi()
+        self._z80.step()
+        self.assertEqual(self._z80.pc.bits, 0x67)
+
+    def test_halt_keeps_executing_halt(self):
+        self._z80.ram.load([0x76])
+        self.assertEqual([self._z80.step() for _ in range(3)], [4, 4, 4])
+        self.assertTrue(self._z80.halted)
+        self.assertEqual(self._z80.pc.bits, 0x00)
+
+    def test_halt_skips_to_next_event(self):
+        self._z80.ram.load([0xED, 0x56, 0xFB, 0x76])            # IM 1, EI, HALT
+        self._z80.ram.load([0xFB, 0xED, 0x4D], 0x38)            # EI, RETI
+        self._z80.scheduler.schedule(70000, self._z80.interrupt_manager.int)
+        executions = []
+        execute_next = self._z80._execute_next
+        self._z80._execute_next = lambda: executions.append(execute_next())
+        self._z80.run(cycles=70000 + 13)
+
+        self.assertLess(len(executions), 10)
+        self.assertFalse(self._z80.halted)
+        self.assertEqual(self._z80.pc.bits, 0x39)
+        self.assertEqual(self._z80.cycles, 70000 + 13 + 4)
+        self.assertEqual(self._pop(), 0x04)
+
+    def test_nmi_resumes_halted_cpu(self):
+        self._z80.ram.load([0x00, 0x76])
+        [self._z80.step() for _ in range(2)]
+        self._z80.interrupt_manager.nmi()
+        self._z80.step()
+        self.assertFalse(self._z80.halted)
+        self.assertEqual(self._pop(), 0x02)
@@ -21,6 +21,7 @@ Copyright 2014 Lucas Liendo.
 
 from .test_z80_base import TestZ80
 from ..instruction.decoder import InstructionDecoder
+from ..instruction.cpu_control import Daa
 
 
 class TestMisc(TestZ80):
@@ -28,3 +29,13 @@ class TestMisc(TestZ80):
         instruction_decoder = InstructionDecoder(None)
         regexps = map(lambda i: i.regexp.pattern, instruction_decoder._z80_instructions())
         self.assertEqual(len(regexps), len(set(regexps)))
+
+    def test_daa(self):
+        """ Test DAA """
+
+        self._z80.a.bits = 0x3C
+        self._z80.f.bits = 0x00
+        Daa(self._z80).execute()
+        self.assertEqual(self._z80.a.bits, 0x42)
+        self.assertEqual(self._z80.f.half_carry_flag, 0x01)
+        self.assertEqual(self._z80.f.carry_flag, 0x00)
@@ -19,9 +19,13 @@ along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
 Copyright 2014 Lucas Liendo.
 """
 
+from os import remove
+from tempfile import mkstemp
 from nose.tools import raises
 from unittest import TestCase
-from ..ram import Ram, RamInvalidAddress
+from ..ram import Ram, UncheckedRam, RamInvalidAddress
+from ..ram.mapped_ram import MappedRam, MappedRamError
+from ..ram.paged_ram import PagedRam, PagedRamError
 
 
 class TestRam(TestCase):
@@ -50,6 +54,30 @@ class TestRam(TestCase):
         self._ram_module.write(address, value)
         self.assertEqual(self._ram_module.read(address), 0xFF)
 
+    def test_read_bytes(self):
+        address = 0x25
+        self._ram_module.load([0xDD, 0xCB, 0x05, 0xC6], address)
+        self.assertEqual(self._ram_module.read_bytes(address, 4), [0xDD, 0xCB, 0x05, 0xC6])
+
+    @raises(RamInvalidAddress)
+    def test_read_bytes_behind_upper_limit_fails(self):
+        self._ram_module.read_bytes(0xFFFF, 2)
+
+    def test_write_watchers(self):
+        written_addresses = []
+        self._ram_module.add_write_watcher(written_addresses.append)
+        self._ram_module.watch(0x10, 2)
+        self._ram_module.load([0xFF for i in range(0, 4)], 0x0F)
+        self.assertEqual(written_addresses, [0x10, 0x11])
+
+    def test_clear_notifies_write_watchers(self):
+        written_addresses = []
+        self._ram_module.add_write_watcher(written_addresses.append)
+        self._ram_module.watch(0x10, 1)
+        self._ram_module.clear()
+        self._ram_module.write(0x10, 0xFF)
+        self.assertEqual(written_addresses, [0x10])
+
     def test_load(self):
         address = 0xFFFF / 2
         values = [0xFF for i in range(0, 2)]
@@ -58,3 +86,170 @@ class TestRam(TestCase):
         address = 0xFFFF - 1
         values = [0xFF for i in range(0, 2)]
         self._ram_module.load(values, address)
+
+    def test_read_write_word(self):
+        self._ram_module.write_word(0x10, 0x1234)
+        self.assertEqual(self._ram_module.read_bytes(0x10, 2), [0x34, 0x12])
+        self.assertEqual(self._ram_module.read_word(0x10), 0x1234)
+
+    @raises(RamInvalidAddress)
+    def test_read_word_behind_upper_limit_fails(self):
+        self._ram_module.read_word(0xFFFF)
+
+    def test_view_and_dump(self):
+        self._ram_module.load([0x01, 0x02, 0x03], 0x20)
+        view = self._ram_module.view(0x20, 3)
+        self.assertEqual(view.tobytes(), '\x01\x02\x03')
+        self._ram_module.write(0x21, 0xFF)
+        self.assertEqual(view.tobytes(), '\x01\xFF\x03')
+        self.assertEqual(self._ram_module.dump(0x20, 3), bytearray([0x01, 0xFF, 0x03]))
+
+    def test_fill_and_copy(self):
+        written_addresses = []
+        self._ram_module.add_write_watcher(written_addresses.append)
+        self._ram_module.watch(0x101, 1)
+        self._ram_module.fill(0x00, 0x04, 0xAA)
+        self._ram_module.copy(0x00, 0x100, 0x04)
+        self.assertEqual(self._ram_module.read_bytes(0x100, 5), [0xAA, 0xAA, 0xAA, 0xAA, 0x00])
+        self.assertEqual(written_addresses, [0x101])
+
+    @raises(RamInvalidAddress)
+    def test_fill_behind_upper_limit_fails(self):
+        self._ram_module.fill(0xFFFF, 2, 0x00)
+
+    def test_unchecked_ram_wraps_around(self):
+        ram = UncheckedRam()
+        ram.write(0xFFFF + 1, 0x12)
+        ram.write(0xFFFF, 0x34)
+        self.assertEqual(ram.read(0x00), 0x12)
+        self.assertEqual(ram.read_word(0xFFFF), 0x1234)
+        self.assertEqual(ram.read_bytes(0xFFFF, 2), [0x34, 0x12])
+
+    def test_io_pages(self):
+        writes = []
+        self._ram_module.map_io_page(0x80, read_handler=lambda address: address, write_handler=lambda *w: writes.append(w))
+        self._ram_module.write(0x8001, 0x12)
+        self._ram_module.write(0x7FFF, 0x34)
+        self.assertEqual(writes, [(0x8001, 0x12)])
+        self.assertEqual(self._ram_module.read_bytes(0x7FFF, 2), [0x34, 0x00])
+        self.assertEqual(self._ram_module.read_word(0x8001), 0x0201)
+
+        self._ram_module.unmap_io_page(0x80)
+        self.assertEqual(self._ram_module.read(0x8001), 0x00)
+        self.assertFalse('read' in self._ram_module.__dict__)
+
+
+class TestMappedRam(TestCase):
+    def setUp(self):
+        _, self._image_path = mkstemp()
+
+    def tearDown(self):
+        remove(self._image_path)
+
+    def _write_image(self, image):
+        with open(self._image_path, 'wb') as fd:
+            fd.write(image)
+
+    def test_writes_persist_to_image(self):
+        ram = MappedRam(self._image_path)
+        self.assertEqual(ram.size, 0xFFFF + 1)
+        ram.write(0x10, 0xAB)
+        ram.write_word(0x20, 0x1234)
+        ram.close()
+
+        ram = MappedRam(self._image_path)
+        self.assertEqual(ram.read(0x10), 0xAB)
+        self.assertEqual(ram.read_word(0x20), 0x1234)
+        self.assertEqual(ram.read_bytes(0x20, 2), [0x34, 0x12])
+        ram.close()
+
+    def test_missing_image_is_created(self):
+        remove(self._image_path)
+        MappedRam(self._image_path, size=0x10).close()
+
+        with open(self._image_path, 'rb') as fd:
+            self.assertEqual(fd.read(), '\x00' * 0x10)
+
+    def test_bulk_operations(self):
+        ram = MappedRam(self._image_path, size=0x100)
+        ram.load([0x01, 0x02, 0x03], 0x10)
+        ram.copy(0x10, 0x11, 0x03)
+        ram.fill(0x00, 0x02, 0xFF)
+        self.assertEqual(ram.dump(0x00, 0x02), bytearray([0xFF, 0xFF]))
+        self.assertEqual(ram.dump(0x10, 0x04), bytearray([0x01, 0x01, 0x02, 0x03]))
+        ram.close()
+
+    def test_read_only_image(self):
+        self._write_image('\x3E\x01\x76')
+        rom = MappedRam(self._image_path, read_only=True)
+        self.assertEqual(rom.size, 0x03)
+        self.assertEqual(rom.read_bytes(0x00, 0x03), [0x3E, 0x01, 0x76])
+        self.assertRaises(MappedRamError, rom.write, 0x00, 0x00)
+        self.assertRaises(MappedRamError, rom.load, [0x00])
+        rom.close()
+
+    @raises(RamInvalidAddress)
+    def test_read_behind_image_fails(self):
+        self._write_image('\x00')
+        MappedRam(self._image_path, read_only=True).read(0x01)
+
+    @raises(MappedRamError)
+    def test_empty_read_only_image_fails(self):
+        MappedRam(self._image_path, read_only=True)
+
+
+class TestPagedRam(TestCase):
+    def setUp(self):
+        self._ram = PagedRam(store_size=1024 * 128, page_size=1024 * 16)
+
+    def test_bank_switch(self):
+        self._ram.write(0xC000, 0x01)
+        self._ram.load_store([0x02], 0x10000)
+        self._ram.map_page(3, 4)
+        self.assertEqual(self._ram.read(0xC000), 0x02)
+        self._ram.write(0xC001, 0x03)
+        self._ram.map_page(3, 3)
+        self.assertEqual(self._ram.read_bytes(0xC000, 2), [0x01, 0x00])
+        self._ram.map_page(3, 4)
+        self.assertEqual(self._ram.read_bytes(0xC000, 2), [0x02, 0x03])
+
+    def test_read_only_pages_ignore_writes(self):
+        self._ram.load_store([0xC3, 0x00, 0x01], 0x00)
+        self._ram.set_read_only(0)
+        self._ram.write(0x00, 0xFF)
+        self._ram.load([0x00, 0x00], 0x3FFF)
+        self.assertEqual(self._ram.read_bytes(0x00, 3), [0xC3, 0x00, 0x01])
+        self.assertEqual(self._ram.read(0x3FFF), 0x00)
+        self.assertEqual(self._ram.read(0x4000), 0x00)
+        self.assertTrue(self._ram.is_read_only(0x3FFF))
+        self.assertFalse(self._ram.is_read_only(0x4000))
+
+    def test_ranges_across_pages(self):
+        self._ram.map_bank(0x4000, 0x10000, 0x8000)
+        self._ram.load([0x01, 0x02, 0x03, 0x04], 0x7FFE)
+        self._ram.write_word(0x9000, 0xBEEF)
+        self.assertEqual(self._ram.dump(0x7FFE, 4), bytearray([0x01, 0x02, 0x03, 0x04]))
+        self.assertEqual(self._ram.read_word(0x7FFF), 0x0302)
+        self._ram.copy(0x7FFE, 0x00, 4)
+        self.assertEqual(self._ram.read_bytes(0x00, 4), [0x01, 0x02, 0x03, 0x04])
+        self._ram.map_bank(0x4000, 0x4000, 0x8000)
+        self.assertEqual(self._ram.read_word(0x9000), 0x0000)
+
+    def test_remapping_notifies_watchers(self):
+        written_addresses = []
+        self._ram.add_write_watcher(written_addresses.append)
+        self._ram.watch(0x8010, 2)
+        self._ram.map_page(2, 5)
+        self.assertEqual(written_addresses, [0x8010, 0x8011])
+
+    @raises(RamInvalidAddress)
+    def test_view_across_pages_fails(self):
+        self._ram.view(0x3FFF, 2)
+
+    @raises(PagedRamError)
+    def test_invalid_store_page_fails(self):
+        self._ram.map_page(0, 8)
+
+    @raises(PagedRamError)
+    def test_unaligned_bank_fails(self):
+        self._ram.map_bank(0x4000, 0x10001, 0x4000)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from nose.tools import raises
+from unittest import TestCase
+from ..register import Z80RegisterFile, Z80FlagsRegister, Z80RegisterError
+
+
+class TestZ80RegisterFile(TestCase):
+    def setUp(self):
+        self._register_file = Z80RegisterFile()
+        self._bc = self._register_file.word_register('bc')
+        self._hl = self._register_file.word_register('hl')
+        self._bc_ = self._register_file.word_register('bc_')
+        self._hl_ = self._register_file.word_register('hl_')
+        self._a = self._register_file.byte_register('a')
+        self._f = self._register_file.byte_register('f', RegisterClass=Z80FlagsRegister)
+        self._a_ = self._register_file.byte_register('a_')
+
+    def test_word_register_views(self):
+        self._bc.bits = 0x1234
+        self.assertEqual(self._bc.higher.bits, 0x12)
+        self.assertEqual(self._bc.lower.bits, 0x34)
+
+        self._bc.lower.bits = 0xFF
+        self.assertEqual(self._bc.bits, 0x12FF)
+        self.assertEqual(self._register_file.word_register('bc').bits, 0x12FF)
+
+    def test_word_register_nth_bit(self):
+        self._hl.bits = 0x8000
+        self.assertEqual(self._hl.nth_bit(15), 0x01)
+        self._hl.reset_nth_bit(15)
+        self.assertEqual(self._hl.bits, 0x0000)
+
+    def test_byte_registers(self):
+        self._a.bits = 0xAB
+        self._f.set_carry_flag()
+        self.assertEqual(self._register_file.word_register('af').bits, 0xAB01)
+
+    def test_exchange(self):
+        self._bc.bits, self._hl.bits = 0x1111, 0x2222
+        self._bc_.bits, self._hl_.bits = 0x3333, 0x4444
+        self._register_file.exchange(['bc', 'de', 'hl'], ['bc_', 'de_', 'hl_'])
+        self.assertEqual([self._bc.bits, self._hl.bits], [0x3333, 0x4444])
+        self.assertEqual([self._bc_.bits, self._hl_.bits], [0x1111, 0x2222])
+
+    def test_exchange_evaluates_deferred_flags(self):
+        self._f.defer(self._f.set_carry_flag, ())
+        self._register_file.exchange(['af'], ['af_'])
+        self.assertEqual(self._f.bits, 0x00)
+        self.assertEqual(self._register_file.byte_register('f_', RegisterClass=Z80FlagsRegister).bits, 0x01)
+
+    @raises(Z80RegisterError)
+    def test_exchange_not_consecutive_registers_fails(self):
+        self._register_file.exchange(['bc', 'hl'], ['bc_', 'hl_'])
+
+    def test_snapshot_and_restore(self):
+        self._a.bits = 0x12
+        snapshot = self._register_file.snapshot()
+        self._a.bits = 0x34
+        self._register_file.restore(snapshot)
+        self.assertEqual(self._a.bits, 0x12)
+        self.assertEqual(self._a_.bits, 0x00)
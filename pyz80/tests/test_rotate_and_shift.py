@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from ..instruction.rotate_and_shift import *
+from .test_z80_base import TestZ80
+
+
+class TestRotateAndShift(TestZ80):
+
+    def test_rlc_r(self):
+        """ Test RLC r """
+
+        instruction = RlcR(self._z80)
+        self._z80.b.bits = 0x81
+        instruction.execute([0b000])
+        self.assertEqual(self._z80.b.bits, 0x03)
+        self.assertEqual(self._z80.f.carry_flag, 0x01)
+
+        # The same instance must not keep the previous carry.
+        self._z80.b.bits = 0x01
+        instruction.execute([0b000])
+        self.assertEqual(self._z80.b.bits, 0x02)
+        self.assertEqual(self._z80.f.carry_flag, 0x00)
+
+    def test_rl_r(self):
+        """ Test RL r """
+
+        instruction = RlR(self._z80)
+        self._z80.f.reset_carry_flag()
+        self._z80.c.bits = 0x80
+        instruction.execute([0b001])
+        self.assertEqual(self._z80.c.bits, 0x00)
+        self.assertEqual(self._z80.f.carry_flag, 0x01)
+        instruction.execute([0b001])
+        self.assertEqual(self._z80.c.bits, 0x01)
+        self.assertEqual(self._z80.f.carry_flag, 0x00)
+
+    def test_rr_r(self):
+        """ Test RR r """
+
+        instruction = RrR(self._z80)
+        self._z80.f.set_carry_flag()
+        self._z80.d.bits = 0x02
+        instruction.execute([0b010])
+        self.assertEqual(self._z80.d.bits, 0x81)
+        self.assertEqual(self._z80.f.carry_flag, 0x00)
+
+    def test_srl_r(self):
+        """ Test SRL r """
+
+        instruction = SrlR(self._z80)
+        self._z80.e.bits = 0x81
+        instruction.execute([0b011])
+        self.assertEqual(self._z80.e.bits, 0x40)
+        self.assertEqual(self._z80.f.carry_flag, 0x01)
+
+    def test_rlc_indirect_ix_r(self):
+        """ Test RLC (IX + d), r """
+
+        instruction = RlcIndirectIXR(self._z80)
+        self._z80.ix.bits = 0x1000
+        self._z80.ram.write(0x1002, 0x80)
+        instruction.execute([0x02, 0b111])
+        self.assertEqual(self._z80.ram.read(0x1002), 0x01)
+        self.assertEqual(self._z80.a.bits, 0x01)
+        self.assertEqual(self._z80.f.carry_flag, 0x01)
+
+    def test_rlca_keeps_sign_zero_and_parity_flags(self):
+        """ Test RLCA """
+
+        instruction = Rlca(self._z80)
+        self._z80.f.bits = 0xC4
+        self._z80.a.bits = 0x80
+        instruction.execute()
+        self.assertEqual(self._z80.a.bits, 0x01)
+        self.assertEqual(self._z80.f.bits, 0xC5)
+
+    def test_bit_sign_flag(self):
+        """ Test BIT b, A """
+
+        self._z80.ram.load([0xCB, 0x47, 0xCB, 0x7F])            # BIT 0, A ; BIT 7, A
+        self._z80.a.bits = 0x81
+        self._z80.step()
+        self.assertEqual(self._z80.f.bits, 0x10)
+        self._z80.step()
+        self.assertEqual(self._z80.f.bits, 0x90)
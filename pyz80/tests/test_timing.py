@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from nose.tools import raises
+from unittest import TestCase
+from ..cpu import Z80
+from ..ram import Ram
+from ..timing import TStates, TStatesError, Throttle
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTStates(TestCase):
+    def test_t_states(self):
+        self.assertEqual(TStates.of([0x00]), 4)
+        self.assertEqual(TStates.of([0x7E]), 7)
+        self.assertEqual(TStates.of([0xCB, 0x06]), 15)
+        self.assertEqual(TStates.of([0xCB, 0x46]), 12)
+        self.assertEqual(TStates.of([0xED, 0xB0]), 16)
+        self.assertEqual(TStates.of([0xDD, 0x7E, 0x00]), 19)
+        self.assertEqual(TStates.of([0xFD, 0xE5]), 15)
+        self.assertEqual(TStates.of([0xDD, 0xCB, 0x00, 0x06]), 23)
+
+    @raises(TStatesError)
+    def test_incomplete_opcode_fails(self):
+        TStates.of([0xED])
+
+
+class TestThrottle(TestCase):
+    def setUp(self):
+        self._clock = FakeClock()
+        self._throttle = Throttle(
+            frequency=1000, frame_rate=10, max_drift=0.5,
+            clock=self._clock.time, sleep=self._clock.sleep
+        )
+
+    def test_sleeps_what_is_left_of_a_frame(self):
+        self._throttle.synchronize(0)
+        self._clock.now += 0.04
+        self.assertAlmostEqual(self._throttle.synchronize(100), -0.06)
+        self.assertAlmostEqual(self._clock.sleeps[-1], 0.06)
+        self._clock.now += 0.1
+        self.assertAlmostEqual(self._throttle.synchronize(200), 0.0)
+
+    def test_resets_when_falling_behind(self):
+        self._throttle.synchronize(0)
+        self._clock.now += 1.0
+        self.assertAlmostEqual(self._throttle.synchronize(100), 0.9)
+        self.assertEqual(self._throttle.resets, 1)
+        self._clock.now += 0.05
+        self._throttle.synchronize(200)
+        self.assertAlmostEqual(self._clock.sleeps[-1], 0.05)
+
+    def test_throttled_run(self):
+        z80 = Z80(ram=Ram(), throttle=self._throttle)
+        z80.ram.load([0x00] * 0x100)
+        self.assertEqual(z80.run(cycles=400), 400)
+        self.assertEqual(len(self._clock.sleeps), 4)
+        self.assertAlmostEqual(self._clock.now, 0.4)
+
+
+class StopRun(Exception):
+    pass
+
+
+class TestScheduler(TestCase):
+    def _stop(self):
+        raise StopRun
+
+    def test_events_run_in_order(self):
+        scheduler = Z80(ram=Ram()).scheduler
+        calls = []
+        scheduler.schedule(200, lambda: calls.append('b'))
+        scheduler.schedule(100, lambda: calls.append('a'))
+        scheduler.schedule(200, lambda: calls.append('c'))
+        self.assertEqual(scheduler.next_cycles, 100)
+
+        scheduler.run_due(150)
+        self.assertEqual(calls, ['a'])
+        scheduler.run_due(200)
+        self.assertEqual(calls, ['a', 'b', 'c'])
+        self.assertEqual(scheduler.next_cycles, None)
+
+    def test_run_stops_at_events(self):
+        z80 = Z80(ram=Ram())
+        z80.ram.load([0x00] * 0x100)
+        stops = []
+        z80.scheduler.schedule(10, lambda: stops.append(z80.cycles))
+        z80.scheduler.schedule(30, lambda: stops.append(z80.cycles))
+        z80.run(cycles=40)
+        self.assertEqual(stops, [12, 32])
+
+    def test_event_scheduled_during_a_slice(self):
+        z80 = Z80(ram=Ram())
+        z80.ram.load([0x32, 0x40, 0x00, 0x76])                  # LD (0x4000), A ; HALT
+        stops = []
+        z80.ram.map_io_page(0x40, lambda address: 0x00, lambda *_: z80.scheduler.schedule(23, lambda: stops.append(z80.cycles)))
+        z80.run(cycles=100000)
+        self.assertEqual(stops, [25])
+
+    def test_unbounded_run_calls_events(self):
+        z80 = Z80(ram=Ram())
+        z80.ram.load([0x32, 0x40, 0x00, 0x76])                  # LD (0x4000), A ; HALT
+        z80.ram.map_io_page(0x40, lambda address: 0x00, lambda *_: z80.scheduler.schedule(200, self._stop))
+        self.assertRaises(StopRun, z80.run)
+        self.assertEqual(z80.cycles, 201)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from unittest import TestCase
+from ..cpu import Z80
+from ..ram import Ram
+
+
+class TestBlockTranslator(TestCase):
+    def setUp(self):
+        self._z80 = Z80(ram=Ram(), translate_blocks=True)
+        self._block_translator = self._z80._block_translator
+
+    def _registers(self, z80):
+        return [getattr(z80, r).bits for r in ['a', 'b', 'c', 'd', 'e', 'h', 'l', 'ix', 'iy', 'pc']]
+
+    def test_block_matches_interpreter(self):
+        program = [
+            0x21, 0x01, 0x00,       # LD HL, 0100
+            0x06, 0x12,             # LD B, 12
+            0x48,                   # LD C, B
+            0x71,                   # LD (HL), C
+            0x7E,                   # LD A, (HL)
+            0x2F,                   # CPL
+            0x32, 0x01, 0x01,       # LD (0101), A
+            0xDD, 0x21, 0x01, 0x00, # LD IX, 0100
+            0xDD, 0x56, 0x01,       # LD D, (IX + 01)
+            0xC3, 0x00, 0x00,       # JP 0000
+        ]
+        z80 = Z80(ram=Ram())
+        z80.ram.load(program)
+        self._z80.ram.load(program)
+
+        for _ in range(0, 10):
+            z80._execute_next()
+
+        self._z80._execute_next()
+        self.assertEqual(self._registers(self._z80), self._registers(z80))
+        self.assertEqual(self._z80.ram.read_bytes(0x100, 2), z80.ram.read_bytes(0x100, 2))
+
+    def test_arithmetic_block_matches_interpreter(self):
+        program = [
+            0x3E, 0x7F,             # LD A, 7F
+            0x06, 0x01,             # LD B, 01
+            0x80,                   # ADD A, B
+            0x91,                   # SUB C
+            0xA8,                   # XOR B
+            0x03,                   # INC BC
+            0x1B,                   # DEC DE
+            0x09,                   # ADD HL, BC
+            0x01, 0x12, 0x34,       # LD BC, 1234
+            0xCB, 0x00,             # RLC B
+            0xC3, 0x00, 0x00,       # JP 0000
+        ]
+        z80 = Z80(ram=Ram())
+        z80.ram.load(program)
+        self._z80.ram.load(program)
+
+        for _ in range(0, 11):
+            z80._execute_next()
+
+        self._z80._execute_next()
+        self.assertEqual(self._registers(self._z80) + [self._z80.f.bits], self._registers(z80) + [z80.f.bits])
+        self.assertEqual(self._z80.cycles, z80.cycles)
+
+    def test_block_ends_at_cycle_limit(self):
+        self._z80.ram.load([0x00] * 64)
+        self._z80._execute_next()
+        self.assertEqual(self._z80.pc.bits, 32)
+        self.assertEqual(self._z80.cycles, 128)
+
+    def test_block_ends_at_branch(self):
+        self._z80.ram.load([0x00, 0x18, 0x05, 0x00])
+        self._z80._execute_next()
+        self.assertEqual(self._z80.pc.bits, 0x08)
+
+    def test_write_invalidates_block(self):
+        self._z80.ram.load([0x06, 0x01, 0x76])
+        block = self._block_translator.translate(0x00)
+        self.assertTrue(self._block_translator.translate(0x00) is block)
+
+        self._z80.ram.write(0x01, 0x02)
+        self.assertFalse(self._block_translator.translate(0x00) is block)
+
+    def test_invalidation_drops_the_whole_block(self):
+        self._z80.ram.load([0x06, 0x01, 0x00, 0x76])
+        self._block_translator.translate(0x00)
+        self._block_translator.translate(0x02)
+        self._z80.ram.write(0x01, 0x02)
+        self.assertEqual(self._block_translator._covering_blocks, {0x02: set([0x02]), 0x03: set([0x02])})
+
+    def test_self_modifying_block(self):
+        self._z80.ram.load([
+            0x3E, 0x05,             # LD A, 05
+            0x32, 0x00, 0x06,       # LD (0006), A
+            0x06, 0x01,             # LD B, 01
+            0x76,                   # HALT
+        ])
+        self._z80._execute_next()
+        self.assertEqual(self._z80.pc.bits, 0x05)
+
+        self._z80._execute_next()
+        self.assertEqual(self._z80.b.bits, 0x05)
+
+    def test_block_uses_io_pages_mapped_later(self):
+        self._z80.ram.load([0x3A, 0x40, 0x00, 0x76])     # LD A, (4000) ; HALT
+        self._z80._execute_next()
+        self.assertEqual(self._z80.a.bits, 0x00)
+
+        self._z80.ram.map_io_page(0x40, read_handler=lambda address: 0x99, write_handler=lambda *_: None)
+        self._z80.pc.bits = 0x00
+        self._z80._execute_next()
+        self.assertEqual(self._z80.a.bits, 0x99)
+
+        self._z80.ram.unmap_io_page(0x40)
+        self._z80.pc.bits = 0x00
+        self._z80._execute_next()
+        self.assertEqual(self._z80.a.bits, 0x00)
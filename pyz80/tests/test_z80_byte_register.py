@@ -97,3 +97,11 @@ class TestZ80ByteRegister(TestCase):
         self.assertTrue(register.lsb)
         register.bits = 0x4
         self.assertFalse(register.lsb)
+
+    def test_bits_are_masked(self):
+        register = Z80ByteRegister(bits=0x1FF)
+        self.assertEqual(register.bits, 0xFF)
+
+    def test_registers_have_no_dict(self):
+        register = Z80ByteRegister()
+        self.assertFalse(hasattr(register, '__dict__'))
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from time import time, sleep
+from heapq import heappush, heappop
+from threading import Lock
+
+
+class TStatesError(Exception):
+    pass
+
+
+def _indexed_t_states(t_states):
+    """
+    DD & FD prefixed opcodes take 4 more T-states than their unprefixed
+    ones, but those that address memory through (IX + d) or (IY + d),
+    which have to fetch and add the offset.
+    """
+
+    indexed_t_states = [t + 4 for t in t_states]
+    indirect_opcodes = [0x46, 0x4E, 0x56, 0x5E, 0x66, 0x6E, 0x7E, 0x70, 0x71, 0x72, 0x73, 0x74, 0x75, 0x77]
+    indirect_opcodes += range(0x86, 0xBE + 1, 0x08)
+
+    for opcode in indirect_opcodes:
+        indexed_t_states[opcode] = 19
+
+    indexed_t_states[0x34] = indexed_t_states[0x35] = 23
+    indexed_t_states[0x36] = 19
+
+    return indexed_t_states
+
+
+class TStates(object):
+
+    """
+    T-states taken by every opcode. Conditional jumps, calls & returns
+    are listed with their condition not met, repeating block
+    instructions with a single repetition. Instructions add the extra
+    T-states themselves when they take a branch or repeat.
+    """
+
+    TAKEN_JR = 5
+    TAKEN_CALL = 7
+    TAKEN_RET = 6
+    REPEAT = 21
+
+    _t_states = [
+        4, 10, 7, 6, 4, 4, 7, 4, 4, 11, 7, 6, 4, 4, 7, 4,
+        8, 10, 7, 6, 4, 4, 7, 4, 12, 11, 7, 6, 4, 4, 7, 4,
+        7, 10, 16, 6, 4, 4, 7, 4, 7, 11, 16, 6, 4, 4, 7, 4,
+        7, 10, 13, 6, 11, 11, 10, 4, 7, 11, 13, 6, 4, 4, 7, 4,
+        4, 4, 4, 4, 4, 4, 7, 4, 4, 4, 4, 4, 4, 4, 7, 4,
+        4, 4, 4, 4, 4, 4, 7, 4, 4, 4, 4, 4, 4, 4, 7, 4,
+        4, 4, 4, 4, 4, 4, 7, 4, 4, 4, 4, 4, 4, 4, 7, 4,
+        7, 7, 7, 7, 7, 7, 4, 7, 4, 4, 4, 4, 4, 4, 7, 4,
+        4, 4, 4, 4, 4, 4, 7, 4, 4, 4, 4, 4, 4, 4, 7, 4,
+        4, 4, 4, 4, 4, 4, 7, 4, 4, 4, 4, 4, 4, 4, 7, 4,
+        4, 4, 4, 4, 4, 4, 7, 4, 4, 4, 4, 4, 4, 4, 7, 4,
+        4, 4, 4, 4, 4, 4, 7, 4, 4, 4, 4, 4, 4, 4, 7, 4,
+        5, 10, 10, 10, 10, 11, 7, 11, 5, 10, 10, 0, 10, 17, 7, 11,
+        5, 10, 10, 11, 10, 11, 7, 11, 5, 4, 10, 11, 10, 0, 7, 11,
+        5, 10, 10, 19, 10, 11, 7, 11, 5, 4, 10, 4, 10, 0, 7, 11,
+        5, 10, 10, 4, 10, 11, 7, 11, 5, 6, 10, 4, 10, 0, 7, 11,
+    ]
+
+    _cb_t_states = [
+        12 if (n & 0xC0 == 0x40) else 15 if (n & 0x07 == 0x06) else 8 for n in range(0xFF + 1)
+    ]
+
+    _ed_t_states = [
+        12, 12, 15, 20, 8, 14, 8, 9, 12, 12, 15, 20, 8, 14, 8, 9,
+        12, 12, 15, 20, 8, 14, 8, 9, 12, 12, 15, 20, 8, 14, 8, 9,
+        12, 12, 15, 20, 8, 14, 8, 18, 12, 12, 15, 20, 8, 14, 8, 18,
+        12, 12, 15, 20, 8, 14, 8, 8, 12, 12, 15, 20, 8, 14, 8, 8,
+    ]
+    _ed_t_states = [8] * 0x40 + _ed_t_states + [8] * 0x20 + [
+        16, 16, 16, 16, 8, 8, 8, 8, 16, 16, 16, 16, 8, 8, 8, 8,
+        16, 16, 16, 16, 8, 8, 8, 8, 16, 16, 16, 16, 8, 8, 8, 8,
+    ] + [8] * 0x40
+
+    _indexed_t_states = _indexed_t_states(_t_states)
+
+    _indexed_cb_t_states = [20 if (n & 0xC0 == 0x40) else 23 for n in range(0xFF + 1)]
+
+    @classmethod
+    def of(cls, opcode):
+        """
+        Returns the T-states taken by opcode (a list of bytes).
+        """
+
+        first_byte = opcode[0]
+
+        try:
+            if first_byte == 0xCB:
+                return cls._cb_t_states[opcode[1]]
+
+            if first_byte == 0xED:
+                return cls._ed_t_states[opcode[1]]
+
+            if first_byte in (0xDD, 0xFD):
+                if opcode[1] == 0xCB:
+                    return cls._indexed_cb_t_states[opcode[3]]
+
+                return cls._indexed_t_states[opcode[1]]
+        except IndexError:
+            raise TStatesError(
+                'Error - Incomplete opcode : {0}.'.format(' '.join('{:02X}'.format(b) for b in opcode))
+            )
+
+        return cls._t_states[first_byte]
+
+
+class Throttle(object):
+
+    """
+    Keeps a cpu running at a given clock frequency. The cpu runs a frame
+    worth of T-states at full speed and then calls synchronize(), which
+    sleeps whatever is left of the frame. Drift is how far behind (or,
+    if negative, ahead) of the clock the cpu was at the last frame. If
+    it falls behind by more than max_drift seconds the clock is reset
+    instead of trying to catch up.
+    """
+
+    def __init__(self, frequency=3500000, frame_rate=50, max_drift=0.25, clock=time, sleep=sleep):
+        if (frequency <= 0x00) or (frame_rate <= 0x00):
+            raise TStatesError(
+                'Error - Invalid frequency : {0} Hz or frame rate : {1}.'.format(frequency, frame_rate)
+            )
+
+        self.frequency = frequency
+        self.frame_cycles = max(frequency / frame_rate, 1)
+        self.max_drift = max_drift
+        self.drift = 0.0
+        self.resets = 0x00
+        self._clock = clock
+        self._sleep = sleep
+        self._start_time = None
+        self._start_cycles = 0x00
+
+    def reset(self, cycles=0x00):
+        self._start_time = self._clock()
+        self._start_cycles = cycles
+
+    def synchronize(self, cycles):
+        """
+        Sleeps until the time at which the cpu should reach cycles and
+        returns the drift.
+        """
+        if self._start_time is None:
+            self.reset(cycles)
+            return self.drift
+
+        target_time = self._start_time + float(cycles - self._start_cycles) / self.frequency
+        self.drift = self._clock() - target_time
+
+        if self.drift < 0x00:
+            self._sleep(-self.drift)
+        elif self.drift > self.max_drift:
+            self.reset(cycles)
+            self.resets += 1
+
+        return self.drift
+
+
+class Scheduler(object):
+
+    """
+    Keeps callbacks to be called once the cpu reaches a given cycle
+    count. The cpu runs up to the next scheduled event, so a halted cpu
+    skips straight to it. Events are called from the cpu thread, in
+    order, and may schedule further events.
+    """
+
+    def __init__(self, z80):
+        self._z80 = z80
+        self._events = []
+        self._sequence = 0x00
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    @property
+    def next_cycles(self):
+        """
+        Cycle count of the next event or None if there are no events.
+        """
+        events = self._events
+        return events[0][0] if events else None
+
+    def schedule(self, cycles, callback):
+        """
+        An event earlier than the end of the running slice ends the
+        slice there, so the cpu doesn't run (or skip, if halted) past it.
+        """
+        with self._lock:
+            heappush(self._events, (cycles, self._sequence, callback))
+            self._sequence += 1
+
+            slice_end_cycles = self._z80._slice_end_cycles
+
+            if (slice_end_cycles is None) or (cycles < slice_end_cycles):
+                self._z80._slice_end_cycles = cycles
+
+    def run_due(self, cycles):
+        """
+        Calls every event scheduled up to cycles.
+        """
+        while self._events and (self._events[0][0] <= cycles):
+            with self._lock:
+                _, _, callback = heappop(self._events)
+
+            callback()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of PyZ80.
+
+PyZ80 is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+PyZ80 is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with PyZ80. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2014 Lucas Liendo.
+"""
+
+from ..instruction.jump import JpNN, JpCCNN, JrE, JrSSE, JpIndirectHL, JpIndirectIX, JpIndirectIY, DjnzE
+from ..instruction.call_and_return import CallNN, CallCCNN, Ret, RetCC, Reti, Retn, Rst
+from ..instruction.cpu_control import Halt, Di, Ei
+from ..instruction.decoder import InvalidInstructionError
+from ..instruction.generator import HandlerGenerator
+from ..ram import RamInvalidAddress
+from ..timing import TStates
+
+
+class BlockTranslatorError(Exception):
+    pass
+
+
+class BlockTranslator(object):
+
+    """
+    Translates a run of instructions starting at a given address into
+    a single Python function. A block ends at the first instruction
+    that may change the PC (or the interrupt state), after
+    max_block_length instructions or once its instructions take
+    max_block_cycles T-states.
+
+    Blocks are built from the functions of the handler generator : the
+    specialized body of every instruction is inlined with its operands
+    bound, so there's nothing the translator can't compile. Translated
+    blocks are cached by their start address and dropped whenever a byte
+    they were translated from is written.
+
+    Pending interrupts and scheduled events are only handled between
+    blocks, so a block may delay them by up to max_block_cycles T-states
+    plus the T-states of its last instruction (and of the repetitions of
+    a block instruction such as LDIR).
+    """
+
+    _block_terminators = (
+        JpNN, JpCCNN, JrE, JrSSE, JpIndirectHL, JpIndirectIX, JpIndirectIY, DjnzE,
+        CallNN, CallCCNN, Ret, RetCC, Reti, Retn, Rst, Halt, Di, Ei,
+    )
+
+    def __init__(self, z80, max_block_length=64, max_block_cycles=128):
+        self._z80 = z80
+        self._max_block_length = max_block_length
+        self._max_block_cycles = max_block_cycles
+        self._blocks = {}
+        self._block_ends = {}
+        self._covering_blocks = {}
+        self._invalidations = 0
+        self._handler_generator = HandlerGenerator(self._z80._instruction_decoder)
+        self._handler_generator.build()
+        self._z80.ram.add_write_watcher(self._invalidate)
+
+    def _decode_block(self, address):
+        """
+        Returns a list of (next_address, dispatch key, generated function,
+        operands, t_states) for every instruction of the block starting at
+        address. Operands are the byte wide operands of the generated
+        function.
+        """
+
+        instructions = []
+        cycles = 0
+
+        while (len(instructions) < self._max_block_length) and (cycles < self._max_block_cycles):
+            try:
+                length = self._z80._opcode_length(address)
+
+                if length == 0:
+                    break
+
+                opcode = self._z80.ram.read_bytes(address, length)
+                handler, _ = self._z80._instruction_decoder.decode(opcode)
+                generated_handler, operands = self._handler_generator.decode(opcode)
+            except (RamInvalidAddress, InvalidInstructionError):
+                break
+
+            prefix, byte = self._z80._instruction_decoder._dispatch_key(opcode)
+            t_states = TStates.of(opcode)
+            instructions.append((address + length, (prefix, byte, length), generated_handler, operands, t_states))
+            address += length
+            cycles += t_states
+
+            if isinstance(handler, self._block_terminators):
+                break
+
+        return instructions
+
+    def _is_opaque(self, lines):
+        """
+        Bodies that only move registers and read RAM don't need an up to
+        date PC. Anything else (writes, handler calls, PC changes) gets the
+        PC of the next instruction first and may invalidate the block.
+        """
+
+        text = '\n'.join(lines)
+        return ('reg_pc' in text) or ('(' in text.replace('ram.read(', ''))
+
+    def _generate_block(self, instructions):
+        """
+        If an instruction writes into a translated range (possibly this very
+        block) the block returns right after it, with the PC pointing to the
+        next instruction. RAM accessors are looked up on every access, as
+        mapping IO pages replaces them.
+        """
+
+        namespace = dict(self._handler_generator._namespace, translator=self)
+        source = ['def block():', '    invalidations = translator._invalidations']
+
+        for n, (next_address, dispatch_key, generated_handler, operands, t_states) in enumerate(instructions):
+            source.append('    z80.cycles += {0}'.format(t_states))
+            lines = self._handler_generator.inline(dispatch_key, operands, '_{0}'.format(n))
+
+            if lines is None:
+                namespace['generated_{0}'.format(n)] = generated_handler
+                lines = ['generated_{0}({1})'.format(n, ', '.join(repr(o) for o in operands))]
+
+            opaque = self._is_opaque(lines)
+
+            if opaque:
+                lines = ['reg_pc.bits = {0}'.format(next_address)] + lines
+                lines.extend(['if translator._invalidations != invalidations:', '    return'])
+
+            source.extend('    ' + line for line in lines)
+
+        if not opaque:
+            source.append('    reg_pc.bits = {0}'.format(next_address))
+
+        exec '\n'.join(source) in namespace
+        return namespace['block']
+
+    def translate(self, address):
+        """
+        Returns the translated block starting at address or None if there's
+        no valid instruction at address, in which case the instruction has
+        to be run by the interpreter.
+        """
+
+        block = self._blocks.get(address)
+
+        if block is not None:
+            return block
+
+        instructions = self._decode_block(address)
+
+        if not instructions:
+            return None
+
+        block = self._blocks[address] = self._generate_block(instructions)
+        end_address = self._block_ends[address] = instructions[-1][0]
+        self._z80.ram.watch(address, end_address - address)
+
+        for covered_address in range(address, end_address):
+            self._covering_blocks.setdefault(covered_address, set()).add(address)
+
+        return block
+
+    def _drop_block(self, address):
+        del self._blocks[address]
+
+        for covered_address in range(address, self._block_ends.pop(address)):
+            start_addresses = self._covering_blocks[covered_address]
+            start_addresses.discard(address)
+
+            if not start_addresses:
+                del self._covering_blocks[covered_address]
+
+    def _invalidate(self, address):
+        start_addresses = self._covering_blocks.get(address)
+
+        if start_addresses:
+            [self._drop_block(start_address) for start_address in list(start_addresses)]
+            self._invalidations += 1